@@ -0,0 +1,400 @@
+import os
+import sys
+import json
+import time
+import zlib
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+from contextlib import contextmanager
+from datetime import timedelta
+from pathlib import Path
+
+import generate_db as g
+
+BASELINE_FILE = Path(__file__).with_name("bench_baseline.json")
+GOLDEN_FILE = Path(__file__).with_name("bench_golden.json")
+SUITES = ('timestamps', 'gen', 'e2e', 'initdb', 'backends', 'parity')
+GOLDEN_SCALE = 0.001
+GOLDEN_ROWS = 2000
+BENCH_PG_PORT = 54329
+
+
+def legacy_gi_to_iso(gi):
+    # the per-row datetime version TimestampCache replaced
+    dt = g.BASE_DATE + timedelta(seconds=gi)
+    return dt.isoformat(sep=' ')
+
+def best_of(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+def bench_timestamps(n=1_000_000, start=0, repeat=3):
+    """Timestamps/sec of the legacy datetime formatter, the cache and the vectorized v_ts"""
+    gis = range(start, start + n)
+    fmt = g.TIMESTAMPS.format
+    sample = range(start, start + n, max(1, n // 10000))
+    if any(fmt(gi) != legacy_gi_to_iso(gi) for gi in sample):
+        raise AssertionError("TimestampCache output differs from datetime.isoformat")
+    results = {
+        'datetime': n / best_of(lambda: [legacy_gi_to_iso(gi) for gi in gis], repeat),
+        'cache': n / best_of(lambda: [fmt(gi) for gi in gis], repeat),
+    }
+    if g.np is not None:
+        arr = g.np.arange(start, start + n, dtype=g.np.int64)
+        results['vector'] = n / best_of(lambda: g.v_ts(arr), repeat)
+    return results
+
+def bench_generators(rows=50_000, repeat=3, tables=None):
+    """Rows/sec of generating and encoding `rows` rows of each table in this process,
+    for every engine and COPY format"""
+    engines = ['rows'] + (['vector'] if g.np is not None else [])
+    saved = g.ENGINE, dict(g.COPY_FORMATS)
+    results = {}
+    try:
+        for table in tables or g.GEN_FUNCS:
+            for engine in engines:
+                for fmt in ('csv', 'binary'):
+                    g.ENGINE = engine
+                    g.COPY_FORMATS[table] = fmt
+                    secs = best_of(lambda: sum(len(b) for b in g.iter_chunk_batches(table, 0, rows)), repeat)
+                    results[f"gen/{table}/{engine}/{fmt}"] = rows / secs
+    finally:
+        g.ENGINE = saved[0]
+        g.COPY_FORMATS.clear()
+        g.COPY_FORMATS.update(saved[1])
+    return results
+
+def table_checksums(rows=GOLDEN_ROWS, scale=GOLDEN_SCALE):
+    """CRC32 of the COPY payload of the first `rows` rows of every table at --scale `scale`,
+    per format; raises when the rows and vector engines produce different bytes"""
+    engines = ['rows'] + (['vector'] if g.np is not None else [])
+    saved = g.ENGINE, dict(g.COPY_FORMATS), dict(g.SIZES)
+    g.SIZES.update(g.scale_sizes(scale))
+    sums = {}
+    try:
+        for table in g.GEN_FUNCS:
+            end = min(rows, g.SIZES[table])
+            for fmt in ('csv', 'binary'):
+                g.COPY_FORMATS[table] = fmt
+                crcs = {}
+                for engine in engines:
+                    g.ENGINE = engine
+                    crcs[engine] = zlib.crc32(b''.join(g.iter_chunk_batches(table, 0, end)))
+                if len(set(crcs.values())) > 1:
+                    raise AssertionError(f"{table} {fmt}: the rows and vector engines disagree")
+                sums[f"{table}/{fmt}"] = crcs['rows']
+    finally:
+        g.ENGINE = saved[0]
+        g.COPY_FORMATS.clear()
+        g.COPY_FORMATS.update(saved[1])
+        g.SIZES.clear()
+        g.SIZES.update(saved[2])
+    return sums
+
+def check_golden(sums, path):
+    """Print the tables whose checksums differ from the golden file; returns their names"""
+    if not path.exists():
+        raise SystemExit(f"{path} not found: run the parity suite with --save-golden first")
+    with open(path) as f:
+        golden = json.load(f)['checksums']
+    changed = sorted(name for name in golden.keys() | sums.keys() if golden.get(name) != sums.get(name))
+    for name in changed:
+        print(f"  {name:<40} {sums.get(name, '-'):>12} golden {golden.get(name, '-')}")
+    return changed
+
+def discard_chunk(task):
+    """Generate and encode one chunk into /dev/null; returns its byte count"""
+    table, start, end, _ = task
+    nbytes = 0
+    with open(os.devnull, 'wb') as f:
+        for batch in g.iter_chunk_batches(table, start, end):
+            f.write(batch)
+            nbytes += len(batch)
+    return nbytes
+
+def bench_devnull():
+    """Rows/sec and MB/sec of generating every table with the worker pool, without a database"""
+    tasks = [task for table in g.GEN_FUNCS for task in g.table_tasks(table)]
+    pool = g.worker_pool()   # started outside the timing
+    try:
+        t0 = time.perf_counter()
+        nbytes = sum(pool.imap_unordered(discard_chunk, tasks))
+        secs = time.perf_counter() - t0
+    finally:
+        g.close_pools()
+    return {'e2e/devnull/rows': sum(g.SIZES.values()) / secs, 'e2e/devnull/mb': nbytes / secs / (1 << 20)}
+
+def pg_bindir(bindir=None):
+    """Directory holding initdb/pg_ctl: --pg-bindir, PATH or `pg_config --bindir`"""
+    candidates = [bindir] if bindir else []
+    if shutil.which('initdb'):
+        candidates.append(os.path.dirname(shutil.which('initdb')))
+    if shutil.which('pg_config'):
+        out = subprocess.run(['pg_config', '--bindir'], capture_output=True, text=True)
+        candidates.append(out.stdout.strip())
+    for d in candidates:
+        if d and os.path.exists(os.path.join(d, 'initdb')):
+            return d
+    raise SystemExit("initdb not found: put PostgreSQL's bin directory on PATH or pass --pg-bindir")
+
+@contextmanager
+def throwaway_postgres(bindir=None, port=BENCH_PG_PORT):
+    """initdb a cluster in a temp dir, start it on a private unix socket and point
+    generate_db at a fresh omniship database in it; everything is removed on exit"""
+    bindir = pg_bindir(bindir)
+    tmp = tempfile.mkdtemp(prefix='omniship-bench-')
+    data = os.path.join(tmp, 'data')
+    saved = g.DB_HOST, g.DB_PORT, g.DB_USER, g.DB_NAME
+    started = False
+    try:
+        subprocess.run([os.path.join(bindir, 'initdb'), '-D', data, '-U', 'postgres', '--auth=trust',
+                        '-E', 'UTF8', '--no-sync'], check=True, stdout=subprocess.DEVNULL)
+        subprocess.run([os.path.join(bindir, 'pg_ctl'), 'start', '-w', '-D', data,
+                        '-l', os.path.join(tmp, 'postgres.log'),
+                        '-o', f"-p {port} -k {tmp} -c listen_addresses=''"], check=True, stdout=subprocess.DEVNULL)
+        started = True
+        g.DB_HOST, g.DB_PORT, g.DB_USER, g.DB_NAME = tmp, port, 'postgres', 'postgres'
+        conn = g.db_connect()
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            cur.execute("CREATE DATABASE omniship")
+        conn.close()
+        g.DB_NAME = 'omniship'
+        conn = g.db_connect()
+        with conn, conn.cursor() as cur:
+            cur.execute(g.SCHEMA_FILE.read_text())
+        conn.close()
+        yield tmp
+    finally:
+        g.DB_HOST, g.DB_PORT, g.DB_USER, g.DB_NAME = saved
+        if started:
+            subprocess.run([os.path.join(bindir, 'pg_ctl'), 'stop', '-w', '-m', 'immediate', '-D', data],
+                           stdout=subprocess.DEVNULL)
+        shutil.rmtree(tmp, ignore_errors=True)
+
+def bench_initdb_load(modes=('stream', 'csv'), bindir=None):
+    """Rows/sec of a full load of every table into a throwaway cluster, per load mode"""
+    results = {}
+    rows = sum(g.SIZES.values())
+    with throwaway_postgres(bindir):
+        manifest = g.ChunkManifest()
+        manifest.ensure_table()
+        for mode in modes:
+            g.truncate_all_tables()
+            manifest.reset()
+            pipeline = g.LoadPipeline(g.fk_parents(), mode)
+            t0 = time.perf_counter()
+            try:
+                pipeline.run()
+            finally:
+                g.close_pools()
+            results[f"load/initdb/{mode}"] = rows / (time.perf_counter() - t0)
+    return results
+
+def bench_backends(bindir=None):
+    """Rows/sec of a full stream load with every load backend into a throwaway cluster.
+
+    Also the smoke check of the backends: each load must pass verify_load. The
+    pipeline backend is skipped when psycopg 3 is not installed.
+    """
+    names = [n for n in g.BACKENDS if n != 'pipeline' or g.psycopg is not None]
+    if g.psycopg is None:
+        print("backends: psycopg 3 is not installed, skipping the pipeline backend")
+    results = {}
+    rows = sum(g.SIZES.values())
+    saved = dict(g.LOAD_BACKENDS), dict(g.COPY_FORMATS), g.EXPLICIT_IDS
+    g.EXPLICIT_IDS = True   # verify compares primary key ranges
+    try:
+        with throwaway_postgres(bindir):
+            manifest = g.ChunkManifest()
+            manifest.ensure_table()
+            for name in names:
+                for table in g.GEN_FUNCS:
+                    g.use_backend(table, name)
+                g.truncate_all_tables()
+                manifest.reset()
+                pipeline = g.LoadPipeline(g.fk_parents(), 'stream')
+                t0 = time.perf_counter()
+                try:
+                    pipeline.run()
+                finally:
+                    g.close_pools()
+                results[f"load/backend/{name}"] = rows / (time.perf_counter() - t0)
+                if g.verify_load():
+                    raise AssertionError(f"backend {name} loaded rows that do not match the manifest")
+    finally:
+        g.LOAD_BACKENDS.clear()
+        g.LOAD_BACKENDS.update(saved[0])
+        g.COPY_FORMATS.clear()
+        g.COPY_FORMATS.update(saved[1])
+        g.EXPLICIT_IDS = saved[2]
+    return results
+
+def compare(results, baseline, tolerance):
+    """Print every metric against the baseline; returns the names that regressed"""
+    regressions = []
+    print(f"against baseline (fail below x{1 - tolerance:.2f}):")
+    for name, value in sorted(results.items()):
+        base = baseline.get(name)
+        if not base:
+            print(f"  {name:<40} {value:>14,.0f}  (no baseline)")
+            continue
+        ratio = value / base
+        flag = ''
+        if ratio < 1 - tolerance:
+            regressions.append(name)
+            flag = '  REGRESSION'
+        print(f"  {name:<40} {value:>14,.0f} {base:>14,.0f}  x{ratio:.2f}{flag}")
+    return regressions
+
+def load_baseline(path):
+    with open(path) as f:
+        return json.load(f)
+
+def save_baseline(path, results, settings):
+    with open(path, 'w') as f:
+        json.dump({'machine': platform.node(), 'python': platform.python_version(), 'settings': settings,
+                   'metrics': results}, f, indent=1, sort_keys=True)
+    print(f"Baseline written to {path}")
+
+def truncate(table):
+    conn = g.db_connect()
+    with conn, conn.cursor() as cur:
+        cur.execute(f"TRUNCATE {table} RESTART IDENTITY")
+    conn.close()
+
+def bench_load(table, workers=(2, 4, 8, 16), strategies=g.LOAD_STRATEGIES):
+    """Rows/sec loading one table with each strategy and worker count.
+
+    Needs a scratch database: constraints on every table are dropped for the run
+    (so `table` loads on its own, without its parents) and rebuilt at the end, and
+    `table` is truncated before each run and after the last one. Every run is a
+    stream-mode LoadPipeline, as main() loads; "heap" is the plain COPY baseline.
+    """
+    g.EXPLICIT_IDS = True   # staging slices keep their ids when switched over
+    deferred = g.DeferredConstraints(g.GEN_FUNCS)
+    deferred.drop()
+    results = {}
+    try:
+        for strategy in strategies:
+            for n in workers:
+                truncate(table)
+                g.WORKERS = g.COPY_WORKERS = g.STAGE_TABLES = n
+                g.LOAD_STRATEGY = strategy
+                pipeline = g.LoadPipeline({table: set()}, 'stream', max_pending=2 * n,
+                                          strategy=g.LoadStrategy(strategy, workers=n))
+                t0 = time.perf_counter()
+                try:
+                    pipeline.run()
+                finally:
+                    g.close_pools()
+                results[strategy, n] = g.SIZES[table] / (time.perf_counter() - t0)
+    finally:
+        truncate(table)
+        deferred.restore()
+    return results
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Microbenchmarks for the OmniShip generators")
+    p.add_argument('--rows', type=int, default=1_000_000)
+    p.add_argument('--repeat', type=int, default=3)
+    p.add_argument('--suite', default='timestamps,gen,e2e',
+                   help=f"comma-separated benchmarks to run, from {','.join(SUITES)} "
+                        "(initdb and backends need the PostgreSQL server binaries)")
+    p.add_argument('--gen-rows', type=int, default=50_000, help="rows per table for the gen suite")
+    p.add_argument('--tables', default='', help="comma-separated tables for the gen suite (default all)")
+    p.add_argument('--scale', type=float, default=0.01,
+                   help="--scale of the dataset for the e2e and initdb suites")
+    p.add_argument('--pg-bindir', help="directory with initdb and pg_ctl for the initdb and backends suites")
+    p.add_argument('--baseline', type=Path, default=BASELINE_FILE)
+    p.add_argument('--save-baseline', action='store_true', help="store this run as the new baseline")
+    p.add_argument('--tolerance', type=float, default=0.2,
+                   help="fail when a metric drops more than this fraction below the baseline")
+    p.add_argument('--golden', type=Path, default=GOLDEN_FILE)
+    p.add_argument('--save-golden', action='store_true',
+                   help="store the parity suite's checksums as the new golden file")
+    p.add_argument('--load', metavar='TABLE',
+                   help="also benchmark the load strategies on TABLE (drops constraints, truncates TABLE)")
+    p.add_argument('--workers', default='2,4,8,16', help="worker counts for --load")
+    args = p.parse_args(argv)
+    suites = [s for s in args.suite.split(',') if s]
+    for s in suites:
+        if s not in SUITES:
+            raise SystemExit(f"--suite: unknown benchmark {s}")
+    results = {}
+    if 'timestamps' in suites:
+        print(f"timestamp formatting ({args.rows} values, best of {args.repeat}):")
+        res = bench_timestamps(args.rows, repeat=args.repeat)
+        for name, rate in res.items():
+            print(f"  {name:>8}: {rate:>12,.0f}/s  x{rate / res['datetime']:.1f}")
+            results[f"timestamps/{name}"] = rate
+    if 'gen' in suites:
+        print(f"generate + encode ({args.gen_rows} rows per table, best of {args.repeat}), rows/s:")
+        res = bench_generators(args.gen_rows, args.repeat, [t for t in args.tables.split(',') if t])
+        for name, rate in res.items():
+            print(f"  {name:<40} {rate:>12,.0f}")
+        results.update(res)
+    if 'e2e' in suites or 'initdb' in suites or 'backends' in suites:
+        g.SIZES.update(g.scale_sizes(args.scale))
+        g.CHUNK_SIZES.update(g.auto_chunk_sizes())
+    if 'e2e' in suites:
+        res = bench_devnull()
+        print(f"generate all tables to /dev/null (scale {args.scale:g}, {sum(g.SIZES.values())} rows, "
+              f"{g.WORKERS} workers): {res['e2e/devnull/rows']:,.0f} rows/s, {res['e2e/devnull/mb']:.1f} MB/s")
+        results.update(res)
+    if 'initdb' in suites:
+        res = bench_initdb_load(bindir=args.pg_bindir)
+        for name, rate in res.items():
+            print(f"{name} (scale {args.scale:g}): {rate:,.0f} rows/s")
+        results.update(res)
+    if 'backends' in suites:
+        res = bench_backends(bindir=args.pg_bindir)
+        for name, rate in res.items():
+            print(f"{name} (scale {args.scale:g}): {rate:,.0f} rows/s, verified")
+        results.update(res)
+    changed = []
+    if 'parity' in suites:
+        sums = table_checksums()
+        engines = 'rows and vector engines agree' if g.np is not None else 'rows engine only, NumPy missing'
+        print(f"output parity ({GOLDEN_ROWS} rows per table at scale {GOLDEN_SCALE:g}, {engines}):")
+        if args.save_golden:
+            with open(args.golden, 'w') as f:
+                json.dump({'rows': GOLDEN_ROWS, 'scale': GOLDEN_SCALE, 'checksums': sums}, f, indent=1, sort_keys=True)
+            print(f"Golden checksums written to {args.golden}")
+        else:
+            changed = check_golden(sums, args.golden)
+            print(f"  {len(sums) - len(changed)}/{len(sums)} payloads match {args.golden.name}")
+    settings = {'scale': args.scale, 'gen_rows': args.gen_rows, 'workers': g.WORKERS, 'engine': g.ENGINE}
+    regressions = []
+    if args.save_baseline:
+        save_baseline(args.baseline, results, settings)
+    elif args.baseline.exists():
+        baseline = load_baseline(args.baseline)
+        if baseline.get('settings') != settings:
+            print(f"Warning: baseline was taken with {baseline.get('settings')}, this run uses {settings}")
+        regressions = compare(results, baseline['metrics'], args.tolerance)
+    if args.load:
+        workers = [int(n) for n in args.workers.split(',')]
+        res = bench_load(args.load, workers)
+        print(f"loading {args.load} ({g.SIZES[args.load]} rows), rows/s:")
+        print(f"  {'workers':>10}" + ''.join(f"{n:>12}" for n in workers))
+        for strategy in g.LOAD_STRATEGIES:
+            base = [res['heap', n] for n in workers]
+            print(f"  {strategy:>10}" + ''.join(f"{res[strategy, n]:>12,.0f}" for n in workers))
+            if strategy != 'heap':
+                print(f"  {'':>10}" + ''.join(f"{'x%.2f' % (res[strategy, n] / b):>12}" for n, b in zip(workers, base)))
+    if regressions:
+        print(f"{len(regressions)} metrics regressed more than {args.tolerance:.0%}: {', '.join(regressions)}")
+    if changed:
+        print(f"{len(changed)} payloads changed; if the new output is intended, rerun with --save-golden")
+    return 1 if regressions or changed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
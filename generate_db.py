@@ -1,16 +1,139 @@
 import os
+import io
+import sys
+import gzip
+import re
 import csv
+import codecs
+import heapq
 import math
+import json
+import zlib
+import struct
+import time
+import queue
+import argparse
+import threading
+import subprocess
+from itertools import islice, count
+from bisect import bisect_right
+from functools import lru_cache
+from collections import deque, defaultdict
 from multiprocessing import Pool, cpu_count
 from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
 from pathlib import Path
 from datetime import datetime, timedelta
+from decimal import Decimal
 import psycopg2
+from psycopg2 import sql
+from psycopg2.extras import execute_values, execute_batch
 from tqdm import tqdm
 
+try:
+    import numpy as np
+except ImportError:  # falls back to the per-row generators
+    np = None
+
+try:
+    import resource
+except ImportError:  # Windows: peak RSS is not reported
+    resource = None
+
+try:
+    import zstandard as zstd
+except ImportError:  # only needed for --compression zstd
+    zstd = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+    import pyarrow.parquet as pq
+except ImportError:  # only needed for --export-format parquet
+    pa = None
+
+try:
+    from faker import Faker
+except ImportError:  # only needed for --text faker
+    Faker = None
+
+try:
+    import psycopg
+except ImportError:  # psycopg 3, only needed for --backend pipeline
+    psycopg = None
+
 # config
 OUT_DIR = Path("./data_chunks")
-OUT_DIR.mkdir(parents=True, exist_ok=True)
+SCHEMA_FILE = Path(__file__).with_name("SQLOmniship.sql")
+# committed chunks: tracking table in the target DB plus a local JSON lines mirror
+MANIFEST_TABLE = "seed_manifest"
+MANIFEST_FILE = Path("./seed_manifest.jsonl")
+# constraint/index definitions saved while they are dropped for a bulk load
+DEFERRED_DDL_FILE = Path("./deferred_constraints.json")
+# reset before a load: "truncate" empties every table with one TRUNCATE, "template" drops
+# the database and clones it from RESET_TEMPLATE (CREATE DATABASE ... TEMPLATE), which
+# --snapshot also uses to save a seeded state; both run from MAINTENANCE_DB
+RESET_MODE = os.getenv("SEED_RESET", "truncate")
+RESET_TEMPLATE = os.getenv("SEED_RESET_TEMPLATE", "omniship_template")
+MAINTENANCE_DB = "postgres"
+MAINTENANCE_WORK_MEM = os.getenv("SEED_MAINTENANCE_WORK_MEM", "1GB")
+
+# export (--mode export): every chunk becomes one compressed CSV or Parquet file under
+# EXPORT_DIR/<table>/ plus EXPORT_MANIFEST; no DB connection is made. --from-export
+# loads such a directory back (IMPORT_FILES maps (table, start gi) to its file)
+EXPORT_DIR = Path("./export")
+EXPORT_MANIFEST = "manifest.json"
+EXPORT_FORMAT = "csv"
+EXPORT_COMPRESSION = "gzip"
+COMPRESSION_LEVELS = {'gzip': 6, 'zstd': 3}
+IMPORT_FILES = {}
+IMPORT_FINGERPRINTS = {}   # (table, start gi) -> the chunk's fingerprint from the export manifest
+IMPORT_CHECKSUMS = {}      # (table, start gi) -> the chunk's CRC32 from the export manifest
+
+# append (--append / --trickle): grow tables from the rows already loaded instead of
+# reloading them; --trickle adds rows to TRICKLE_TABLES every TRICKLE_INTERVAL seconds
+TRICKLE_TABLES = "orders,orderitems,payments"
+TRICKLE_INTERVAL = 1.0
+
+# verification (--verify / --mode verify): each chunk's row count and fingerprint are recomputed
+# server-side over its primary key range (per table without --explicit-ids) on VERIFY_WORKERS
+# connections, and every FK is checked for orphans
+VERIFY_WORKERS = min(8, cpu_count())
+
+# sharding (--shard i/N): this process only handles chunk indexes with idx % N == i of
+# every table; --coordinate prepares the DB once and finishes it after all shards
+SHARD = None
+
+# load mode: "stream" pipes generated rows straight into COPY,
+# "csv" writes chunk files to OUT_DIR first (useful for debugging)
+LOAD_MODE = os.getenv("SEED_LOAD_MODE", "stream")
+PIPE_BATCH_ROWS = 5000   # rows encoded per batch pushed through the pipe
+PIPE_DEPTH = 8           # max batches buffered between generator and COPY
+COPY_BUFFER_SIZE = 1 << 16
+
+# generator engine: "vector" builds each batch column-at-a-time with NumPy,
+# "rows" uses the per-row generators compiled from TABLES (same bytes, slower)
+ENGINE = "vector" if np is not None else "rows"
+VEC_BATCH_ROWS = 50000
+
+# COPY format per table: "csv" (default) or "binary" (PGCOPY, no server-side text parsing)
+COPY_FORMATS = {}
+# table -> (backend, batch rows, workers), see LOAD BACKENDS; tables not listed use text COPY
+LOAD_BACKENDS = {}
+INSERT_BATCH_ROWS = 2000   # rows per INSERT statement / EXECUTE page of the row backends
+AUTOTUNE_ROWS = 20000      # rows per calibration load; smaller tables keep COPY
+AUTOTUNE_BATCH_ROWS = (500, 2000, 8000)
+AUTOTUNE_REPEAT = 2
+
+# write primary keys as gi + 1 instead of drawing them from the sequences, so any
+# chunk can be loaded in any order (or on another machine) with identical results
+EXPLICIT_IDS = False
+
+# how chunks reach a table: "heap" (COPY straight in), "unlogged" (table SET UNLOGGED
+# for the load, SET LOGGED after) or "partitions" (one UNLOGGED staging table per
+# slice of the gi range, switched over once the table is loaded)
+LOAD_STRATEGY = os.getenv("SEED_LOAD_STRATEGY", "heap")
+LOAD_STRATEGIES = ('heap', 'unlogged', 'partitions')
 
 DB_HOST = "localhost"
 DB_NAME = "omniship"
@@ -18,73 +141,67 @@ DB_USER = os.getenv("USER") or "postgres"
 DB_PASS = "admin"
 DB_PORT = 5432
 
-# table sizes
-SIZES = {
-    "categories": 50,
-    "users": 200000,
-    "roles": 5,
-    "permissions": 15,
-    "rolepermissions": 50,
-    "userroles": 200000,
-    "warehouses": 10,
-    "suppliers": 1000,
-    "products": 4000,
-    "productvariants": 20000,
-    "inventory": 40000,
-    "promotions": 200,
-    "taxes": 200,
-    "orders": 1000000,
-    "orderitems": 10000000,
-    "payments": 1000000,
-    "vehicles": 200,
-    "drivers": 500,
-    "maintenancelogs": 200000,
-    "deliveryshipments": 500000,
-    "deliveryroutes": 500000,
-    "routestops": 400000,
-    "proofofdelivery": 400000,
-    "purchaseorders": 200000,
-    "purchaseorderitems": 1000000,
-    "shipments": 200000,
-    "qualitychecks": 200000
-}
-
-# chunk sizes (tune them if needed)
-CHUNK_SIZES = {
-    "categories": 50,
-    "users": 50000,
-    "roles": 5,
-    "permissions": 15,
-    "rolepermissions": 50,
-    "userroles": 50000,
-    "warehouses": 10,
-    "suppliers": 250,
-    "products": 1000,
-    "productvariants": 5000,
-    "inventory": 10000,
-    "promotions": 200,
-    "taxes": 200,
-    "orders": 100000,
-    "orderitems": 200000,
-    "payments": 100000,
-    "vehicles": 200,
-    "drivers": 250,
-    "maintenancelogs": 50000,
-    "deliveryshipments": 100000,
-    "deliveryroutes": 100000,
-    "routestops": 100000,
-    "proofofdelivery": 100000,
-    "purchaseorders": 50000,
-    "purchaseorderitems": 100000,
-    "shipments": 50000,
-    "qualitychecks": 50000
-}
-
 WORKERS = min(8, cpu_count())
 COPY_WORKERS = min(8, cpu_count())
+# generated-but-not-yet-loaded chunks allowed at once in the pipeline
+MAX_PENDING_CHUNKS = 2 * COPY_WORKERS
+STAGE_TABLES = COPY_WORKERS   # staging tables per table with the "partitions" strategy
+
+# value distributions: "uniform" round-robins every FK and timestamp; "skewed" draws
+# Zipf/power-law FKs and time-of-day weighted timestamps where the table specs ask
+# for them, from a counter-based hash of (SEED, column, gi) so any chunk is reproducible
+DISTRIBUTION = os.getenv("SEED_DISTRIBUTION", "uniform")
+SEED = int(os.getenv("SEED_RANDOM_SEED", "42"))
+# relative share of events per hour of the day, 00h..23h
+HOURLY_WEIGHTS = [2, 1, 1, 1, 1, 2, 4, 7, 9, 10, 11, 12, 13, 12, 11, 10, 10, 11, 13, 14, 13, 10, 7, 4]
+
+# aggregates: "independent" fills money totals from gi like any other column; "consistent"
+# derives them from the related rows (orders.subtotal = sum of its orderitems, payments.amount
+# = the order's total), in closed form per row, so nothing is materialized or UPDATEd
+AGGREGATES = os.getenv("SEED_AGGREGATES", "independent")
+
+# text: "placeholder" writes deterministic('UserFull', gi)-style strings; "faker" picks names,
+# cities, street addresses and companies from VOCAB_POOL_SIZE Faker values per kind, generated
+# once per SEED and cached in VOCAB_DIR, which workers memory-map instead of running Faker
+TEXT = os.getenv("SEED_TEXT", "placeholder")
+VOCAB_DIR = Path("./vocab")
+VOCAB_LOCALE = "en_US"
+VOCAB_POOL_SIZE = 1 << 15
+
+# adaptive chunk sizing (--scale / --auto-chunks): initial sizes aim at CHUNK_TARGET_BYTES
+# of COPY payload, then pending chunks are re-split to take about CHUNK_TARGET_SECONDS
+CHUNK_TARGET_BYTES = int(os.getenv("SEED_CHUNK_TARGET_BYTES", 16 << 20))
+CHUNK_TARGET_SECONDS = 2.0
+MIN_CHUNK_ROWS = 1000
+CHUNKS_PER_WORKER = 2   # keep at least this many chunks per worker on big tables
+SHARD_PLAN_WORKERS = 8  # worker count sharded chunk plans are sized for, the same on every host
+
+# run report (--report / --trace): per-chunk stage timings, worker peak RSS and pg_stat_*
+# samples taken every PG_STAT_INTERVAL seconds; TRACE also keeps every span for the trace
+STAGES = ('read', 'generate', 'serialize', 'checksum', 'write', 'copy', 'commit')
+PG_STAT_INTERVAL = 1.0
+TRACE = False
 
 BASE_DATE = datetime(2020, 1, 1)
 
+# settings that must reach worker processes (spawned workers re-import the module)
+WORKER_SETTINGS = ['ENGINE', 'SIZES', 'CHUNK_SIZES', 'COPY_FORMATS', 'LOAD_BACKENDS', 'EXPLICIT_IDS',
+                   'LOAD_STRATEGY', 'STAGE_TABLES', 'DISTRIBUTION', 'SEED', 'AGGREGATES', 'TEXT', 'TRACE',
+                   'DB_HOST', 'DB_NAME', 'DB_USER', 'DB_PASS', 'DB_PORT',
+                   'EXPORT_DIR', 'EXPORT_FORMAT', 'EXPORT_COMPRESSION', 'IMPORT_FILES', 'IMPORT_FINGERPRINTS',
+                   'IMPORT_CHECKSUMS']
+
+def worker_settings():
+    return {name: globals()[name] for name in WORKER_SETTINGS}
+
+def init_worker(settings, connect=False):
+    globals().update(settings)
+    if connect:
+        try:
+            worker_connection()
+        except Exception:
+            pass   # the first chunk retries the connection and reports the error
+
 # ---------- HELPERS ----------
 def chunk_ranges(total, chunk_size):
     n_chunks = math.ceil(total / chunk_size)
@@ -95,534 +212,3748 @@ def chunk_ranges(total, chunk_size):
         ranges.append((start, end, i))
     return ranges
 
-def gi_to_iso(gi):
-    dt = BASE_DATE + timedelta(seconds=gi)
-    return dt.isoformat(sep=' ')
+class TimestampCache:
+    """Formats `base + n seconds` like datetime.isoformat(sep=' ') without building datetimes.
+
+    The 'YYYY-MM-DD ' prefix is cached per day and the 'HH:MM:SS' part comes from a
+    table of all 86400 seconds of a day, so a timestamp costs one divmod, one dict
+    lookup and one string concatenation.
+    """
+
+    def __init__(self, base):
+        self.base = base
+        self.offset = base.hour * 3600 + base.minute * 60 + base.second
+        self.days = {}
+        self.sod = [f"{h:02d}:{m:02d}:{s:02d}" for h in range(24) for m in range(60) for s in range(60)]
+        if base.microsecond:
+            raise ValueError("TimestampCache base must be a whole second")
+
+    def day_prefix(self, day):
+        prefix = self.days.get(day)
+        if prefix is None:
+            prefix = self.days[day] = (self.base.date() + timedelta(days=day)).isoformat() + ' '
+        return prefix
+
+    def format(self, seconds):
+        day, sod = divmod(seconds + self.offset, 86400)
+        prefix = self.days.get(day)
+        if prefix is None:
+            prefix = self.day_prefix(day)
+        return prefix + self.sod[sod]
+
+TIMESTAMPS = TimestampCache(BASE_DATE)
+gi_to_iso = TIMESTAMPS.format
 
 def deterministic(prefix, gi, width=9):
     return f"{prefix}_{gi:0{width}d}"
 
-def write_csv_rows(fname, header, rows):
-    with open(fname, 'w', newline='', encoding='utf-8') as f:
-        w = csv.writer(f)
-        w.writerow(header)
-        for r in rows:
-            w.writerow(r)
-
-# Generators
-# Each function writes CSV chunk file and returns path string.
-
-def gen_categories_chunk(args):
-    start, end, idx = args
-    fname = OUT_DIR / f"categories_{idx:03d}.csv"
-    header = ["parent_id","category_name","description"]
-    rows = []
-    for gi in range(start, end):
-        parent = (gi % SIZES['categories']) + 1 if (gi % 10 == 0 and gi != 0) else ''
-        rows.append([parent, deterministic('category', gi, 4), f"Category desc {gi}"])
-    write_csv_rows(fname, header, rows)
-    return str(fname)
-
-def gen_users_chunk(args):
-    start, end, idx = args
-    fname = OUT_DIR / f"users_{idx:03d}.csv"
-    header = ["username","password_hash","email","full_name","user_type","created_at"]
-    rows = []
-    for gi in range(start, end):
-        uname = deterministic('user', gi)
-        email = f"{uname}@example.com"
-        pw = f"hash_{gi:012d}"
-        fullname = deterministic('UserFull', gi)
-        rows.append([uname, pw, email, fullname, 'customer', gi_to_iso(gi)])
-    write_csv_rows(fname, header, rows)
-    return str(fname)
-
-def gen_roles_chunk(args):
-    start, end, idx = args
-    fname = OUT_DIR / f"roles_{idx:03d}.csv"
-    header = ["role_name","description"]
-    rows = []
-    for gi in range(start, end):
-        rows.append([deterministic('role', gi), f"Role {gi}"])
-    write_csv_rows(fname, header, rows)
-    return str(fname)
-
-def gen_permissions_chunk(args):
-    start, end, idx = args
-    fname = OUT_DIR / f"permissions_{idx:03d}.csv"
-    header = ["permission_name","description"]
-    rows = []
-    for gi in range(start, end):
-        rows.append([deterministic('permission', gi), f"Permission {gi}"])
-    write_csv_rows(fname, header, rows)
-    return str(fname)
-
-def gen_rolepermissions_chunk(args):
-    start, end, idx = args
-    fname = OUT_DIR / f"rolepermissions_{idx:03d}.csv"
-    header = ["role_id","permission_id"]
-    rows = []
-    total_pairs = SIZES['roles'] * SIZES['permissions']
-    for gi in range(start, end):
-        j = gi % total_pairs
-        role_id = (j % SIZES['roles']) + 1
-        perm_id = (j // SIZES['roles']) + 1
-        rows.append([role_id, perm_id])
-    write_csv_rows(fname, header, rows)
-    return str(fname)
-
-def gen_userroles_chunk(args):
-    start, end, idx = args
-    fname = OUT_DIR / f"userroles_{idx:03d}.csv"
-    header = ["user_id","role_id"]
-    rows = []
-    for gi in range(start, end):
-        user_id = (gi % SIZES['users']) + 1
-        role_id = (gi % SIZES['roles']) + 1
-        rows.append([user_id, role_id])
-    write_csv_rows(fname, header, rows)
-    return str(fname)
-
-def gen_warehouses_chunk(args):
-    start, end, idx = args
-    fname = OUT_DIR / f"warehouses_{idx:03d}.csv"
-    header = ["warehouse_name","location_country","location_city","address","capacity"]
-    rows = []
-    for gi in range(start, end):
-        rows.append([deterministic('wh', gi), f"Country_{gi%200}", f"City_{gi%1000}", deterministic('Address', gi), 1000 + (gi % 100000)])
-    write_csv_rows(fname, header, rows)
-    return str(fname)
-
-def gen_suppliers_chunk(args):
-    start, end, idx = args
-    fname = OUT_DIR / f"suppliers_{idx:03d}.csv"
-    header = ["company_name","contact_name","contact_email","phone","address","country"]
-    rows = []
-    for gi in range(start, end):
-        comp = deterministic('supplier', gi, 6)
-        email = f"{comp}@supplier.example"
-        phone = f"+100000{gi:07d}"
-        rows.append([comp, deterministic('Contact', gi), email, phone, deterministic('Addr', gi), f"Country_{gi%200}"])
-    write_csv_rows(fname, header, rows)
-    return str(fname)
-
-def gen_products_chunk(args):
-    start, end, idx = args
-    fname = OUT_DIR / f"products_{idx:03d}.csv"
-    header = ["category_id","product_name","description","brand","created_at"]
-    rows = []
-    for gi in range(start, end):
-        cat = (gi % SIZES['categories']) + 1
-        pname = deterministic('product', gi)
-        brand = deterministic('brand', gi % 1000)
-        rows.append([cat, pname, f"Product {gi} desc", brand, gi_to_iso(gi)])
-    write_csv_rows(fname, header, rows)
-    return str(fname)
-
-def gen_productvariants_chunk(args):
-    start, end, idx = args
-    fname = OUT_DIR / f"productvariants_{idx:03d}.csv"
-    header = ["product_id","sku","color","size","weight","base_price"]
-    rows = []
-    sizes = ['XS','S','M','L','XL']
-    for gi in range(start, end):
-        pid = (gi % SIZES['products']) + 1
-        sku = deterministic('SKU', gi)
-        color = f"Color_{gi%140}"
-        size = sizes[gi % 5]
-        weight = round(0.1 + (gi % 1000) * 0.01, 2)
-        price = round(5.0 + (gi % 5000) * 0.1, 2)
-        rows.append([pid, sku, color, size, weight, price])
-    write_csv_rows(fname, header, rows)
-    return str(fname)
-
-def gen_inventory_chunk(args):
-    start, end, idx = args
-    fname = OUT_DIR / f"inventory_{idx:03d}.csv"
-    header = ["warehouse_id","variant_id","quantity","last_updated"]
-    rows = []
-    for gi in range(start, end):
-        wid = (gi % SIZES['warehouses']) + 1
-        vid = (gi % SIZES['productvariants']) + 1
-        qty = gi % 2000
-        rows.append([wid, vid, qty, gi_to_iso(gi)])
-    write_csv_rows(fname, header, rows)
-    return str(fname)
-
-def gen_promotions_chunk(args):
-    start, end, idx = args
-    fname = OUT_DIR / f"promotions_{idx:03d}.csv"
-    header = ["promo_name","discount_percent","start_date","end_date"]
-    rows = []
-    for gi in range(start, end):
-        pname = deterministic('promo', gi)
-        disc = round((gi % 50) + 1, 2)
-        rows.append([pname, disc, gi_to_iso(gi), gi_to_iso(gi+1000)])
-    write_csv_rows(fname, header, rows)
-    return str(fname)
-
-def gen_taxes_chunk(args):
-    start, end, idx = args
-    fname = OUT_DIR / f"taxes_{idx:03d}.csv"
-    header = ["region","tax_rate"]
-    rows = []
-    for gi in range(start, end):
-        rows.append([f"Region_{gi%200}", round((gi % 25) + 0.5, 2)])
-    write_csv_rows(fname, header, rows)
-    return str(fname)
-
-def gen_orders_chunk(args):
-    start, end, idx = args
-    fname = OUT_DIR / f"orders_{idx:03d}.csv"
-    header = ["user_id","warehouse_id","order_date","region","currency_code","subtotal","tax_id","promo_id","total_amount","status"]
-    rows = []
-    statuses = ['pending','shipped','delivered']
-    for gi in range(start, end):
-        uid = (gi % SIZES['users']) + 1
-        wid = (gi % SIZES['warehouses']) + 1
-        subtotal = round(10.0 + (gi % 1000) * 0.5, 2)
-        tax = round(subtotal * 0.17, 2)
-        total = round(subtotal + tax, 2)
-        status = statuses[gi % 3]
-        rows.append([uid, wid, gi_to_iso(gi), f"Region_{gi%50}", 'USD', subtotal, '', '', total, status])
-    write_csv_rows(fname, header, rows)
-    return str(fname)
-
-def gen_orderitems_chunk(args):
-    start, end, idx = args
-    fname = OUT_DIR / f"orderitems_{idx:03d}.csv"
-    header = ["order_id","variant_id","quantity","unit_price"]
-    rows = []
-    for gi in range(start, end):
-        oid = (gi % SIZES['orders']) + 1
-        vid = (gi % SIZES['productvariants']) + 1
-        qty = (gi % 5) + 1
-        unit = round(5.0 + (gi % 400) * 0.25, 2)
-        rows.append([oid, vid, qty, unit])
-    write_csv_rows(fname, header, rows)
-    return str(fname)
-
-def gen_payments_chunk(args):
-    start, end, idx = args
-    fname = OUT_DIR / f"payments_{idx:03d}.csv"
-    header = ["order_id","payment_method","amount","payment_date","transaction_ref"]
-    rows = []
-    methods = ['card','paypal','transfer']
-    for gi in range(start, end):
-        oid = (gi % SIZES['orders']) + 1
-        amt = round(5.0 + (gi % 2000) * 0.5, 2)
-        tx = deterministic('TX', gi)
-        method = methods[gi % 3]
-        rows.append([oid, method, amt, gi_to_iso(gi), tx])
-    write_csv_rows(fname, header, rows)
-    return str(fname)
-
-def gen_vehicles_chunk(args):
-    start, end, idx = args
-    fname = OUT_DIR / f"vehicles_{idx:03d}.csv"
-    header = ["vehicle_type","license_plate","capacity_kg","status"]
-    rows = []
-    types = ['truck','van','bike']
-    states = ['available','in_service','maintenance']
-    for gi in range(start, end):
-        vtype = types[gi % 3]
-        plate = deterministic('PLATE', gi)
-        cap = 500 + (gi % 20000)
-        status = states[gi % 3]
-        rows.append([vtype, plate, cap, status])
-    write_csv_rows(fname, header, rows)
-    return str(fname)
-
-def gen_drivers_chunk(args):
-    start, end, idx = args
-    fname = OUT_DIR / f"drivers_{idx:03d}.csv"
-    header = ["user_id","license_number","phone_number","assigned_vehicle"]
-    rows = []
-    for gi in range(start, end):
-        user_id = (gi % SIZES['users']) + 1
-        lic = deterministic('LIC', gi)
-        phone = f"+200000{gi:07d}"
-        av = (gi % SIZES['vehicles']) + 1
-        rows.append([user_id, lic, phone, av])
-    write_csv_rows(fname, header, rows)
-    return str(fname)
-
-def gen_maintenancelogs_chunk(args):
-    start, end, idx = args
-    fname = OUT_DIR / f"maintenancelogs_{idx:03d}.csv"
-    header = ["vehicle_id","maintenance_date","description","cost","performed_by"]
-    rows = []
-    for gi in range(start, end):
-        vid = (gi % SIZES['vehicles']) + 1
-        desc = f"Maintenance entry {gi}"
-        cost = round(20.0 + (gi % 1000) * 0.5, 2)
-        perf = (gi % SIZES['users']) + 1
-        rows.append([vid, gi_to_iso(gi), desc, cost, perf])
-    write_csv_rows(fname, header, rows)
-    return str(fname)
-
-def gen_deliveryshipments_chunk(args):
-    start, end, idx = args
-    fname = OUT_DIR / f"deliveryshipments_{idx:03d}.csv"
-    header = ["order_id","vehicle_id","driver_id","start_time","end_time","status"]
-    rows = []
-    for gi in range(start, end):
-        oid = (gi % SIZES['orders']) + 1
-        vid = (gi % SIZES['vehicles']) + 1
-        did = (gi % SIZES['drivers']) + 1
-        st = gi_to_iso(gi)
-        et = gi_to_iso(gi+3600)
-        status = ['pending','in_transit','delivered'][gi % 3]
-        rows.append([oid, vid, did, st, et, status])
-    write_csv_rows(fname, header, rows)
-    return str(fname)
-
-def gen_deliveryroutes_chunk(args):
-    start, end, idx = args
-    fname = OUT_DIR / f"deliveryroutes_{idx:03d}.csv"
-    header = ["delivery_id","route_name","distance_km","estimated_time_min"]
-    rows = []
-    for gi in range(start, end):
-        did = (gi % SIZES['deliveryshipments']) + 1
-        rn = deterministic('route', gi)
-        dist = round(1.0 + (gi % 1000) * 0.1, 2)
-        et = (gi % 1440) + 10
-        rows.append([did, rn, dist, et])
-    write_csv_rows(fname, header, rows)
-    return str(fname)
-
-def gen_routestops_chunk(args):
-    start, end, idx = args
-    fname = OUT_DIR / f"routestops_{idx:03d}.csv"
-    header = ["route_id","stop_order","address","city","country","arrival_time","departure_time","status"]
-    rows = []
-    for gi in range(start, end):
-        rid = (gi % SIZES['deliveryroutes']) + 1
-        stop_order = (gi % 100) + 1
-        addr = deterministic('Addr', gi)
-        city = f"City_{gi%1000}"
-        country = f"Country_{gi%200}"
-        at = gi_to_iso(gi)
-        dt = gi_to_iso(gi+600)
-        status = ['pending','completed'][gi % 2]
-        rows.append([rid, stop_order, addr, city, country, at, dt, status])
-    write_csv_rows(fname, header, rows)
-    return str(fname)
-
-def gen_proofofdelivery_chunk(args):
-    start, end, idx = args
-    fname = OUT_DIR / f"proofofdelivery_{idx:03d}.csv"
-    header = ["stop_id","signature_url","photo_url","delivered_at"]
-    rows = []
-    for gi in range(start, end):
-        sid = (gi % SIZES['routestops']) + 1
-        sig = f"http://cdn.example/sign_{gi}.png"
-        photo = f"http://cdn.example/photo_{gi}.jpg"
-        rows.append([sid, sig, photo, gi_to_iso(gi)])
-    write_csv_rows(fname, header, rows)
-    return str(fname)
-
-def gen_purchaseorders_chunk(args):
-    start, end, idx = args
-    fname = OUT_DIR / f"purchaseorders_{idx:03d}.csv"
-    header = ["supplier_id","warehouse_id","order_date","status","total_amount"]
-    rows = []
-    for gi in range(start, end):
-        sup = (gi % SIZES['suppliers']) + 1
-        wh = (gi % SIZES['warehouses']) + 1
-        total = round(100.0 + (gi % 10000) * 1.5, 2)
-        status = ['pending','received'][gi % 2]
-        rows.append([sup, wh, gi_to_iso(gi), status, total])
-    write_csv_rows(fname, header, rows)
-    return str(fname)
-
-def gen_purchaseorderitems_chunk(args):
-    start, end, idx = args
-    fname = OUT_DIR / f"purchaseorderitems_{idx:03d}.csv"
-    header = ["po_id","variant_id","quantity_ordered","unit_price"]
-    rows = []
-    for gi in range(start, end):
-        po = (gi % SIZES['purchaseorders']) + 1
-        vid = (gi % SIZES['productvariants']) + 1
-        qty = (gi % 500) + 1
-        price = round(1.0 + (gi % 2000) * 0.5, 2)
-        rows.append([po, vid, qty, price])
-    write_csv_rows(fname, header, rows)
-    return str(fname)
-
-def gen_shipments_chunk(args):
-    start, end, idx = args
-    fname = OUT_DIR / f"shipments_{idx:03d}.csv"
-    header = ["po_id","shipped_date","received_date","tracking_number","status"]
-    rows = []
-    for gi in range(start, end):
-        po = (gi % SIZES['purchaseorders']) + 1
-        trk = deterministic('TRK', gi)
-        status = ['in_transit','received'][gi % 2]
-        rows.append([po, gi_to_iso(gi), gi_to_iso(gi+10000), trk, status])
-    write_csv_rows(fname, header, rows)
-    return str(fname)
-
-def gen_qualitychecks_chunk(args):
-    start, end, idx = args
-    fname = OUT_DIR / f"qualitychecks_{idx:03d}.csv"
-    header = ["shipment_id","checked_by","qc_date","result","remarks"]
-    rows = []
-    for gi in range(start, end):
-        sh = (gi % SIZES['shipments']) + 1
-        cb = (gi % SIZES['users']) + 1
-        res = ['pass','fail'][gi % 2]
-        rows.append([sh, cb, gi_to_iso(gi), res, f"QC remark {gi}"])
-    write_csv_rows(fname, header, rows)
-    return str(fname)
-
-# GEN_FUNCS mapping
-GEN_FUNCS = {
-    'categories': gen_categories_chunk,
-    'users': gen_users_chunk,
-    'roles': gen_roles_chunk,
-    'permissions': gen_permissions_chunk,
-    'rolepermissions': gen_rolepermissions_chunk,
-    'userroles': gen_userroles_chunk,
-    'warehouses': gen_warehouses_chunk,
-    'suppliers': gen_suppliers_chunk,
-    'products': gen_products_chunk,
-    'productvariants': gen_productvariants_chunk,
-    'inventory': gen_inventory_chunk,
-    'promotions': gen_promotions_chunk,
-    'taxes': gen_taxes_chunk,
-    'orders': gen_orders_chunk,
-    'orderitems': gen_orderitems_chunk,
-    'payments': gen_payments_chunk,
-    'vehicles': gen_vehicles_chunk,
-    'drivers': gen_drivers_chunk,
-    'maintenancelogs': gen_maintenancelogs_chunk,
-    'deliveryshipments': gen_deliveryshipments_chunk,
-    'deliveryroutes': gen_deliveryroutes_chunk,
-    'routestops': gen_routestops_chunk,
-    'proofofdelivery': gen_proofofdelivery_chunk,
-    'purchaseorders': gen_purchaseorders_chunk,
-    'purchaseorderitems': gen_purchaseorderitems_chunk,
-    'shipments': gen_shipments_chunk,
-    'qualitychecks': gen_qualitychecks_chunk
-}
+def db_connect(dbname=None):
+    return psycopg2.connect(host=DB_HOST, dbname=dbname or DB_NAME, user=DB_USER, password=DB_PASS, port=DB_PORT)
+
+def base_columns(table):
+    return list(SPECS[table].columns)
+
+def table_columns(table):
+    """Columns the chunks of `table` carry, in order (the PK first with EXPLICIT_IDS)"""
+    pk = primary_key_column(table) if EXPLICIT_IDS else None
+    return [pk] + base_columns(table) if pk else base_columns(table)
+
+def table_rows(table, start, end):
+    rows = GEN_FUNCS[table](start, end)
+    if EXPLICIT_IDS and primary_key_column(table):
+        return ([gi + 1] + r for gi, r in zip(count(start), rows))
+    return rows
+
+def iter_gi_batches(start, end, batch_rows=None):
+    batch_rows = batch_rows or VEC_BATCH_ROWS
+    for s in range(start, end, batch_rows):
+        yield np.arange(s, min(end, s + batch_rows), dtype=np.int64)
+
+def encode_csv_rows(rows):
+    buf = io.StringIO()
+    csv.writer(buf).writerows(rows)
+    return buf.getvalue().encode('utf-8')
+
+class StageClock:
+    """Seconds one chunk spends in each stage (generate, serialize, write, copy, commit).
+
+    With `trace` every timed span is also kept as (stage, pid, thread, start, seconds)
+    for the Chrome trace. `rss_kb` is the largest RSS seen at the end of a stage, i.e.
+    the chunk's peak memory at batch granularity.
+    """
+
+    def __init__(self, trace=None):
+        self.secs = defaultdict(float)
+        self.trace = TRACE if trace is None else trace
+        self.spans = []
+        self.rss_kb = None
+
+    @contextmanager
+    def stage(self, name):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            secs = time.perf_counter() - t0
+            self.secs[name] += secs
+            rss = current_rss_kb()
+            if rss is not None and (self.rss_kb is None or rss > self.rss_kb):
+                self.rss_kb = rss
+            if self.trace:
+                self.spans.append((name, os.getpid(), threading.current_thread().name, time.time() - secs, secs))
+
+def iter_csv_batches(table, start, end, batch_rows=PIPE_BATCH_ROWS, clock=None, fingerprint=None):
+    """Yield a chunk as CSV-encoded byte batches, header first, adding each batch to
+    `fingerprint` if given.
+
+    Only one batch of rows exists at a time and they are all encoded through the same
+    text buffer, so memory does not grow with the chunk size.
+    """
+    clock = clock or StageClock(trace=False)
+    yield encode_csv_rows([table_columns(table)])
+    if ENGINE == 'vector':
+        for gi in iter_gi_batches(start, end):
+            with clock.stage('generate'):
+                cols = vec_columns(table, gi)
+            if fingerprint is not None:
+                with clock.stage('checksum'):
+                    fingerprint.add(gi, cols)
+            with clock.stage('serialize'):
+                data = encode_csv_columns(cols)
+            yield data
+        return
+    rows = table_rows(table, start, end)
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    pos = start
+    while True:
+        with clock.stage('generate'):
+            batch = list(islice(rows, batch_rows))
+        if not batch:
+            break
+        if fingerprint is not None:
+            with clock.stage('checksum'):
+                fingerprint.add(np.arange(pos, pos + len(batch), dtype=np.int64))
+        pos += len(batch)
+        with clock.stage('serialize'):
+            writer.writerows(batch)
+            data = buf.getvalue().encode('utf-8')
+            buf.seek(0)
+            buf.truncate()
+        yield data
+
+class CopyPipe:
+    """Read-only file object for cursor.copy_expert().
+
+    A producer thread encodes batches into a bounded queue, so the next batch is
+    generated while the previous one is on the wire and at most `depth` batches
+    are ever held in memory.
+    """
+
+    def __init__(self, batches, depth=PIPE_DEPTH):
+        self._queue = queue.Queue(maxsize=depth)
+        self._closed = threading.Event()
+        self._error = None
+        self._cur = b''
+        self._pos = 0
+        self._eof = False
+        self.bytes_read = 0
+        self.gen_seconds = 0.0
+        self.crc = 0
+        self._thread = threading.Thread(target=self._produce, args=(batches,), name='generate', daemon=True)
+        self._thread.start()
+
+    def _put(self, item):
+        while not self._closed.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _produce(self, batches):
+        try:
+            it = iter(batches)
+            while True:
+                t = time.perf_counter()
+                b = next(it, None)
+                self.gen_seconds += time.perf_counter() - t
+                if b is None:
+                    break
+                self.crc = zlib.crc32(b, self.crc)
+                if not self._put(b):
+                    return
+        except Exception as e:
+            self._error = e
+        self._put(None)
+
+    def read(self, size=-1):
+        while self._pos >= len(self._cur):
+            if self._eof:
+                return b''
+            item = self._queue.get()
+            if item is None:
+                self._eof = True
+                if self._error is not None:
+                    raise self._error
+                return b''
+            self._cur, self._pos = item, 0
+        end = len(self._cur) if size is None or size < 0 else self._pos + size
+        data = self._cur[self._pos:end]
+        self._pos += len(data)
+        self.bytes_read += len(data)
+        return data
+
+    def lines(self):
+        """The payload as text lines, for backends that parse its rows instead of COPYing it"""
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        rest = ''
+        for data in iter(self.read, b''):
+            *lines, rest = (rest + decoder.decode(data)).split('\n')
+            for line in lines:
+                yield line + '\n'
+        if rest:
+            yield rest
+
+    def close(self):
+        self._closed.set()
+        self._thread.join()
+
+# ---------- VECTORIZED GENERATORS ----------
+# Column-at-a-time building blocks for Col.vec(). Each takes an int64 array of
+# global indexes and returns a column as a uint8 matrix (one row of bytes per
+# CSV row) where NUL bytes are padding; encode_csv_columns() drops the padding
+# in one pass. The encoded CSV is byte-identical to the row generators.
+_LUTS = {}
+
+def v_digits(a, width=1):
+    """Right-aligned decimal digits of a non-negative int array, zero-padded like f"{v:0{width}d}" """
+    a = np.asarray(a, dtype=np.int64)
+    top = int(a.max()) if len(a) else 0
+    w = max(width, len(str(top)))
+    out = np.zeros((len(a), w), dtype=np.uint8)
+    v = a.copy()
+    for i in range(w):
+        out[:, w - 1 - i] = np.where((v > 0) | (i < width), 48 + v % 10, 0)
+        v //= 10
+    return out
+
+def v_text(gi, value):
+    return np.broadcast_to(np.frombuffer(value.encode(), dtype=np.uint8), (len(gi), len(value.encode())))
+
+def v_strings(s):
+    s = np.ascontiguousarray(s)
+    return s.view(np.uint8).reshape(len(s), s.dtype.itemsize)
+
+def v_cat(*parts):
+    return np.concatenate(parts, axis=1)
+
+def v_cycle(gi, values):
+    return v_strings(np.array(values, dtype='S')[gi % len(values)])
+
+def v_lut(key, m, fn, gi):
+    """Column that only depends on gi % m: format the m distinct values once"""
+    lut = _LUTS.get((key, m))
+    if lut is None:
+        lut = _LUTS[(key, m)] = np.array([str(fn(k)).encode() for k in range(m)], dtype='S')
+    return v_strings(lut[gi % m])
+
+def v_ts(a):
+    """BASE_DATE + a seconds, formatted like gi_to_iso()"""
+    if len(a) == 0:
+        return np.zeros((0, 19), dtype=np.uint8)
+    day, sod = np.divmod(a + TIMESTAMPS.offset, 86400)
+    first = int(day.min())
+    dates = np.array([TIMESTAMPS.day_prefix(d).encode() for d in range(first, int(day.max()) + 1)], dtype='S')
+    return v_cat(v_strings(dates[day - first]), v_digits(sod // 3600, 2), v_text(a, ':'),
+                 v_digits(sod // 60 % 60, 2), v_text(a, ':'), v_digits(sod % 60, 2))
+
+def encode_csv_columns(cols):
+    n = len(cols[0])
+    if n == 0:
+        return b''
+    parts = []
+    for c in cols:
+        parts += [c, np.full((n, 1), ord(','), dtype=np.uint8)]
+    parts[-1] = np.broadcast_to(np.frombuffer(b'\r\n', dtype=np.uint8), (n, 2))
+    rows = np.concatenate(parts, axis=1)
+    return rows[rows != 0].tobytes()
+
+# ---------- TABLE SPECS ----------
+# Every table is declared once, as typed column expressions of the row's global
+# index gi. The specs give the row counts, chunk sizes and COPY column lists;
+# compile_rows() turns a spec into one per-row generator function, Col.vec()
+# builds the same column with NumPy, and binary COPY fields are encoded straight
+# from the integer values where the column type allows it. All paths produce the
+# same values.
+
+class Col:
+    """A column value as a function of gi"""
+
+    def setup(self, env):
+        """{local: expression} evaluated once per chunk by the compiled row generator"""
+        return {}
+
+    def src(self, env):
+        """Python expression of gi for compile_rows(); constants are bound into env"""
+        raise NotImplementedError
+
+    def vec(self, gi):
+        """The column for an int64 array of gi, as a NUL-padded uint8 matrix"""
+        raise NotImplementedError
+
+    def ints(self, gi):
+        """Integer values (seconds from BASE_DATE for timestamps), or None if not integral"""
+        return None
+
+    def nulls(self, gi):
+        """Boolean mask of NULL rows, or None"""
+        return None
+
+    def period(self, sizes):
+        """p such that the value at gi + p equals the value at gi, or None if values never repeat"""
+        return None
+
+    def bin_lut(self, sql_type, gi):
+        raise ValueError(f"{type(self).__name__} has no precomputed binary values")
+
+def _bin_lut(key, values, sql_type, k):
+    """Binary COPY fields (length prefix included) of a lookup table, and their byte masks, at k"""
+    lut = _LUTS.get(('binary', key, sql_type))
+    if lut is None:
+        encode = binary_field_encoder(sql_type)
+        fields = [encode(v) for v in values]
+        width = max(len(f) for f in fields)
+        mat = np.zeros((len(fields), width), dtype=np.uint8)
+        for i, f in enumerate(fields):
+            mat[i, :len(f)] = np.frombuffer(f, dtype=np.uint8)
+        mask = np.arange(width) < np.array([len(f) for f in fields])[:, None]
+        lut = _LUTS[('binary', key, sql_type)] = (mat, mask)
+    return lut[0][k], lut[1][k]
+
+def _bind(env, value):
+    name = f"_c{len(env)}"
+    env[name] = value
+    return name
+
+class Mod(Col):
+    """gi % m + add (gi + add without m)"""
+    m, add = None, 0
+
+    def __init__(self, m=None, add=0):
+        self.m, self.add = m, add
+
+    def src(self, env):
+        v = f"gi % {self.m}" if self.m else "gi"
+        return f"({v} + {self.add})" if self.add else v
+
+    def ints(self, gi):
+        return (gi % self.m if self.m else gi) + self.add
+
+    def period(self, sizes):
+        return self.m
+
+    def vec(self, gi):
+        return v_digits(self.ints(gi))
+
+    def bin_lut(self, sql_type, gi):
+        if not self.m:
+            return super().bin_lut(sql_type, gi)
+        return _bin_lut(self, [k + self.add for k in range(self.m)], sql_type, gi % self.m)
+
+class FK(Mod):
+    """Id of a parent row, cycling through all of them: gi % SIZES[parent] + 1"""
+
+    def __init__(self, parent):
+        self.parent = parent
+
+    def setup(self, env):
+        return {f"n_{self.parent}": f"SIZES[{self.parent!r}]"}
+
+    def src(self, env):
+        return f"(gi % n_{self.parent} + 1)"
+
+    def ints(self, gi):
+        return gi % SIZES[self.parent] + 1
+
+    def period(self, sizes):
+        return sizes[self.parent]
+
+class Cross(Mod):
+    """One side of the cross product of two parents (first varies fastest)"""
+
+    def __init__(self, first, second, side):
+        self.first, self.second, self.side = first, second, side
+
+    def setup(self, env):
+        return {f"n_{t}": f"SIZES[{t!r}]" for t in (self.first, self.second)}
+
+    def src(self, env):
+        op = '%' if self.side == 0 else '//'
+        return f"(gi % (n_{self.first} * n_{self.second}) {op} n_{self.first} + 1)"
+
+    def ints(self, gi):
+        j = gi % (SIZES[self.first] * SIZES[self.second])
+        return (j % SIZES[self.first] if self.side == 0 else j // SIZES[self.first]) + 1
+
+    def period(self, sizes):
+        return sizes[self.first] * sizes[self.second]
+
+class Fmt(Col):
+    """f"{prefix}{v:0{width}d}{suffix}" with v = gi, or gi % mod"""
+
+    def __init__(self, prefix, width=1, suffix='', mod=None):
+        self.prefix, self.width, self.suffix, self.mod = prefix, width, suffix, mod
+
+    def format(self, v):
+        return f"{self.prefix}{v:0{self.width}d}{self.suffix}"
+
+    def period(self, sizes):
+        return self.mod
+
+    def src(self, env):
+        if self.mod:
+            return f"{_bind(env, [self.format(k) for k in range(self.mod)])}[gi % {self.mod}]"
+        esc = lambda s: s.replace('{', '{{').replace('}', '}}')
+        spec = f":0{self.width}d" if self.width > 1 else ''
+        return 'f' + repr(f"{esc(self.prefix)}{{gi{spec}}}{esc(self.suffix)}")
+
+    def vec(self, gi):
+        if self.mod:
+            return v_lut(self, self.mod, self.format, gi)
+        return v_cat(v_text(gi, self.prefix), v_digits(gi, self.width), v_text(gi, self.suffix))
+
+def Det(prefix, width=9, suffix='', mod=None):
+    """Prefixed id, like deterministic(prefix, gi, width)"""
+    return Fmt(f"{prefix}_", width, suffix, mod)
+
+class Lut(Col):
+    """Any value that only depends on gi % m; the m values are computed once"""
+
+    def __init__(self, m, fn):
+        self.m, self.fn = m, fn
+        self._values = None
+
+    @property
+    def values(self):
+        if self._values is None:
+            self._values = [self.fn(k) for k in range(self.m)]
+        return self._values
+
+    def src(self, env):
+        return f"{_bind(env, self.values)}[gi % {self.m}]"
+
+    def period(self, sizes):
+        return self.m
+
+    def vec(self, gi):
+        return v_lut(self, self.m, self.fn, gi)
+
+    def bin_lut(self, sql_type, gi):
+        return _bin_lut(self, self.values, sql_type, gi % self.m)
+
+class Num(Lut):
+    """Linear numeric: round(base + (gi % m) * step, 2)"""
+
+    def __init__(self, base, step, m):
+        super().__init__(m, lambda k: round(base + k * step, 2))
+
+class Ts(Col):
+    """Timestamp BASE_DATE + gi + offset seconds"""
+
+    def __init__(self, offset=0):
+        self.offset = offset
+
+    def src(self, env):
+        return f"ts(gi + {self.offset})" if self.offset else "ts(gi)"
+
+    def ints(self, gi):
+        return gi + self.offset
+
+    def vec(self, gi):
+        return v_ts(gi + self.offset if self.offset else gi)
+
+class Cycle(Col):
+    """values[gi % len(values)]"""
+
+    def __init__(self, *values):
+        self.values = list(values)
+
+    def src(self, env):
+        return f"{_bind(env, tuple(self.values))}[gi % {len(self.values)}]"
+
+    def vec(self, gi):
+        return v_cycle(gi, self.values)
+
+    def period(self, sizes):
+        return len(self.values)
+
+class Const(Col):
+    """The same value on every row; '' is NULL"""
+
+    def __init__(self, value):
+        self.value = value
+
+    def src(self, env):
+        return repr(self.value)
+
+    def period(self, sizes):
+        return 1
+
+    def vec(self, gi):
+        return v_text(gi, self.value)
+
+    def ints(self, gi):
+        return np.zeros(len(gi), dtype=np.int64) if self.value == '' else None
+
+    def nulls(self, gi):
+        return np.full(len(gi), True) if self.value == '' else None
+
+class Every(Col):
+    """`col` on every n-th row except gi 0, NULL elsewhere"""
+
+    def __init__(self, n, col):
+        self.n, self.col = n, col
+
+    def setup(self, env):
+        return self.col.setup(env)
+
+    def src(self, env):
+        return f"({self.col.src(env)} if gi % {self.n} == 0 and gi != 0 else '')"
+
+    def _mask(self, gi):
+        return (gi % self.n == 0) & (gi != 0)
+
+    def vec(self, gi):
+        return np.where(self._mask(gi)[:, None], self.col.vec(gi), 0).astype(np.uint8)
+
+    def ints(self, gi):
+        return self.col.ints(gi)
+
+    def nulls(self, gi):
+        return ~self._mask(gi)
+
+# counter-based randomness: value i of a stream is splitmix64(i ^ key), so any gi can be
+# drawn on its own, in any chunk and on any worker, with the same result
+_M64 = (1 << 64) - 1
+_U53 = 1 << 53
+
+def splitmix64(x):
+    z = (x + 0x9E3779B97F4A7C15) & _M64
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & _M64
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & _M64
+    return z ^ (z >> 31)
+
+def v_splitmix64(x):
+    z = x + np.uint64(0x9E3779B97F4A7C15)
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return z ^ (z >> np.uint64(31))
+
+def stream_key(salt):
+    return splitmix64(((SEED & 0xFFFFFFFF) << 32) ^ zlib.crc32(salt.encode()))
+
+def _cum_u53(weights):
+    """Cumulative weights as integer upper bounds on [0, 2**53), compared against hash bits"""
+    total = float(sum(weights))
+    cum, acc = [], 0.0
+    for w in weights:
+        acc += w
+        cum.append(min(_U53, int(acc / total * _U53)))
+    cum[-1] = _U53
+    return cum
+
+@lru_cache(maxsize=None)
+def zipf_table(n, s):
+    """Buckets (first rank, width, cumulative bound) for ranks 1..n with P(r) ~ r**-s.
+
+    Ranks up to 1024 get a bucket each, the tail geometric buckets 1% wide; a rank is
+    drawn uniformly inside its bucket, so tables stay small for any n.
+    """
+    starts = list(range(1, min(n, 1024) + 1))
+    while starts[-1] < n:
+        starts.append(min(n, max(starts[-1] + 1, int(starts[-1] * 1.01))))
+    ends = starts[1:] + [n + 1]
+    if s == 1:
+        mass = lambda a, b: math.log((b - 0.5) / (a - 0.5))
+    else:
+        mass = lambda a, b: ((b - 0.5) ** (1 - s) - (a - 0.5) ** (1 - s)) / (1 - s)
+    weights = [a ** -s if b - a == 1 else mass(a, b) for a, b in zip(starts, ends)]
+    return starts, [b - a for a, b in zip(starts, ends)], _cum_u53(weights)
+
+@lru_cache(maxsize=None)
+def v_zipf_table(n, s):
+    return tuple(np.array(a, dtype=np.uint64) for a in zipf_table(n, s))
+
+def _scatter(n):
+    """Multiplier coprime to n: rank -> id spreads the popular ids over the whole key range"""
+    p = int(n * 0.6180339887) + 1
+    while math.gcd(p, n) != 1:
+        p += 1
+    return p
+
+class Zipf(FK):
+    """FK to `parent` with Zipf(s) popularity under DISTRIBUTION = "skewed", round-robin otherwise"""
+
+    def __init__(self, parent, s=0.9, salt=None):
+        super().__init__(parent)
+        self.s = s
+        self.salt = salt or f"zipf.{parent}"
+
+    def sampler(self, n):
+        """gi -> id for compiled row generators, or None when not skewed"""
+        if DISTRIBUTION != 'skewed':
+            return None
+        starts, widths, cum = zipf_table(n, self.s)
+        key, p = stream_key(self.salt), _scatter(n)
+
+        def draw(gi):
+            h = splitmix64(gi ^ key)
+            j = bisect_right(cum, h >> 11)
+            rank = starts[j] + splitmix64(h) % widths[j]
+            return (rank - 1) * p % n + 1
+        return draw
+
+    def setup(self, env):
+        env[f"_col{id(self)}"] = self
+        return {**super().setup(env), f"draw{id(self)}": f"_col{id(self)}.sampler(n_{self.parent})"}
+
+    def src(self, env):
+        draw = f"draw{id(self)}"
+        return f"({draw}(gi) if {draw} else gi % n_{self.parent} + 1)"
+
+    def ints(self, gi):
+        if DISTRIBUTION != 'skewed':
+            return super().ints(gi)
+        n = SIZES[self.parent]
+        starts, widths, cum = v_zipf_table(n, self.s)
+        h = v_splitmix64(gi.astype(np.uint64) ^ np.uint64(stream_key(self.salt)))
+        j = np.searchsorted(cum, h >> np.uint64(11), side='right')
+        rank = (starts[j] + v_splitmix64(h) % widths[j]).astype(np.int64)
+        return (rank - 1) * _scatter(n) % n + 1
+
+    def period(self, sizes):
+        return None if DISTRIBUTION == 'skewed' else super().period(sizes)
+
+class Daily(Ts):
+    """Timestamp on day (gi // 86400) at an HOURLY_WEIGHTS-weighted time of day, plus offset
+    seconds, under DISTRIBUTION = "skewed"; BASE_DATE + gi + offset otherwise. Columns with the
+    same salt share the draw, so e.g. a start and an end time stay `offset` apart."""
+
+    def __init__(self, offset=0, salt='daily'):
+        super().__init__(offset)
+        self.salt = salt
+
+    def sampler(self):
+        if DISTRIBUTION != 'skewed':
+            return None
+        key, cum = stream_key(self.salt), _cum_u53(HOURLY_WEIGHTS)
+
+        def draw(gi):
+            h = splitmix64(gi ^ key)
+            return gi - gi % 86400 + bisect_right(cum, h >> 11) * 3600 + splitmix64(h) % 3600
+        return draw
+
+    def setup(self, env):
+        env[f"_col{id(self)}"] = self
+        return {f"draw{id(self)}": f"_col{id(self)}.sampler()"}
+
+    def src(self, env):
+        draw = f"draw{id(self)}"
+        return f"ts(({draw}(gi) if {draw} else gi) + {self.offset})"
+
+    def ints(self, gi):
+        if DISTRIBUTION != 'skewed':
+            return super().ints(gi)
+        h = v_splitmix64(gi.astype(np.uint64) ^ np.uint64(stream_key(self.salt)))
+        hour = np.searchsorted(np.array(_cum_u53(HOURLY_WEIGHTS), dtype=np.uint64), h >> np.uint64(11), side='right')
+        return gi - gi % 86400 + hour * 3600 + (v_splitmix64(h) % np.uint64(3600)).astype(np.int64) + self.offset
+
+    def vec(self, gi):
+        return v_ts(self.ints(gi))
+
+def vocab_path(kind):
+    return VOCAB_DIR / f"{kind}.{VOCAB_LOCALE}.{SEED}.{VOCAB_POOL_SIZE}.npy"
+
+def build_vocab(kind):
+    """VOCAB_POOL_SIZE seeded Faker values of `kind`, without the characters CSV would quote"""
+    if Faker is None:
+        raise SystemExit("--text faker needs Faker (pip install -r requirements.txt)")
+    fake = Faker(VOCAB_LOCALE)
+    fake.seed_instance(stream_key(f"vocab.{kind}"))
+    make = getattr(fake, kind)
+    return [re.sub(r'\s*[,"\r\n]+\s*', ' ', make()).strip() for _ in range(VOCAB_POOL_SIZE)]
+
+@lru_cache(maxsize=None)
+def vocab_array(kind):
+    """The pool of `kind` as a read-only memory-mapped bytes array, built on first use"""
+    path = vocab_path(kind)
+    if not path.exists():
+        print(f"Building the {kind} pool ({VOCAB_POOL_SIZE} Faker values, cached in {path})")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(tmp, 'wb') as f:
+            np.save(f, np.array([v.encode() for v in build_vocab(kind)], dtype='S'))
+        os.replace(tmp, path)
+    return np.load(path, mmap_mode='r')
+
+@lru_cache(maxsize=None)
+def vocab_values(kind):
+    return [v.decode() for v in vocab_array(kind)]
+
+def ensure_vocab():
+    """Build the pools of every Vocab column before workers start, so they only map them"""
+    for spec in TABLES:
+        for col in spec.columns.values():
+            if isinstance(col, Vocab):
+                vocab_array(col.kind)
+
+class Vocab(Col):
+    """A Faker `kind` value (name, city, street_address, company, user_name) picked from its
+    pool by a hash of gi under TEXT = "faker", `fallback` otherwise. unique=True appends
+    ".{gi}{suffix}", so UNIQUE columns never repeat; columns with the same salt pick the
+    same pool entry."""
+
+    def __init__(self, kind, fallback, unique=False, suffix='', salt=None):
+        self.kind, self.fallback = kind, fallback
+        self.unique, self.suffix = unique, suffix
+        self.salt = salt or f"vocab.{kind}"
+
+    def sampler(self):
+        if TEXT != 'faker':
+            return None
+        pool, key, n, suffix = vocab_values(self.kind), stream_key(self.salt), VOCAB_POOL_SIZE, self.suffix
+        if self.unique:
+            return lambda gi: f"{pool[splitmix64(gi ^ key) % n]}.{gi}{suffix}"
+        return lambda gi: pool[splitmix64(gi ^ key) % n]
+
+    def setup(self, env):
+        env[f"_col{id(self)}"] = self
+        return {**self.fallback.setup(env), f"draw{id(self)}": f"_col{id(self)}.sampler()"}
+
+    def src(self, env):
+        draw = f"draw{id(self)}"
+        return f"({draw}(gi) if {draw} else {self.fallback.src(env)})"
+
+    def vec(self, gi):
+        if TEXT != 'faker':
+            return self.fallback.vec(gi)
+        h = v_splitmix64(gi.astype(np.uint64) ^ np.uint64(stream_key(self.salt)))
+        col = v_strings(vocab_array(self.kind)[(h % np.uint64(VOCAB_POOL_SIZE)).astype(np.int64)])
+        if self.unique:
+            col = v_cat(col, v_text(gi, '.'), v_digits(gi), v_text(gi, self.suffix))
+        return col
+
+    def period(self, sizes):
+        return None if TEXT == 'faker' else self.fallback.period(sizes)
+
+def format_cents(c):
+    return f"{c // 100}.{c % 100:02d}"
+
+def v_money(c):
+    return v_cat(v_digits(c // 100), v_text(c, '.'), v_digits(c % 100, 2))
+
+def col_cents(col, gi):
+    """Money column values in integer cents"""
+    if isinstance(col, Derived):
+        return col.cents(gi) if col.on() else col_cents(col.legacy, gi)
+    if isinstance(col, Lut):
+        lut = _LUTS.get(('cents', col))
+        if lut is None:
+            lut = _LUTS[('cents', col)] = np.array([round(v * 100) for v in col.values], dtype=np.int64)
+        return lut[gi % col.m]
+    return col.ints(gi) * 100
+
+class Derived(Col):
+    """Money column derived from related rows under AGGREGATES = "consistent", `legacy` otherwise.
+
+    Subclasses compute the value in integer cents for an array of gi with cents(); the
+    compiled row generator calls it for PIPE_BATCH_ROWS rows at a time, so both engines
+    give identical values.
+    """
+
+    def __init__(self, legacy):
+        self.legacy = legacy
+
+    def on(self):
+        return AGGREGATES == 'consistent'
+
+    def cents(self, gi):
+        raise NotImplementedError
+
+    def chunk_values(self, start, end):
+        """gi -> formatted value for increasing gi in [start, end), computed a batch ahead,
+        or None when not on"""
+        if not self.on():
+            return None
+        block = [start, start, []]   # first gi, end, values
+
+        def value(gi):
+            if gi >= block[1]:
+                hi = min(end, gi + PIPE_BATCH_ROWS)
+                values = self.cents(np.arange(gi, hi, dtype=np.int64)).tolist()
+                block[:] = [gi, hi, [format_cents(c) for c in values]]
+            return block[2][gi - block[0]]
+        return value
+
+    def setup(self, env):
+        env[f"_col{id(self)}"] = self
+        return {**self.legacy.setup(env), f"derived{id(self)}": f"_col{id(self)}.chunk_values(start, end)"}
+
+    def src(self, env):
+        d = f"derived{id(self)}"
+        return f"({d}(gi) if {d} is not None else {self.legacy.src(env)})"
+
+    def vec(self, gi):
+        return v_money(self.cents(gi)) if self.on() else self.legacy.vec(gi)
+
+    def ints(self, gi):
+        return None if self.on() else self.legacy.ints(gi)
+
+    def nulls(self, gi):
+        return None if self.on() else self.legacy.nulls(gi)
+
+    def bin_lut(self, sql_type, gi):
+        if not self.on():
+            return self.legacy.bin_lut(sql_type, gi)
+        return v_bin_numeric_cents(self.cents(gi), sql_type)
+
+    def period(self, sizes):
+        return None if self.on() else self.legacy.period(sizes)
+
+class ChildSum(Derived):
+    """Sum of qty * price over the `child` rows whose `via` FK points at this row.
+
+    The FK must be round-robin (child gi -> parent gi % N), so the children of parent
+    gi are gi, gi + N, gi + 2N, ... below SIZES[child]: the sum is evaluated from the
+    child column specs without generating or scanning the child table.
+    """
+
+    def __init__(self, legacy, child, via, qty, price):
+        super().__init__(legacy)
+        self.child, self.via, self.qty, self.price = child, via, qty, price
+
+    def cents(self, gi):
+        cols = SPECS[self.child].columns
+        fk = cols[self.via]
+        if type(fk) is not FK:
+            raise ValueError(f"{self.child}.{self.via} must be a round-robin FK to sum its children")
+        n, rows = SIZES[fk.parent], SIZES[self.child]
+        total = np.zeros(len(gi), dtype=np.int64)
+        if len(gi) == 0:
+            return total
+        for j in range(max(0, -(-(rows - int(gi.min())) // n))):
+            child = gi + j * n
+            valid = child < rows
+            child = np.where(valid, child, 0)
+            line = cols[self.qty].ints(child) * col_cents(cols[self.price], child)
+            total += np.where(valid, line, 0)
+        return total
+
+class WithTax(Derived):
+    """Another money column of the same row plus `pct` percent tax, rounded half up"""
+
+    def __init__(self, legacy, base, pct):
+        super().__init__(legacy)
+        self.base, self.pct = base, pct
+
+    def cents(self, gi):
+        b = col_cents(SPECS[self.table].columns[self.base], gi)
+        return b + (b * self.pct + 50) // 100
+
+class ParentValue(Derived):
+    """A money column of the parent row the `via` FK points at"""
+
+    def __init__(self, legacy, via, parent, column):
+        super().__init__(legacy)
+        self.via, self.parent, self.column = via, parent, column
+
+    def cents(self, gi):
+        parent_gi = SPECS[self.table].columns[self.via].ints(gi) - 1
+        return col_cents(SPECS[self.parent].columns[self.column], parent_gi)
+
+class TableSpec:
+    def __init__(self, name, rows, chunk_size, scaled=True, **columns):
+        self.name = name
+        self.rows = rows
+        self.chunk_size = chunk_size
+        self.scaled = scaled     # False for reference data that --scale leaves alone
+        self.columns = columns   # {column: Col}, in COPY order
+        for col in columns.values():
+            col.table = name
+
+def _order_amounts(k):
+    subtotal = round(10.0 + k * 0.5, 2)
+    return subtotal, round(subtotal + round(subtotal * 0.17, 2), 2)
+
+TABLES = [
+    TableSpec('categories', 50, 50, scaled=False,
+              parent_id=Every(10, FK('categories')), category_name=Det('category', 4),
+              description=Fmt('Category desc ')),
+    TableSpec('users', 200000, 50000,
+              username=Vocab('user_name', Det('user'), unique=True, salt='vocab.login'), password_hash=Det('hash', 12),
+              email=Vocab('user_name', Det('user', suffix='@example.com'), unique=True, suffix='@example.com',
+                          salt='vocab.login'),
+              full_name=Vocab('name', Det('UserFull')), user_type=Const('customer'), created_at=Ts()),
+    TableSpec('roles', 5, 5, scaled=False, role_name=Det('role'), description=Fmt('Role ')),
+    TableSpec('permissions', 15, 15, scaled=False, permission_name=Det('permission'), description=Fmt('Permission ')),
+    TableSpec('rolepermissions', 50, 50, scaled=False,
+              role_id=Cross('roles', 'permissions', 0), permission_id=Cross('roles', 'permissions', 1)),
+    TableSpec('userroles', 200000, 50000, user_id=FK('users'), role_id=FK('roles')),
+    TableSpec('warehouses', 10, 10, scaled=False,
+              warehouse_name=Det('wh'), location_country=Fmt('Country_', mod=200),
+              location_city=Vocab('city', Fmt('City_', mod=1000)), address=Vocab('street_address', Det('Address')),
+              capacity=Mod(100000, 1000)),
+    TableSpec('suppliers', 1000, 250,
+              company_name=Vocab('company', Det('supplier', 6)), contact_name=Vocab('name', Det('Contact')),
+              contact_email=Det('supplier', 6, '@supplier.example'), phone=Fmt('+100000', 7),
+              address=Vocab('street_address', Det('Addr')), country=Fmt('Country_', mod=200)),
+    TableSpec('products', 4000, 1000,
+              category_id=Zipf('categories', 1.0), product_name=Det('product'), description=Fmt('Product ', suffix=' desc'),
+              brand=Det('brand', mod=1000), created_at=Ts()),
+    TableSpec('productvariants', 20000, 5000,
+              product_id=FK('products'), sku=Det('SKU'), color=Fmt('Color_', mod=140),
+              size=Cycle('XS', 'S', 'M', 'L', 'XL'), weight=Num(0.1, 0.01, 1000), base_price=Num(5.0, 0.1, 5000)),
+    TableSpec('inventory', 40000, 10000,
+              warehouse_id=FK('warehouses'), variant_id=FK('productvariants'), quantity=Mod(2000),
+              last_updated=Ts()),
+    TableSpec('promotions', 200, 200, scaled=False,
+              promo_name=Det('promo'), discount_percent=Num(1, 1, 50), start_date=Ts(), end_date=Ts(1000)),
+    TableSpec('taxes', 200, 200, scaled=False, region=Fmt('Region_', mod=200), tax_rate=Num(0.5, 1, 25)),
+    TableSpec('orders', 1000000, 100000,
+              user_id=Zipf('users'), warehouse_id=FK('warehouses'), order_date=Daily(), region=Fmt('Region_', mod=50),
+              currency_code=Const('USD'),
+              subtotal=ChildSum(Lut(1000, lambda k: _order_amounts(k)[0]), 'orderitems', 'order_id',
+                                'quantity', 'unit_price'),
+              tax_id=Const(''), promo_id=Const(''),
+              total_amount=WithTax(Lut(1000, lambda k: _order_amounts(k)[1]), 'subtotal', 17),
+              status=Cycle('pending', 'shipped', 'delivered')),
+    TableSpec('orderitems', 10000000, 200000,
+              order_id=FK('orders'), variant_id=Zipf('productvariants'), quantity=Mod(5, 1),
+              unit_price=Num(5.0, 0.25, 400)),
+    TableSpec('payments', 1000000, 100000,
+              order_id=FK('orders'), payment_method=Cycle('card', 'paypal', 'transfer'),
+              amount=ParentValue(Num(5.0, 0.5, 2000), 'order_id', 'orders', 'total_amount'),
+              payment_date=Daily(), transaction_ref=Det('TX')),
+    TableSpec('vehicles', 200, 200,
+              vehicle_type=Cycle('truck', 'van', 'bike'), license_plate=Det('PLATE'), capacity_kg=Mod(20000, 500),
+              status=Cycle('available', 'in_service', 'maintenance')),
+    TableSpec('drivers', 500, 250,
+              user_id=FK('users'), license_number=Det('LIC'), phone_number=Fmt('+200000', 7),
+              assigned_vehicle=FK('vehicles')),
+    TableSpec('maintenancelogs', 200000, 50000,
+              vehicle_id=FK('vehicles'), maintenance_date=Ts(), description=Fmt('Maintenance entry '),
+              cost=Num(20.0, 0.5, 1000), performed_by=FK('users')),
+    TableSpec('deliveryshipments', 500000, 100000,
+              order_id=FK('orders'), vehicle_id=FK('vehicles'), driver_id=FK('drivers'), start_time=Daily(),
+              end_time=Daily(3600), status=Cycle('pending', 'in_transit', 'delivered')),
+    TableSpec('deliveryroutes', 500000, 100000,
+              delivery_id=FK('deliveryshipments'), route_name=Det('route'), distance_km=Num(1.0, 0.1, 1000),
+              estimated_time_min=Mod(1440, 10)),
+    TableSpec('routestops', 400000, 100000,
+              route_id=FK('deliveryroutes'), stop_order=Mod(100, 1), address=Vocab('street_address', Det('Addr')),
+              city=Vocab('city', Fmt('City_', mod=1000)), country=Fmt('Country_', mod=200), arrival_time=Ts(),
+              departure_time=Ts(600), status=Cycle('pending', 'completed')),
+    TableSpec('proofofdelivery', 400000, 100000,
+              stop_id=FK('routestops'), signature_url=Fmt('http://cdn.example/sign_', suffix='.png'),
+              photo_url=Fmt('http://cdn.example/photo_', suffix='.jpg'), delivered_at=Ts()),
+    TableSpec('purchaseorders', 200000, 50000,
+              supplier_id=FK('suppliers'), warehouse_id=FK('warehouses'), order_date=Ts(),
+              status=Cycle('pending', 'received'),
+              total_amount=ChildSum(Num(100.0, 1.5, 10000), 'purchaseorderitems', 'po_id',
+                                    'quantity_ordered', 'unit_price')),
+    TableSpec('purchaseorderitems', 1000000, 100000,
+              po_id=FK('purchaseorders'), variant_id=Zipf('productvariants', salt='zipf.restock'),
+              quantity_ordered=Mod(500, 1),
+              unit_price=Num(1.0, 0.5, 2000)),
+    TableSpec('shipments', 200000, 50000,
+              po_id=FK('purchaseorders'), shipped_date=Ts(), received_date=Ts(10000), tracking_number=Det('TRK'),
+              status=Cycle('in_transit', 'received')),
+    TableSpec('qualitychecks', 200000, 50000,
+              shipment_id=FK('shipments'), checked_by=FK('users'), qc_date=Ts(), result=Cycle('pass', 'fail'),
+              remarks=Fmt('QC remark ')),
+]
+SPECS = {spec.name: spec for spec in TABLES}
+
+# table sizes and chunk sizes (tune them in TABLES, or here at runtime)
+SIZES = {spec.name: spec.rows for spec in TABLES}
+CHUNK_SIZES = {spec.name: spec.chunk_size for spec in TABLES}
+
+def compile_rows(spec):
+    """Build the per-row generator of a spec as a single Python function"""
+    env = {'_G': globals(), 'ts': TIMESTAMPS.format}
+    setup = {}
+    for col in spec.columns.values():
+        setup.update(col.setup(env))
+    exprs = [col.src(env) for col in spec.columns.values()]
+    lines = [f"def gen_{spec.name}_chunk(start, end):", "    SIZES = _G['SIZES']"]
+    lines += [f"    {name} = {expr}" for name, expr in setup.items()]
+    lines += ["    for gi in range(start, end):", f"        yield [{', '.join(exprs)}]"]
+    source = '\n'.join(lines) + '\n'
+    exec(compile(source, f"<spec {spec.name}>", 'exec'), env)
+    gen = env[f"gen_{spec.name}_chunk"]
+    gen.source = source
+    return gen
+
+# Each function yields the rows of global indexes [start, end) in COPY column order.
+GEN_FUNCS = {spec.name: compile_rows(spec) for spec in TABLES}
+
+COPY_SQL = {spec.name: f"COPY {spec.name}({','.join(spec.columns)}) FROM STDIN WITH CSV HEADER DELIMITER ','"
+            for spec in TABLES}
+
+def table_specs(table):
+    """(column, Col) pairs of the table's COPY column list (the PK first with EXPLICIT_IDS)"""
+    cols = list(SPECS[table].columns.items())
+    pk = primary_key_column(table) if EXPLICIT_IDS else None
+    return [(pk, Mod(add=1))] + cols if pk else cols
+
+def vec_columns(table, gi):
+    return [col.vec(gi) for _, col in table_specs(table)]
 
 # generation driver
-def generate_table(table):
+def subtract_ranges(start, end, covered):
+    """Parts of [start, end) not covered by the sorted (start, end) ranges in `covered`"""
+    gaps, pos = [], start
+    for cs, ce in covered:
+        if ce <= pos or cs >= end:
+            continue
+        if cs > pos:
+            gaps.append((pos, cs))
+        pos = max(pos, ce)
+    if pos < end:
+        gaps.append((pos, end))
+    return gaps
+
+def table_tasks(table, committed=()):
+    """(table, start, end, idx) chunk tasks, skipping gi ranges already committed and,
+    with SHARD, chunks that belong to other shards"""
     total = SIZES[table]
     chunk_size = CHUNK_SIZES.get(table, 1000)
     ranges = chunk_ranges(total, chunk_size)
-    args = [(r[0], r[1], r[2]) for r in ranges]
-    print(f"Generating {table}: {total} rows in {len(args)} chunks (chunk_size={chunk_size})")
-    with Pool(WORKERS) as p:
-        results = list(tqdm(p.imap(GEN_FUNCS[table], args), total=len(args)))
-    return results
-
-# COPY SQL map
-COPY_SQL = {
-    'categories': "COPY categories(parent_id,category_name,description) FROM STDIN WITH CSV HEADER DELIMITER ','",
-    'users': "COPY users(username,password_hash,email,full_name,user_type,created_at) FROM STDIN WITH CSV HEADER DELIMITER ','",
-    'roles': "COPY roles(role_name,description) FROM STDIN WITH CSV HEADER DELIMITER ','",
-    'permissions': "COPY permissions(permission_name,description) FROM STDIN WITH CSV HEADER DELIMITER ','",
-    'rolepermissions': "COPY rolepermissions(role_id,permission_id) FROM STDIN WITH CSV HEADER DELIMITER ','",
-    'userroles': "COPY userroles(user_id,role_id) FROM STDIN WITH CSV HEADER DELIMITER ','",
-    'warehouses': "COPY warehouses(warehouse_name,location_country,location_city,address,capacity) FROM STDIN WITH CSV HEADER DELIMITER ','",
-    'suppliers': "COPY suppliers(company_name,contact_name,contact_email,phone,address,country) FROM STDIN WITH CSV HEADER DELIMITER ','",
-    'products': "COPY products(category_id,product_name,description,brand,created_at) FROM STDIN WITH CSV HEADER DELIMITER ','",
-    'productvariants': "COPY productvariants(product_id,sku,color,size,weight,base_price) FROM STDIN WITH CSV HEADER DELIMITER ','",
-    'inventory': "COPY inventory(warehouse_id,variant_id,quantity,last_updated) FROM STDIN WITH CSV HEADER DELIMITER ','",
-    'promotions': "COPY promotions(promo_name,discount_percent,start_date,end_date) FROM STDIN WITH CSV HEADER DELIMITER ','",
-    'taxes': "COPY taxes(region,tax_rate) FROM STDIN WITH CSV HEADER DELIMITER ','",
-    'orders': "COPY orders(user_id,warehouse_id,order_date,region,currency_code,subtotal,tax_id,promo_id,total_amount,status) FROM STDIN WITH CSV HEADER DELIMITER ','",
-    'orderitems': "COPY orderitems(order_id,variant_id,quantity,unit_price) FROM STDIN WITH CSV HEADER DELIMITER ','",
-    'payments': "COPY payments(order_id,payment_method,amount,payment_date,transaction_ref) FROM STDIN WITH CSV HEADER DELIMITER ','",
-    'vehicles': "COPY vehicles(vehicle_type,license_plate,capacity_kg,status) FROM STDIN WITH CSV HEADER DELIMITER ','",
-    'drivers': "COPY drivers(user_id,license_number,phone_number,assigned_vehicle) FROM STDIN WITH CSV HEADER DELIMITER ','",
-    'maintenancelogs': "COPY maintenancelogs(vehicle_id,maintenance_date,description,cost,performed_by) FROM STDIN WITH CSV HEADER DELIMITER ','",
-    'deliveryshipments': "COPY deliveryshipments(order_id,vehicle_id,driver_id,start_time,end_time,status) FROM STDIN WITH CSV HEADER DELIMITER ','",
-    'deliveryroutes': "COPY deliveryroutes(delivery_id,route_name,distance_km,estimated_time_min) FROM STDIN WITH CSV HEADER DELIMITER ','",
-    'routestops': "COPY routestops(route_id,stop_order,address,city,country,arrival_time,departure_time,status) FROM STDIN WITH CSV HEADER DELIMITER ','",
-    'proofofdelivery': "COPY proofofdelivery(stop_id,signature_url,photo_url,delivered_at) FROM STDIN WITH CSV HEADER DELIMITER ','",
-    'purchaseorders': "COPY purchaseorders(supplier_id,warehouse_id,order_date,status,total_amount) FROM STDIN WITH CSV HEADER DELIMITER ','",
-    'purchaseorderitems': "COPY purchaseorderitems(po_id,variant_id,quantity_ordered,unit_price) FROM STDIN WITH CSV HEADER DELIMITER ','",
-    'shipments': "COPY shipments(po_id,shipped_date,received_date,tracking_number,status) FROM STDIN WITH CSV HEADER DELIMITER ','",
-    'qualitychecks': "COPY qualitychecks(shipment_id,checked_by,qc_date,result,remarks) FROM STDIN WITH CSV HEADER DELIMITER ','"
-}
-
-def copy_file_to_db(fname, table):
-    conn = psycopg2.connect(host=DB_HOST, dbname=DB_NAME, user=DB_USER, password=DB_PASS, port=DB_PORT)
-    cur = conn.cursor()
-    with open(fname, 'r', encoding='utf-8') as f:
-        cur.copy_expert(COPY_SQL[table], f)
-    conn.commit()
-    cur.close()
+    next_idx = len(ranges)
+    if SHARD is not None:
+        ranges = [r for r in ranges if r[2] % SHARD[1] == SHARD[0]]
+    covered = sorted(committed)
+    tasks = []
+    for s, e, i in ranges:
+        gaps = subtract_ranges(s, e, covered)
+        if gaps == [(s, e)]:
+            tasks.append((table, s, e, i))
+            continue
+        # only happens when CHUNK_SIZES changed since the interrupted run
+        for gs, ge in gaps:
+            tasks.append((table, gs, ge, next_idx))
+            next_idx += 1
+    return tasks
+
+def write_chunk(task, clock=None):
+    """Write one chunk file; returns (path, crc32 of its bytes, its Fingerprint text)"""
+    table, start, end, idx = task
+    clock = clock or StageClock(trace=False)
+    suffix = 'pgcopy' if COPY_FORMATS.get(table) == 'binary' else 'csv'
+    fname = OUT_DIR / f"{table}_{idx:03d}.{suffix}"
+    crc, fingerprint = 0, new_fingerprint(table)
+    with open(fname, 'wb') as f:
+        for batch in iter_chunk_batches(table, start, end, clock, fingerprint):
+            crc = zlib.crc32(batch, crc)
+            with clock.stage('write'):
+                f.write(batch)
+    return str(fname), import_checksum(task, crc), fingerprint and fingerprint.text()
+
+# ---------- EXPORT ----------
+EXPORT_SUFFIXES = {'gzip': '.gz', 'zstd': '.zst', 'none': ''}
+
+def open_compressed(path, mode, compression):
+    """Binary file object that (de)compresses with gzip, zstd or nothing"""
+    if compression == 'gzip':
+        return gzip.open(path, mode, compresslevel=COMPRESSION_LEVELS['gzip'])
+    if compression == 'zstd':
+        if zstd is None:
+            raise RuntimeError("zstd compression needs the zstandard package")
+        if 'w' in mode:
+            return zstd.ZstdCompressor(level=COMPRESSION_LEVELS['zstd']).stream_writer(open(path, 'wb'))
+        return zstd.ZstdDecompressor().stream_reader(open(path, 'rb'))
+    return open(path, mode)
+
+def export_path(table, idx):
+    if EXPORT_FORMAT == 'parquet':
+        suffix = '.parquet'
+    else:
+        suffix = '.csv' + EXPORT_SUFFIXES[EXPORT_COMPRESSION]
+    return Path(table) / f"{table}_{idx:05d}{suffix}"
+
+def arrow_type(sql_type):
+    base = sql_type.split('(')[0]
+    if base in ('BIGINT', 'BIGSERIAL'):
+        return pa.int64()
+    if base in ('INT', 'INTEGER', 'SERIAL'):
+        return pa.int32()
+    if base in ('DECIMAL', 'NUMERIC'):
+        precision, _, scale = sql_type[len(base) + 1:-1].partition(',')
+        return pa.decimal128(int(precision), int(scale or 0))
+    if base == 'TIMESTAMP':
+        return pa.timestamp('us')
+    if base == 'DATE':
+        return pa.date32()
+    return pa.string()
+
+def write_parquet_chunk(path, table, batches, clock):
+    """Parse the chunk's CSV batches into typed Arrow columns, one row group per batch.
+
+    Unquoted empty fields become NULL, as they do in COPY ... CSV, and DATE columns
+    (written as timestamps) are truncated to the day like Postgres does.
+    """
+    columns = table_columns(table)
+    types = schema_column_types()[table]
+    schema = pa.schema([(c, arrow_type(types[c])) for c in columns])
+    parsed = pa.schema([pa.field(f.name, pa.timestamp('s')) if f.type == pa.date32() else f for f in schema])
+    read = pacsv.ReadOptions(column_names=columns)
+    convert = pacsv.ConvertOptions(column_types=parsed, null_values=[''], strings_can_be_null=True,
+                                   quoted_strings_can_be_null=False)
+    crc, nbytes = 0, 0
+    codec = 'none' if EXPORT_COMPRESSION == 'none' else EXPORT_COMPRESSION
+    with pq.ParquetWriter(path, schema, compression=codec) as w:
+        for i, batch in enumerate(batches):
+            crc = zlib.crc32(batch, crc)
+            nbytes += len(batch)
+            if i == 0 or not batch:
+                continue   # the header
+            with clock.stage('serialize'):
+                rows = pacsv.read_csv(io.BytesIO(batch), read_options=read, convert_options=convert)
+                if parsed != schema:
+                    rows = rows.cast(schema, safe=False)
+            with clock.stage('write'):
+                w.write_table(rows)
+    return crc, nbytes
+
+def export_chunk(task):
+    """Write one chunk to its export file; returns its manifest entry"""
+    table, start, end, idx = task
+    started, clock = time.time(), StageClock()
+    name = export_path(table, idx)
+    path = EXPORT_DIR / name
+    fingerprint = new_fingerprint(table)
+    batches = iter_csv_batches(table, start, end, clock=clock, fingerprint=fingerprint)
+    if EXPORT_FORMAT == 'parquet':
+        crc, nbytes = write_parquet_chunk(path, table, batches, clock)
+    else:
+        crc, nbytes = 0, 0
+        with open_compressed(path, 'wb', EXPORT_COMPRESSION) as f:
+            for batch in batches:
+                crc = zlib.crc32(batch, crc)
+                nbytes += len(batch)
+                with clock.stage('write'):
+                    f.write(batch)
+    return {'table': table, 'chunk': idx, 'start': start, 'end': end, 'rows': end - start,
+            'file': name.as_posix(), 'bytes': nbytes, 'file_bytes': path.stat().st_size,
+            'checksum': f"{crc:08x}", 'fingerprint': fingerprint and fingerprint.text(),
+            'stats': chunk_stats(task, clock, started, nbytes)}
+
+def export_dataset(tables):
+    """Export every chunk of `tables` in parallel and write the manifest; returns the chunk count"""
+    for table in tables:
+        (EXPORT_DIR / table).mkdir(parents=True, exist_ok=True)
+    tasks = [task for table in tables for task in table_tasks(table)]
+    print(f"Exporting {len(tables)} tables ({sum(t[2] - t[1] for t in tasks)} rows, {len(tasks)} chunks) "
+          f"as {EXPORT_FORMAT}/{EXPORT_COMPRESSION} to {EXPORT_DIR.resolve()}")
+    chunks = defaultdict(list)
+    try:
+        for entry in tqdm(worker_pool().imap_unordered(export_chunk, tasks), total=len(tasks)):
+            stats = entry.pop('stats')
+            if REPORT is not None:
+                REPORT.add_chunk(stats)
+            chunks[entry.pop('table')].append(entry)
+    except BaseException:
+        close_pools(terminate=True)
+        raise
+    manifest = {
+        'format': EXPORT_FORMAT, 'compression': EXPORT_COMPRESSION, 'explicit_ids': EXPLICIT_IDS,
+        'shard': list(SHARD) if SHARD is not None else None,
+        'distribution': DISTRIBUTION, 'seed': SEED, 'aggregates': AGGREGATES, 'text': TEXT,
+        'tables': {table: {'rows': SIZES[table], 'chunk_size': CHUNK_SIZES[table],
+                           'columns': table_columns(table),
+                           'chunks': sorted(chunks[table], key=lambda c: c['start'])}
+                   for table in tables},
+    }
+    path = EXPORT_DIR / (EXPORT_MANIFEST if SHARD is None else shard_file(EXPORT_MANIFEST, SHARD))
+    with open(path, 'w') as f:
+        json.dump(manifest, f, indent=1)
+    size = sum(c['file_bytes'] for cs in chunks.values() for c in cs)
+    raw = sum(c['bytes'] for cs in chunks.values() for c in cs)
+    print(f"Exported {raw / (1 << 20):.1f} MB of CSV as {size / (1 << 20):.1f} MB "
+          f"({raw / size if size else 0:.1f}x), manifest {path}")
+    return len(tasks)
+
+def read_export(path):
+    """Point the loader at an export directory: row counts, chunk sizes, EXPLICIT_IDS and
+    IMPORT_FILES come from its manifest"""
+    global EXPLICIT_IDS
+    path = Path(path)
+    with open(path / EXPORT_MANIFEST) as f:
+        manifest = json.load(f)
+    if manifest['format'] == 'parquet' and pa is None:
+        raise SystemExit("this export is Parquet, which needs pyarrow")
+    if manifest['compression'] == 'zstd' and zstd is None:
+        raise SystemExit("this export is zstd-compressed, which needs the zstandard package")
+    EXPLICIT_IDS = manifest['explicit_ids']
+    for table, t in manifest['tables'].items():
+        if table not in SPECS:
+            raise SystemExit(f"{path}: unknown table {table}")
+        SIZES[table], CHUNK_SIZES[table] = t['rows'], t['chunk_size']
+        if t['columns'] != table_columns(table):
+            raise SystemExit(f"{path}: {table} was exported with columns {t['columns']}, "
+                             f"the schema now has {table_columns(table)}")
+        for c in t['chunks']:
+            IMPORT_FILES[table, c['start']] = str(path / c['file'])
+            IMPORT_FINGERPRINTS[table, c['start']] = c.get('fingerprint')
+            IMPORT_CHECKSUMS[table, c['start']] = int(c['checksum'], 16)
+        missing = [task for task in table_tasks(table) if (table, task[1]) not in IMPORT_FILES]
+        if missing:
+            raise SystemExit(f"{path}: {table} is missing {len(missing)} chunks, e.g. rows {missing[0][1]}-{missing[0][2]}")
+    for table in SPECS:
+        if table not in manifest['tables']:
+            SIZES[table] = 0
+    return manifest
+
+def iter_export_batches(path, clock=None):
+    """Yield an exported chunk as CSV bytes for COPY, decompressing or converting it in-process"""
+    clock = clock or StageClock(trace=False)
+    if path.endswith('.parquet'):
+        parquet = pq.ParquetFile(path)
+        header = True
+        for batch in parquet.iter_batches(batch_size=PIPE_BATCH_ROWS):
+            with clock.stage('read'):
+                buf = io.BytesIO()
+                pacsv.write_csv(pa.Table.from_batches([batch]), buf, pacsv.WriteOptions(include_header=header))
+            header = False
+            yield buf.getvalue()
+        if header:
+            yield encode_csv_rows([parquet.schema_arrow.names])
+        return
+    compression = next((c for c, suffix in EXPORT_SUFFIXES.items() if suffix and path.endswith(suffix)), 'none')
+    with open_compressed(path, 'rb', compression) as f:
+        while True:
+            with clock.stage('read'):
+                data = f.read(COPY_BUFFER_SIZE)
+            if not data:
+                break
+            yield data
+
+def import_checksum(task, crc):
+    """The CRC32 to record for a chunk loaded as `crc`: a --from-export chunk keeps its export
+    manifest's. A CSV export must still match it; a Parquet one is re-encoded to CSV on
+    load, so its bytes differ and only the manifest's value is carried over."""
+    table, start, end, idx = task
+    expected = IMPORT_CHECKSUMS.get((table, start))
+    if expected is None:
+        return crc
+    path = IMPORT_FILES[table, start]
+    if not path.endswith('.parquet') and crc != expected:
+        raise RuntimeError(f"{path}: checksum {crc:08x} does not match the export manifest's {expected:08x}")
+    return expected
+
+# ---------- SCALING ----------
+def schema_unique_keys(path=SCHEMA_FILE):
+    """{table: [column tuple]} for every PRIMARY KEY/UNIQUE constraint of the schema file"""
+    keys = {}
+    for table, body in schema_tables(path):
+        found = [tuple(c.strip() for c in cols.split(','))
+                 for cols in re.findall(r"(?:PRIMARY KEY|UNIQUE)\s*\(([^)]+)\)", body)]
+        found += [(name,) for name in re.findall(r"^\s*(\w+)\s+[^,\n]*\bUNIQUE\b", body, re.M)]
+        keys[table] = found
+    return keys
+
+def scale_sizes(scale):
+    """Row counts for --scale: reference tables stay fixed, the rest scale together so
+    every child keeps its rows-per-parent ratio. A table whose unique key is made of
+    periodic columns is capped at the period of that key."""
+    sizes = {spec.name: max(1, round(spec.rows * scale)) if spec.scaled else spec.rows for spec in TABLES}
+    return cap_unique_keys(sizes)
+
+def periodic_unique_keys(table, sizes):
+    """(key, periods) of the unique keys of `table` whose columns all repeat with gi"""
+    found = []
+    for key in schema_unique_keys().get(table, ()):
+        if not all(c in SPECS[table].columns for c in key):
+            continue   # involves a generated PK
+        periods = [SPECS[table].columns[c].period(sizes) for c in key]
+        if None not in periods:
+            found.append((key, periods))
+    return found
+
+def cap_unique_keys(sizes):
+    """Cap each table at the number of distinct values its periodic unique keys can take"""
+    for table in SPECS:
+        for key, periods in periodic_unique_keys(table, sizes):
+            limit = math.lcm(*periods)
+            if sizes[table] > limit:
+                print(f"{table}: capped at {limit} rows to keep ({', '.join(key)}) unique")
+                sizes[table] = limit
+    return sizes
+
+def row_bytes(table, sample=2000):
+    """Average COPY payload bytes per row, measured on a small sample"""
+    n = min(sample, SIZES[table])
+    if n == 0:
+        return 1
+    return max(1, sum(len(b) for b in islice(iter_chunk_batches(table, 0, n), 1, None)) / n)
+
+def auto_chunk_sizes(target_bytes=CHUNK_TARGET_BYTES, workers=WORKERS):
+    """Chunk sizes of about target_bytes each, but at least CHUNKS_PER_WORKER chunks per worker"""
+    sizes = {}
+    for table, rows in SIZES.items():
+        by_bytes = int(target_bytes // row_bytes(table))
+        by_workers = math.ceil(rows / (workers * CHUNKS_PER_WORKER))
+        sizes[table] = max(1, min(rows, max(min(by_bytes, by_workers), MIN_CHUNK_ROWS)))
+    return sizes
+
+class ChunkTuner:
+    """Re-splits a table's pending chunks from measured per-chunk times.
+
+    Each finished chunk updates the table's rows/sec (generate + COPY, per worker);
+    when the pending chunks are more than `slack` off the size that would take
+    `target_s`, they are re-cut. Chunks never shrink below MIN_CHUNK_ROWS, never grow
+    past CHUNKS_PER_WORKER chunks per worker for the table, and are never cut across
+    a staging table boundary.
+    """
+
+    def __init__(self, target_s=CHUNK_TARGET_SECONDS, workers=WORKERS, slack=1.5):
+        self.target_s = target_s
+        self.workers = workers
+        self.slack = slack
+        self.rate = {}
+        self.seen = defaultdict(int)
+        self.sizes = {}
+
+    def observe(self, table, rows, secs):
+        if secs <= 0:
+            return
+        self.seen[table] += 1
+        rate = rows / secs
+        self.rate[table] = rate if table not in self.rate else 0.7 * self.rate[table] + 0.3 * rate
+
+    def chunk_rows(self, table):
+        if self.seen[table] < 2:   # the first chunk pays for connections and lookup tables
+            return None
+        rows = int(self.rate[table] * self.target_s)
+        rows = min(rows, math.ceil(SIZES[table] / (self.workers * CHUNKS_PER_WORKER)))
+        return max(rows, MIN_CHUNK_ROWS)
+
+    def resplit(self, table, tasks, next_idx):
+        """New task list for the pending `tasks`, or None to keep them"""
+        if len(tasks) == 0:
+            return None
+        size = self.chunk_rows(table)
+        current = tasks[0][2] - tasks[0][1]
+        if size is None or current / self.slack < size < current * self.slack:
+            return None
+        cuts = sorted(lo for lo, _ in stage_ranges(table)) if LOAD_STRATEGY == 'partitions' else []
+        runs = []
+        for _, s, e, _ in tasks:
+            if runs and runs[-1][1] == s:
+                runs[-1][1] = e
+            else:
+                runs.append([s, e])
+        pieces = []
+        for s, e in runs:
+            bounds = [s] + [c for c in cuts if s < c < e] + [e]
+            pieces += zip(bounds, bounds[1:])
+        out = []
+        for s, e in pieces:
+            n = math.ceil((e - s) / size)
+            out += [(table, s + (e - s) * i // n, s + (e - s) * (i + 1) // n, next(next_idx)) for i in range(n)]
+        self.sizes[table] = size
+        return out
+
+
+# ---------- BINARY COPY ----------
+PG_EPOCH = datetime(2000, 1, 1)
+BINARY_HEADER = b'PGCOPY\n\xff\r\n\x00' + struct.pack('!ii', 0, 0)
+BINARY_TRAILER = struct.pack('!h', -1)
+BINARY_NULL = struct.pack('!i', -1)
+
+def schema_tables(path=SCHEMA_FILE):
+    """(table, body) for every CREATE TABLE statement of the schema file"""
+    return re.findall(r"CREATE TABLE (\w+) \((.*?)\n\);", Path(path).read_text(), re.S)
+
+@lru_cache(maxsize=None)
+def schema_column_types(path=SCHEMA_FILE):
+    """{table: {column: SQL type}} parsed from the schema file, e.g. 'DECIMAL(10,2)'"""
+    types = {}
+    for table, body in schema_tables(path):
+        cols = {}
+        for name, typ in re.findall(r"^\s*(\w+)\s+([A-Z]+(?:\(\d+(?:,\d+)?\))?)", body, re.M):
+            if name.upper() not in ('PRIMARY', 'FOREIGN', 'CONSTRAINT', 'UNIQUE'):
+                cols[name] = typ
+        types[table] = cols
+    return types
+
+def _bin_int(fmt, size):
+    s = struct.Struct(f'!i{fmt}')
+    return lambda v: s.pack(size, int(v))
+
+def _bin_text(v):
+    b = str(v).encode('utf-8')
+    return struct.pack('!i', len(b)) + b
+
+def _bin_numeric(scale):
+    mult = 10 ** scale
+    groups = -(-scale // 4)          # base-10000 digits after the decimal point
+    align = 10 ** (4 * groups - scale)
+
+    def enc(v):
+        n = round((Decimal(v) if isinstance(v, str) else v) * mult)
+        m = abs(n) * align
+        digits = []
+        while m:
+            m, d = divmod(m, 10000)
+            digits.append(d)
+        digits.reverse()
+        weight = len(digits) - 1 - groups if digits else 0
+        while digits and digits[-1] == 0:
+            digits.pop()
+        body = struct.pack(f'!hhhh{len(digits)}h', len(digits), weight, 0x4000 if n < 0 else 0, scale, *digits)
+        return struct.pack('!i', len(body)) + body
+    return enc
+
+def _bin_datetime(as_date):
+    days_cache = {}
+    ts = struct.Struct('!iq')
+    date = struct.Struct('!ii')
+
+    def enc(v):
+        # values are gi_to_iso() strings: 'YYYY-MM-DD HH:MM:SS'
+        v = str(v)
+        days = days_cache.get(v[:10])
+        if days is None:
+            days = days_cache[v[:10]] = (datetime.fromisoformat(v[:10]) - PG_EPOCH).days
+        if as_date:
+            return date.pack(4, days)
+        secs = days * 86400 + int(v[11:13]) * 3600 + int(v[14:16]) * 60 + int(v[17:19])
+        return ts.pack(8, secs * 1000000)
+    return enc
+
+def primary_key_column(table):
+    """The table's SERIAL/BIGSERIAL primary key column, or None for composite keys"""
+    for col, typ in schema_column_types()[table].items():
+        if typ in ('SERIAL', 'BIGSERIAL'):
+            return col
+    return None
+
+def binary_field_encoder(sql_type):
+    base = sql_type.split('(')[0]
+    if base in ('BIGINT', 'BIGSERIAL'):
+        return _bin_int('q', 8)
+    if base in ('INT', 'INTEGER', 'SERIAL'):
+        return _bin_int('i', 4)
+    if base in ('DECIMAL', 'NUMERIC'):
+        return _bin_numeric(int(sql_type.rstrip(')').split(',')[1]) if ',' in sql_type else 0)
+    if base == 'TIMESTAMP':
+        return _bin_datetime(as_date=False)
+    if base == 'DATE':
+        return _bin_datetime(as_date=True)
+    if base in ('VARCHAR', 'TEXT', 'CHAR'):
+        return _bin_text
+    raise ValueError(f"no binary COPY encoder for {sql_type}")
+
+_BINARY_ENCODERS = {}
+
+def binary_row_encoder(table):
+    """Encode rows of the table's COPY column list as PGCOPY tuples ('' and None are NULL)"""
+    columns = tuple(table_columns(table))
+    enc = _BINARY_ENCODERS.get((table, columns))
+    if enc is None:
+        types = schema_column_types()[table]
+        fields = [binary_field_encoder(types[c]) for c in columns]
+        nfields = struct.pack('!h', len(fields))
+
+        def enc(rows):
+            out = []
+            for r in rows:
+                out.append(nfields)
+                for f, v in zip(fields, r):
+                    out.append(BINARY_NULL if v is None or v == '' else f(v))
+            return b''.join(out)
+        _BINARY_ENCODERS[(table, columns)] = enc
+    return enc
+
+_PG_EPOCH_SECONDS = int((BASE_DATE - PG_EPOCH).total_seconds())
+_INT_TYPES = {'BIGINT': '>i8', 'BIGSERIAL': '>i8', 'INT': '>i4', 'INTEGER': '>i4', 'SERIAL': '>i4'}
+
+def v_bin_fixed(values, dtype):
+    a = np.ascontiguousarray(values, dtype=dtype)
+    head = np.frombuffer(struct.pack('!i', a.dtype.itemsize), dtype=np.uint8)
+    return v_cat(np.broadcast_to(head, (len(a), 4)), a.view(np.uint8).reshape(len(a), a.dtype.itemsize)), None
+
+def v_bin_field(col, gi, sql_type):
+    """One PGCOPY field per row as (uint8 matrix, byte mask or None for all bytes)"""
+    base = sql_type.split('(')[0]
+    if base in _INT_TYPES or base in ('TIMESTAMP', 'DATE'):
+        values = col.ints(gi)
+        if values is None:
+            raise ValueError(f"{type(col).__name__} has no integer values for {sql_type}")
+        if base == 'TIMESTAMP':
+            mat, mask = v_bin_fixed((values + _PG_EPOCH_SECONDS) * 1000000, '>i8')
+        elif base == 'DATE':
+            mat, mask = v_bin_fixed((values + _PG_EPOCH_SECONDS) // 86400, '>i4')
+        else:
+            mat, mask = v_bin_fixed(values, _INT_TYPES[base])
+    elif base in ('DECIMAL', 'NUMERIC'):
+        mat, mask = col.bin_lut(sql_type, gi)
+    elif base in ('VARCHAR', 'TEXT', 'CHAR'):
+        data = col.vec(gi)
+        lengths = np.count_nonzero(data, axis=1).astype('>i4')
+        mat = v_cat(lengths.view(np.uint8).reshape(len(gi), 4), data)
+        mask = v_cat(np.ones((len(gi), 4), dtype=bool), data != 0)
+    else:
+        raise ValueError(f"no binary COPY encoder for {sql_type}")
+    nulls = col.nulls(gi)
+    if nulls is not None and nulls.any():
+        mat = mat.copy()
+        mask = np.ones(mat.shape, dtype=bool) if mask is None else mask.copy()
+        mat[nulls, :4] = 0xff
+        mask[nulls, 4:] = False
+    return mat, mask
+
+def v_bin_numeric_cents(c, sql_type):
+    """NUMERIC(p,2) binary fields for non-negative integer cents below 10**14"""
+    if not sql_type.endswith(',2)'):
+        raise ValueError(f"cents need a scale-2 numeric, not {sql_type}")
+    whole, frac = c // 100, c % 100
+    digits = np.stack([whole // 100000000 % 10000, whole // 10000 % 10000, whole % 10000, frac * 100], axis=1)
+    nz = digits != 0
+    first = np.where(nz.any(axis=1), nz.argmax(axis=1), 4)
+    last = np.where(nz.any(axis=1), 4 - nz[:, ::-1].argmax(axis=1), 4)
+    ndigits = last - first
+    weight = np.where(ndigits > 0, 2 - first, 0)
+    head = (8 + 2 * ndigits).astype('>i4').view(np.uint8).reshape(len(c), 4)
+    meta = np.stack([ndigits, weight, np.zeros_like(ndigits), np.full_like(ndigits, 2)], axis=1)
+    meta = meta.astype('>i2').view(np.uint8).reshape(len(c), 8)
+    body = digits.astype('>i2').view(np.uint8).reshape(len(c), 8)
+    pos = np.arange(4)
+    keep = np.repeat((pos >= first[:, None]) & (pos < last[:, None]), 2, axis=1)
+    return v_cat(head, meta, body), v_cat(np.ones((len(c), 12), dtype=bool), keep)
+
+def encode_binary_columns(table, gi, clock=None):
+    """PGCOPY tuples for a batch of gi, built column-at-a-time like encode_csv_columns().
+
+    Columns are generated and encoded in one step, so on `clock` that counts as
+    generate and only assembling the tuples as serialize.
+    """
+    clock = clock or StageClock(trace=False)
+    types = schema_column_types()[table]
+    with clock.stage('generate'):
+        fields = [v_bin_field(col, gi, types[name]) for name, col in table_specs(table)]
+    with clock.stage('serialize'):
+        nfields = np.frombuffer(struct.pack('!h', len(fields)), dtype=np.uint8)
+        rows = v_cat(np.broadcast_to(nfields, (len(gi), 2)), *[mat for mat, _ in fields])
+        mask = v_cat(np.ones((len(gi), 2), dtype=bool),
+                     *[np.ones(mat.shape, dtype=bool) if m is None else m for mat, m in fields])
+        return rows[mask].tobytes()
+
+_BINARY_VECTOR = {}
+
+def binary_vectorized(table):
+    """Whether every column of the table has a vectorized binary encoding"""
+    key = (table, EXPLICIT_IDS)
+    if key not in _BINARY_VECTOR:
+        try:
+            encode_binary_columns(table, np.arange(1, dtype=np.int64))
+            _BINARY_VECTOR[key] = True
+        except ValueError:
+            _BINARY_VECTOR[key] = False
+    return _BINARY_VECTOR[key]
+
+def iter_binary_batches(table, start, end, batch_rows=PIPE_BATCH_ROWS, clock=None, fingerprint=None):
+    """Yield a chunk as PGCOPY binary byte batches, header first and trailer last"""
+    clock = clock or StageClock(trace=False)
+    yield BINARY_HEADER
+    if ENGINE == 'vector' and binary_vectorized(table):
+        for gi in iter_gi_batches(start, end):
+            if fingerprint is not None:
+                with clock.stage('checksum'):
+                    fingerprint.add(gi)
+            yield encode_binary_columns(table, gi, clock)
+        yield BINARY_TRAILER
+        return
+    encode = binary_row_encoder(table)
+    rows = table_rows(table, start, end)
+    pos = start
+    while True:
+        with clock.stage('generate'):
+            batch = list(islice(rows, batch_rows))
+        if not batch:
+            break
+        if fingerprint is not None:
+            with clock.stage('checksum'):
+                fingerprint.add(np.arange(pos, pos + len(batch), dtype=np.int64))
+        pos += len(batch)
+        with clock.stage('serialize'):
+            data = encode(batch)
+        yield data
+    yield BINARY_TRAILER
+
+def iter_chunk_batches(table, start, end, clock=None, fingerprint=None):
+    """The chunk's COPY payload in batches; `fingerprint` is filled as it is generated
+    (from the export manifest when loading --from-export)"""
+    if IMPORT_FILES:
+        if fingerprint is not None:
+            fingerprint.load(IMPORT_FINGERPRINTS.get((table, start)))
+        return iter_export_batches(IMPORT_FILES[table, start], clock)
+    if COPY_FORMATS.get(table) == 'binary':
+        return iter_binary_batches(table, start, end, clock=clock, fingerprint=fingerprint)
+    return iter_csv_batches(table, start, end, clock=clock, fingerprint=fingerprint)
+
+def copy_sql(table, target=None):
+    target = target or table
+    columns = ','.join(table_columns(table))
+    if COPY_FORMATS.get(table) == 'binary':
+        return f"COPY {target}({columns}) FROM STDIN WITH (FORMAT binary)"
+    if EXPLICIT_IDS or target != table:
+        return f"COPY {target}({columns}) FROM STDIN WITH CSV HEADER DELIMITER ','"
+    return COPY_SQL[table]
+
+def stage_ranges(table):
+    """gi ranges of the staging tables, aligned to chunk boundaries"""
+    chunks = chunk_ranges(SIZES[table], CHUNK_SIZES[table])
+    if not chunks:
+        return []
+    per = math.ceil(len(chunks) / max(1, min(STAGE_TABLES, len(chunks))))
+    return [(chunks[i][0], chunks[min(i + per, len(chunks)) - 1][1]) for i in range(0, len(chunks), per)]
+
+def stage_table(table, k):
+    return f"{table}_stage_{k:02d}"
+
+def copy_target(table, start):
+    """Relation a chunk starting at `start` is COPYed into"""
+    if LOAD_STRATEGY == 'partitions':
+        for k, (lo, hi) in enumerate(stage_ranges(table)):
+            if lo <= start < hi:
+                return stage_table(table, k)
+    return table
+
+def reset_sequences(tables):
+    """Move each serial PK's sequence past the explicit ids that were loaded"""
+    conn = db_connect()
+    with conn, conn.cursor() as cur:
+        for table in tables:
+            pk = primary_key_column(table)
+            if pk:
+                cur.execute(f"SELECT setval(pg_get_serial_sequence(%s, %s), "
+                            f"COALESCE((SELECT MAX({pk}) FROM {table}), 0) + 1, false)", (table, pk))
     conn.close()
+
+# ---------- APPEND ----------
+def parse_rows(value):
+    """'TABLE=N', 'TABLE=+N' or 'TABLE=+P%' for --rows"""
+    table, _, target = value.partition('=')
+    m = re.fullmatch(r"(\+?)(\d+(?:\.\d+)?)(%?)", target)
+    if table not in SPECS or m is None or (m.group(3) and not m.group(1)):
+        raise argparse.ArgumentTypeError(f"expected TABLE=N, TABLE=+N or TABLE=+P%, got {value!r}")
+    return table, m.group(1) + m.group(3), float(m.group(2))
+
+def rows_targets(specs, current):
+    """{table: target rows} for --rows, relative targets counted from `current`"""
+    targets = {}
+    for table, kind, n in specs:
+        if kind == '+%':
+            targets[table] = current[table] + round(current[table] * n / 100)
+        elif kind == '+':
+            targets[table] = current[table] + int(n)
+        else:
+            targets[table] = int(n)
+    return targets
+
+def loaded_rows(committed):
+    """{table: rows already loaded}: the gi prefix the manifest covers or, for tables it
+    has no chunks of, MAX of the serial PK (COUNT(*) for tables without one)"""
+    rows, conn = {}, None
     try:
-        os.remove(fname)
-    except Exception:
-        pass
-    return fname
+        for table in SPECS:
+            ranges = sorted(committed.get(table, ()))
+            if ranges:
+                end = max(e for _, e in ranges)
+                if subtract_ranges(0, end, ranges):
+                    raise SystemExit(f"{table}: the manifest has gaps below gi {end}; "
+                                     f"finish that load with --resume first")
+                rows[table] = end
+                continue
+            conn = conn or db_connect()
+            pk = primary_key_column(table)
+            with conn.cursor() as cur:
+                cur.execute(f"SELECT COALESCE(MAX({pk}), 0) FROM {table}" if pk else f"SELECT COUNT(*) FROM {table}")
+                rows[table] = cur.fetchone()[0]
+    finally:
+        if conn is not None:
+            conn.close()
+    return rows
 
-def parallel_copy(table, files):
-    print(f"Starting COPY for {table} ({len(files)} files) with {COPY_WORKERS} workers")
-    with ThreadPoolExecutor(max_workers=COPY_WORKERS) as ex:
-        list(tqdm(ex.map(lambda fn: copy_file_to_db(fn, table), files), total=len(files)))
-    print(f"COPY finished for {table}")
+def append_key_conflict(table, current, old_sizes):
+    """Whether rows [current, SIZES[table]) would repeat a unique key of the rows below.
 
-def truncate_all_tables():
-    """Truncate all tables in dependency-reverse order to clear existing data"""
-    print("=== TRUNCATING EXISTING DATA ===")
-    conn = psycopg2.connect(host=DB_HOST, dbname=DB_NAME, user=DB_USER, password=DB_PASS, port=DB_PORT)
-    cur = conn.cursor()
-    
-    # Truncate in reverse dependency order
-    tables = [
-        "qualitychecks", "shipments", "purchaseorderitems", "purchaseorders",
-        "proofofdelivery", "routestops", "deliveryroutes", "deliveryshipments",
-        "maintenancelogs", "drivers", "vehicles",
-        "payments", "orderitems", "orders",
-        "inventory", "productvariants", "products",
-        "taxes", "promotions",
-        "suppliers", "warehouses",
-        "userroles", "rolepermissions", "permissions", "roles",
-        "users", "categories"
-    ]
-    
-    for table in tables:
+    Periodic keys (e.g. userroles' FK pair) depend on the parent sizes, so the existing
+    rows are recomputed with the sizes they were generated with.
+    """
+    for key, periods in periodic_unique_keys(table, SIZES):
+        cols = [SPECS[table].columns[c] for c in key]
+        if periods == [c.period(old_sizes) for c in cols]:
+            continue
+        if np is None:
+            return True
+        parts, saved = [], dict(SIZES)
+        try:
+            for sizes, lo, hi in ((old_sizes, 0, current), (saved, current, saved[table])):
+                SIZES.update(sizes)
+                gi = np.arange(lo, hi, dtype=np.int64)
+                parts.append(np.stack([c.ints(gi) for c in cols], axis=1))
+        finally:
+            SIZES.update(saved)
+        rows = np.concatenate(parts)
+        if len(np.unique(rows, axis=0)) < len(rows):
+            return True
+    return False
+
+def plan_append(args, committed):
+    """Set SIZES to the append targets and return {table: [(0, loaded rows)]}, which
+    table_tasks() treats as committed so only [loaded, target) is generated.
+
+    Targets come from --rows; tables it does not name keep their size. Without --rows
+    (or with --scale) every table is topped up to its TABLES/--scale size.
+    """
+    current = loaded_rows(committed)
+    targets = dict(SIZES) if not args.rows or args.scale != 1 else dict(current)
+    targets.update(rows_targets(args.rows or [], current))
+    old_sizes = dict(current)
+    SIZES.update({t: max(current[t], targets[t]) for t in SPECS})
+    SIZES.update({t: max(current[t], n) for t, n in cap_unique_keys(dict(SIZES)).items()})
+    for table in SPECS:
+        if SIZES[table] > current[table]:
+            if append_key_conflict(table, current[table], old_sizes):
+                raise SystemExit(f"{table}: appended rows would repeat unique keys of existing rows, "
+                                 f"because its parents' sizes changed; append it together with a full reload")
+            print(f"{table}: {current[table]} -> {SIZES[table]} rows (+{SIZES[table] - current[table]})")
+    return {t: [(0, n)] for t, n in current.items() if n}
+
+def trickle(args):
+    """Append to --trickle-tables at --trickle rows/sec, one load per table and tick, until
+    Ctrl-C, --duration or the --rows targets. Rows are split by the tables' current sizes,
+    so children keep their rows-per-parent ratio."""
+    parents = fk_parents(args.fk_source)
+    tables = [t for t in load_order(parents) if t in args.trickle_tables.split(',')]
+    manifest = ChunkManifest()
+    manifest.ensure_table()
+    SIZES.update(loaded_rows(manifest.committed()))   # FKs point at rows that exist
+    empty = sorted({p for t in tables for p in parents[t] - {t} if SIZES[p] == 0})
+    if empty:
+        raise SystemExit(f"--trickle needs rows to reference, but {', '.join(empty)} "
+                         f"{'is' if len(empty) == 1 else 'are'} empty: load the dataset first")
+    targets = rows_targets(args.rows or [], dict(SIZES))
+    weights = {t: max(1, SIZES[t]) for t in tables}
+    owed = dict.fromkeys(tables, 0.0)
+    added = dict.fromkeys(tables, 0)
+    print(f"Trickling {args.trickle:g} rows/s into {', '.join(tables)} (Ctrl-C to stop)")
+    conn = db_connect()
+    t0 = next_tick = time.perf_counter()
+    tick = 0
+    try:
+        while not (targets and all(SIZES[t] >= targets[t] for t in targets)):
+            if args.duration and time.perf_counter() - t0 >= args.duration:
+                break
+            ticked = {}
+            with conn.cursor() as cur:
+                for table in tables:
+                    owed[table] += args.trickle * TRICKLE_INTERVAL * weights[table] / sum(weights.values())
+                    n = int(min(owed[table], targets.get(table, math.inf) - SIZES[table]))
+                    if n <= 0:
+                        continue
+                    owed[table] -= n
+                    start = SIZES[table]
+                    SIZES[table] += n
+                    fingerprint = new_fingerprint(table)
+                    data = b''.join(iter_chunk_batches(table, start, start + n, fingerprint=fingerprint))
+                    loaded = table_backend(table).load(cur, table, table, io.BytesIO(data))
+                    check_rowcount(loaded, (table, start, start + n, tick))
+                    record_chunk(cur, (table, start, start + n, tick), zlib.crc32(data),
+                                 fingerprint and fingerprint.text())
+                    ticked[table] = n
+            conn.commit()
+            for table, n in ticked.items():
+                added[table] += n
+            tick += 1
+            next_tick += TRICKLE_INTERVAL
+            time.sleep(max(0.0, next_tick - time.perf_counter()))
+    except KeyboardInterrupt:
+        conn.rollback()
+    finally:
+        conn.close()
+    if EXPLICIT_IDS:
+        reset_sequences(tables)
+    secs = time.perf_counter() - t0
+    print(f"Trickled {sum(added.values())} rows in {secs:.0f}s "
+          f"({', '.join(f'{t} +{n}' for t, n in added.items())})")
+
+# ---------- SHARDING ----------
+def parse_shard(value):
+    """'i/N' -> (i, N) for --shard"""
+    try:
+        i, n = (int(v) for v in value.split('/'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected i/N, got {value!r}")
+    if not 0 <= i < n:
+        raise argparse.ArgumentTypeError(f"shard index must be in [0, {n}), got {i}")
+    return i, n
+
+def shard_file(name, shard):
+    """seed_manifest.jsonl -> seed_manifest.shard-1-of-4.jsonl"""
+    stem, dot, suffix = str(name).partition('.')
+    return f"{stem}.shard-{shard[0]}-of-{shard[1]}{dot}{suffix}"
+
+def missing_ranges(committed):
+    """{table: [(start, end), ...]} of gi ranges that no committed chunk covers"""
+    missing = {}
+    for table in SPECS:
+        gaps = subtract_ranges(0, SIZES[table], sorted(committed.get(table, ())))
+        if gaps:
+            missing[table] = gaps
+    return missing
+
+def overlapping_ranges(committed):
+    """{table: [(start, end), ...]} of gi ranges covered by more than one committed chunk"""
+    overlaps = {}
+    for table, ranges in committed.items():
+        end = 0
+        for s, e in sorted(ranges):
+            if s < end:
+                overlaps.setdefault(table, []).append((s, min(e, end)))
+            end = max(end, e)
+    return overlaps
+
+def describe_missing(missing):
+    return '; '.join(f"{t}: {sum(e - s for s, e in gaps)} rows in {len(gaps)} ranges, e.g. {gaps[0][0]}-{gaps[0][1]}"
+                     for t, gaps in sorted(missing.items()))
+
+def coordinate_start(args):
+    """Empty the tables and the manifest and drop the constraints, once, before the shards run"""
+    print("=== COORDINATOR: START ===")
+    reset_database(args.reset, args.template)
+    manifest = ChunkManifest()
+    manifest.ensure_table()
+    manifest.reset()
+    deferred = DeferredConstraints(fk_parents(args.fk_source))
+    deferred.drop()
+    print(f"Constraints saved to {deferred.path}; run --coordinate finish from this directory "
+          f"once every shard is done")
+
+def merge_manifest_mirrors():
+    """Concatenate the shard manifest mirrors found next to MANIFEST_FILE into it"""
+    parts = sorted(MANIFEST_FILE.parent.glob(shard_file(MANIFEST_FILE.name, ('*', '*'))))
+    entries = []
+    for part in parts:
+        with open(part, encoding='utf-8') as f:
+            entries += [json.loads(line) for line in f if line.strip()]
+    entries.sort(key=lambda e: (e['table'], e['start']))
+    with open(MANIFEST_FILE, 'w', encoding='utf-8') as f:
+        for e in entries:
+            f.write(json.dumps(e) + '\n')
+    print(f"Merged {len(parts)} shard manifest mirrors ({len(entries)} chunks) into {MANIFEST_FILE}")
+
+def merge_export_manifests(export_dir):
+    """Merge the per-shard export manifests into one, checking that every table is complete"""
+    parts = sorted(Path(export_dir).glob(shard_file(EXPORT_MANIFEST, ('*', '*'))))
+    if not parts:
+        raise SystemExit(f"no shard manifests in {export_dir}")
+    merged = None
+    for part in parts:
+        with open(part) as f:
+            m = json.load(f)
+        settings = {k: v for k, v in m.items() if k not in ('tables', 'shard')}
+        if merged is None:
+            merged = dict(settings, shard=None,
+                          tables={t: dict(v, chunks=[]) for t, v in m['tables'].items()})
+        elif settings != {k: v for k, v in merged.items() if k not in ('tables', 'shard')}:
+            raise SystemExit(f"{part} was exported with different settings than {parts[0]}")
+        for table, t in m['tables'].items():
+            merged['tables'][table]['chunks'] += t['chunks']
+    covered = {}
+    for table, t in merged['tables'].items():
+        t['chunks'].sort(key=lambda c: c['start'])
+        covered[table] = [(c['start'], c['end']) for c in t['chunks']]
+        SIZES[table] = t['rows']
+    overlaps = overlapping_ranges(covered)
+    if overlaps:
+        raise SystemExit(f"export has chunks twice, overlapping {describe_missing(overlaps)}")
+    missing = {t: gaps for t, gaps in missing_ranges(covered).items() if t in merged['tables']}
+    if missing:
+        raise SystemExit(f"export is incomplete: {describe_missing(missing)}")
+    with open(Path(export_dir) / EXPORT_MANIFEST, 'w') as f:
+        json.dump(merged, f, indent=1)
+    print(f"Merged {len(parts)} shard manifests into {Path(export_dir) / EXPORT_MANIFEST}")
+
+def coordinate_finish(args):
+    """After all shards: check every gi range is committed, merge the manifests, reset the
+    sequences and rebuild and validate the constraints"""
+    print("=== COORDINATOR: FINISH ===")
+    if args.mode == 'export':
+        merge_export_manifests(EXPORT_DIR)
+        return
+    committed = ChunkManifest().committed()
+    overlaps = overlapping_ranges(committed)
+    if overlaps:
+        raise SystemExit(f"shards loaded rows twice, overlapping {describe_missing(overlaps)}. "
+                         f"Were they run with different chunk flags?")
+    missing = missing_ranges(committed)
+    if missing:
+        raise SystemExit(f"shards are not done, missing {describe_missing(missing)}. "
+                         f"Rerun the failed shards with --resume, then finish again")
+    merge_manifest_mirrors()
+    if EXPLICIT_IDS:
+        reset_sequences(list(SPECS))
+    if not DEFERRED_DDL_FILE.exists():
+        print(f"Warning: no {DEFERRED_DDL_FILE} here, constraints are not rebuilt "
+              f"(run finish where --coordinate start ran)")
+        return
+    deferred = DeferredConstraints(fk_parents(args.fk_source))
+    deferred.restore()
+    deferred.report()
+
+def strip_options(argv, options):
+    """argv without `options` (each taking one value, as `--opt v` or `--opt=v`)"""
+    out, skip = [], False
+    for arg in argv:
+        if skip:
+            skip = False
+        elif arg in options:
+            skip = True
+        elif not arg.split('=', 1)[0] in options:
+            out.append(arg)
+    return out
+
+def coordinate_local(args, argv):
+    """start, then every shard as its own local process, then finish"""
+    if args.mode != 'export':
+        coordinate_start(args)
+    shard_argv = strip_options(argv, ('--coordinate', '--shards'))
+    print(f"Starting {args.shards} shard processes")
+    procs = [subprocess.Popen([sys.executable, str(Path(__file__).resolve()), *shard_argv,
+                               '--shard', f"{i}/{args.shards}"]) for i in range(args.shards)]
+    failed = [i for i, p in enumerate(procs) if p.wait() != 0]
+    if failed:
+        raise SystemExit(f"shards {failed} failed; rerun them with --shard i/{args.shards} --resume, "
+                         f"then --coordinate finish")
+    coordinate_finish(args)
+
+# ---------- VERIFICATION ----------
+FINGERPRINT_KINDS = {'INT': 'int', 'INTEGER': 'int', 'BIGINT': 'int', 'SERIAL': 'int', 'BIGSERIAL': 'int',
+                     'DECIMAL': 'cents', 'NUMERIC': 'cents', 'TIMESTAMP': 'ts', 'DATE': 'date',
+                     'VARCHAR': 'text', 'TEXT': 'text', 'CHAR': 'text'}
+
+def fingerprint_columns(table):
+    """(column, Col, kind) of the table's COPY column list, kind from FINGERPRINT_KINDS"""
+    types = schema_column_types()[table]
+    return [(name, col, FINGERPRINT_KINDS[types[name].split('(')[0]]) for name, col in table_specs(table)]
+
+def new_fingerprint(table):
+    """A Fingerprint to fill while generating a chunk of `table`, or None without NumPy"""
+    return Fingerprint(table) if np is not None else None
+
+def parse_fingerprint(text):
+    return [int(v) for v in text.split(',')]
+
+class Fingerprint:
+    """Order-independent aggregates of a chunk: its row count, then per column the number of
+    non-NULL values and their sum as an integer (cents for numerics, seconds or days from
+    BASE_DATE for timestamps and dates, UTF-8 bytes for text).
+
+    The sums add up across batches, chunks and PK ranges, and fingerprint_sql() computes the
+    same ones server-side, so a loaded chunk can be checked without reading it back.
+    """
+
+    def __init__(self, table):
+        self.columns = fingerprint_columns(table)
+        self.sums = [0] * (1 + 2 * len(self.columns))
+
+    def add(self, gi, cols=None):
+        """Add a batch of gi; `cols` are its vec_columns() when the caller already built them"""
+        self.sums[0] += len(gi)
+        for i, (_, col, kind) in enumerate(self.columns):
+            nulls = col.nulls(gi)
+            self.sums[1 + 2 * i] += len(gi) - (int(np.count_nonzero(nulls)) if nulls is not None else 0)
+            if kind == 'text':   # NULL rows are all padding
+                self.sums[2 + 2 * i] += int(np.count_nonzero(cols[i] if cols is not None else col.vec(gi)))
+                continue
+            if kind == 'cents':
+                values = col_cents(col, gi)
+            else:
+                values = col.ints(gi)
+                if kind == 'date':
+                    values = values // 86400
+            self.sums[2 + 2 * i] += int(values[~nulls].sum() if nulls is not None else values.sum())
+
+    def load(self, text):
+        """Take the sums of a chunk fingerprinted elsewhere (an export), if known"""
+        self.sums = parse_fingerprint(text) if text else None
+
+    def text(self):
+        return ','.join(map(str, self.sums)) if self.sums is not None else None
+
+def fingerprint_sql(table):
+    """SELECT of the Fingerprint sums of the table's rows (add a WHERE for a range)"""
+    exprs = ['count(*)']
+    for name, _, kind in fingerprint_columns(table):
+        value = {'int': name, 'cents': f"{name} * 100", 'text': f"octet_length({name})",
+                 'ts': f"extract(epoch from {name} - timestamp '{BASE_DATE.isoformat(' ')}')::bigint",
+                 'date': f"{name} - date '{BASE_DATE.date()}'"}[kind]
+        exprs += [f"count({name})", f"coalesce(sum({value}), 0)"]
+    return f"SELECT {', '.join(exprs)} FROM {table} c"
+
+def fingerprint_labels(table):
+    labels = ['rows']
+    for name, _, kind in fingerprint_columns(table):
+        labels += [f"{name} non-NULL", f"{name} sum of {'bytes' if kind == 'text' else kind}"]
+    return labels
+
+@lru_cache(maxsize=None)
+def schema_foreign_keys(path=SCHEMA_FILE):
+    """{table: [(column, parent table, parent column)]} from the FOREIGN KEY clauses of the schema file"""
+    return {table: re.findall(r"FOREIGN KEY \((\w+)\)\s*REFERENCES (\w+)\s*\((\w+)\)", body)
+            for table, body in schema_tables(path)}
+
+def verify_groups(chunks):
+    """(table, chunks, PK range) units of verification: every chunk on its own when its rows
+    are known by id (--explicit-ids), otherwise each table as a whole with a None range"""
+    by_table = defaultdict(list)
+    for chunk in chunks:
+        by_table[chunk[0]].append(chunk)
+    groups = []
+    for table, table_chunks in by_table.items():
+        if EXPLICIT_IDS and primary_key_column(table):
+            groups += [(table, [c], (c[1] + 1, c[2])) for c in table_chunks]
+        else:
+            groups.append((table, table_chunks, None))
+    return groups
+
+def verify_group(cur, table, chunks, pk_range):
+    """Differences between the group's recorded and loaded rows, and its orphaned FKs"""
+    where, params = "TRUE", ()
+    if pk_range is not None:
+        where, params = f"c.{primary_key_column(table)} BETWEEN %s AND %s", pk_range
+    cur.execute(f"{fingerprint_sql(table)} WHERE {where}", params)
+    got = [int(v) for v in cur.fetchone()]
+    problems = []
+    if all(c[4] for c in chunks):
+        expected = [sum(v) for v in zip(*(parse_fingerprint(c[4]) for c in chunks))]
+        if len(expected) != len(got):
+            return [f"recorded with {len(expected)} fingerprint values, the columns give {len(got)}: "
+                    f"verify with the load's --explicit-ids setting"]
+    else:   # chunks recorded without NumPy (or by an older version): rows only
+        expected, got = [sum(c[2] - c[1] for c in chunks)], got[:1]
+    for label, e, g in zip(fingerprint_labels(table), expected, got):
+        if e != g:
+            problems.append(f"{label} {g}, expected {e}")
+    for column, parent, parent_column in schema_foreign_keys()[table]:
+        cur.execute(f"SELECT count(*) FROM {table} c WHERE {where} AND c.{column} IS NOT NULL "
+                    f"AND NOT EXISTS (SELECT 1 FROM {parent} p WHERE p.{parent_column} = c.{column})", params)
+        orphans = cur.fetchone()[0]
+        if orphans:
+            problems.append(f"{orphans} rows with a {column} missing from {parent}")
+    return problems
+
+def vacuum_tables(tables):
+    """VACUUM (ANALYZE) so the visibility map is set and FK probes are index-only scans"""
+    def vacuum(table):
+        conn = db_connect()
+        conn.autocommit = True
+        try:
+            with conn.cursor() as cur:
+                cur.execute(f"VACUUM (ANALYZE) {table}")
+        finally:
+            conn.close()
+
+    with ThreadPoolExecutor(max_workers=VERIFY_WORKERS) as ex:
+        list(ex.map(vacuum, sorted(tables)))
+
+def describe_group(table, chunks, pk_range):
+    if pk_range is None:
+        return f"{table} ({len(chunks)} chunks, whole table)"
+    _, start, end, idx, _ = chunks[0]
+    return f"{table} chunk {idx} (gi {start}-{end}, {primary_key_column(table)} {pk_range[0]}-{pk_range[1]})"
+
+def verify_load(repair=False):
+    """Check every chunk in seed_manifest against the database, in parallel; returns the
+    [(group, problems)] that failed"""
+    t0 = time.perf_counter()
+    chunks = ChunkManifest().chunks()
+    if not chunks:
+        raise SystemExit(f"{MANIFEST_TABLE} is empty: nothing to verify")
+    groups = verify_groups(chunks)
+    tables = {c[0] for c in chunks}
+    vacuum_tables({p for t in tables for _, p, _ in schema_foreign_keys()[t]} & set(SPECS))
+    pool = ConnectionPool(min(VERIFY_WORKERS, len(groups)))
+
+    def check(group):
+        with pool.connection() as conn, conn.cursor() as cur:
+            return group, verify_group(cur, *group)
+
+    try:
+        with ThreadPoolExecutor(max_workers=VERIFY_WORKERS, thread_name_prefix='verify') as ex:
+            results = list(tqdm(ex.map(check, groups), total=len(groups), desc='verify'))
+    finally:
+        pool.close()
+    failed = [(group, problems) for group, problems in results if problems]
+    for group, problems in failed:
+        print(f"MISMATCH {describe_group(*group)}: {'; '.join(problems)}")
+    print(f"Verified {len(chunks)} chunks of {len(tables)} tables in {time.perf_counter() - t0:.2f}s: "
+          f"{len(failed)} mismatched")
+    if failed and repair:
+        repair_chunks(failed)
+    return failed
+
+def repair_chunks(failed):
+    """Delete the rows and manifest entries of mismatched chunks, so --resume reloads only them"""
+    chunks = [(table, cs[0], pk_range) for (table, cs, pk_range), _ in failed if pk_range is not None]
+    conn = db_connect()
+    with conn, conn.cursor() as cur:
+        # no FK checks and no ON DELETE CASCADE into the (valid) child rows
+        cur.execute("SET LOCAL session_replication_role = replica")
+        for table, chunk, pk_range in chunks:
+            cur.execute(f"DELETE FROM {table} WHERE {primary_key_column(table)} BETWEEN %s AND %s", pk_range)
+            cur.execute(f"DELETE FROM {MANIFEST_TABLE} WHERE table_name = %s AND start_gi = %s", (table, chunk[1]))
+    conn.close()
+    if chunks:
+        print(f"Removed {len(chunks)} chunks; run again with --resume and the same options to reload them")
+    if len(chunks) < len(failed):
+        print("Tables checked as a whole (no --explicit-ids or no serial PK) must be reloaded in full")
+
+# ---------- RUN REPORT ----------
+REPORT = None   # RunReport of this run, set by main() with --report / --trace
+
+def peak_rss_kb():
+    """Peak resident set size of this process in KiB (None without the resource module)"""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == 'darwin' else rss
+
+def current_rss_kb():
+    """Resident set size of this process right now in KiB (None without /proc)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * (os.sysconf('SC_PAGE_SIZE') // 1024)
+    except (OSError, ValueError, AttributeError):
+        return None
+
+def clock_stats(clock, started):
+    """Stage seconds, spans and RSS of a piece of work that started at `started`: `rss_kb` is
+    the process's peak so far, `chunk_rss_kb` the highest RSS seen while this work ran"""
+    return {'pid': os.getpid(), 'started': started, 'ended': time.time(),
+            'stages': dict(clock.secs), 'rss_kb': peak_rss_kb(), 'chunk_rss_kb': clock.rss_kb,
+            'spans': clock.spans}
+
+def chunk_stats(task, clock, started, nbytes):
+    table, start, end, idx = task
+    return {'table': table, 'chunk': idx, 'start': start, 'end': end, 'rows': end - start,
+            'bytes': nbytes, **clock_stats(clock, started)}
+
+def max_kb(*values):
+    values = [v for v in values if v is not None]
+    return max(values) if values else None
+
+def report_phase(name):
+    return REPORT.phase(name) if REPORT is not None else nullcontext()
+
+class PgStatSampler:
+    """Samples server-side counters every `interval` seconds on its own connection.
+
+    Each sample holds the WAL position, the checkpoint counters and this database's
+    pg_stat_database row, so the report can show how much WAL a run wrote and how many
+    checkpoints it triggered. Sampling errors only disable the sampler.
+    """
+
+    WAL_SQL = "SELECT pg_wal_lsn_diff(pg_current_wal_lsn(), '0/0')::bigint"
+    CHECKPOINT_SQL = ("SELECT num_timed, num_requested FROM pg_stat_checkpointer",   # PostgreSQL 17+
+                      "SELECT checkpoints_timed, checkpoints_req FROM pg_stat_bgwriter")
+    DATABASE_SQL = ("SELECT xact_commit, tup_inserted, blks_read, blks_hit, temp_bytes "
+                    "FROM pg_stat_database WHERE datname = current_database()")
+    DATABASE_FIELDS = ('xact_commit', 'tup_inserted', 'blks_read', 'blks_hit', 'temp_bytes')
+
+    def __init__(self, interval=PG_STAT_INTERVAL):
+        self.interval = interval
+        self.samples = []
+        self._conn = None
+        self._checkpoint_sql = None
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
         try:
-            cur.execute(f"TRUNCATE TABLE {table} RESTART IDENTITY CASCADE;")
-            print(f"Truncated {table}")
+            self._conn = db_connect()
+            self._conn.autocommit = True
+            self._checkpoint_sql = self._find_checkpoint_sql()
+            self.sample()
         except Exception as e:
-            print(f"Warning truncating {table}: {e}")
-    
-    conn.commit()
+            print(f"Warning: pg_stat sampling disabled: {e}")
+            self.close()
+            return self
+        self._thread = threading.Thread(target=self._run, name='pg_stat', daemon=True)
+        self._thread.start()
+        return self
+
+    def _find_checkpoint_sql(self):
+        with self._conn.cursor() as cur:
+            for sql in self.CHECKPOINT_SQL:
+                try:
+                    cur.execute(sql)
+                    return sql
+                except psycopg2.Error:
+                    pass
+        return None
+
+    def sample(self):
+        row = {'time': time.time()}
+        with self._conn.cursor() as cur:
+            cur.execute(self.WAL_SQL)
+            row['wal_bytes'] = int(cur.fetchone()[0])
+            if self._checkpoint_sql is not None:
+                cur.execute(self._checkpoint_sql)
+                row['checkpoints_timed'], row['checkpoints_req'] = cur.fetchone()
+            cur.execute(self.DATABASE_SQL)
+            values = cur.fetchone()
+            if values is not None:
+                row.update(zip(self.DATABASE_FIELDS, values))
+        self.samples.append(row)
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.sample()
+            except Exception as e:
+                tqdm.write(f"Warning: pg_stat sampling stopped: {e}")
+                return
+
+    def stop(self):
+        if self._thread is not None:
+            self._stopped.set()
+            self._thread.join()
+            self._thread = None
+            try:
+                self.sample()
+            except Exception:
+                pass
+        self.close()
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def deltas(self, sample):
+        """Counters of `sample` relative to the first sample"""
+        first = self.samples[0]
+        return {k: v - first[k] for k, v in sample.items() if k in first and k != 'time'}
+
+    def summary(self):
+        return self.deltas(self.samples[-1]) if self.samples else {}
+
+class RunReport:
+    """Everything measured during one run, for --report and --trace.
+
+    Chunks come back from the workers with their stage seconds and the worker's peak
+    RSS, `phase()` times the steps of main() (truncate, load, constraints...) and an
+    optional PgStatSampler adds the server-side view.
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self.chunks = []
+        self.rss_kb = {}
+        self.phases = []
+        self.sampler = None
+
+    def add_chunk(self, stats, copy=None):
+        """Record a finished chunk; `copy` holds the stats of a COPY that ran in another process"""
+        if copy is not None:
+            self._rss(copy)
+            stats = dict(stats, ended=copy['ended'], copy_pid=copy['pid'],
+                         stages={**stats['stages'], **copy['stages']}, spans=stats['spans'] + copy['spans'],
+                         chunk_rss_kb=max_kb(stats.get('chunk_rss_kb'), copy.get('chunk_rss_kb')))
+        self._rss(stats)
+        self.chunks.append(stats)
+
+    def _rss(self, stats):
+        if stats['rss_kb'] is not None:
+            self.rss_kb[stats['pid']] = max(self.rss_kb.get(stats['pid'], 0), stats['rss_kb'])
+
+    @contextmanager
+    def phase(self, name):
+        started, t0 = time.time(), time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, started, time.perf_counter() - t0))
+
+    def tables(self):
+        """Per-table backend, chunks, rows, bytes, stage seconds, rows/bytes per second of wall
+        time and the peak RSS of a process while working on one of the table's chunks"""
+        out = {}
+        for c in self.chunks:
+            t = out.setdefault(c['table'], {'chunks': 0, 'rows': 0, 'bytes': 0, 'first': c['started'],
+                                            'last': c['ended'], 'stages': dict.fromkeys(STAGES, 0.0),
+                                            'peak_rss_kb': None})
+            t['chunks'] += 1
+            t['rows'] += c.get('rows') or 0
+            t['bytes'] += c['bytes']
+            t['peak_rss_kb'] = max_kb(t['peak_rss_kb'], c.get('chunk_rss_kb'))
+            t['first'] = min(t['first'], c['started'])
+            t['last'] = max(t['last'], c['ended'])
+            for stage, secs in c['stages'].items():
+                t['stages'][stage] += secs
+        for table, t in out.items():
+            t['backend'] = backend_label(table)
+            t['wall_s'] = t.pop('last') - t.pop('first')
+            t['rows_per_s'] = t['rows'] / t['wall_s'] if t['wall_s'] > 0 else None
+            t['bytes_per_s'] = t['bytes'] / t['wall_s'] if t['wall_s'] > 0 else None
+        return out
+
+    def summary(self):
+        self._rss({'pid': os.getpid(), 'rss_kb': peak_rss_kb()})
+        samples = self.sampler.samples if self.sampler is not None else []
+        return {
+            'started': datetime.fromtimestamp(self.started).isoformat(timespec='seconds'),
+            'wall_s': time.time() - self.started,
+            'main_pid': os.getpid(),
+            'phases': {name: secs for name, _, secs in self.phases},
+            'tables': self.tables(),
+            'peak_rss_kb': {str(pid): kb for pid, kb in sorted(self.rss_kb.items())},
+            'pg_stat': {'delta': self.sampler.summary() if self.sampler is not None else {},
+                        'samples': samples},
+            'chunks': [{k: v for k, v in c.items() if k != 'spans'} for c in self.chunks],
+        }
+
+    def write(self, path):
+        """JSON report, or one CSV row per chunk when `path` ends in .csv"""
+        path = Path(path)
+        if path.suffix.lower() == '.csv':
+            fields = ['table', 'chunk', 'start', 'end', 'rows', 'bytes', 'pid', 'started', 'ended',
+                      *[f"{stage}_s" for stage in STAGES], 'chunk_rss_kb', 'rss_kb']
+            with open(path, 'w', newline='') as f:
+                w = csv.DictWriter(f, fields, extrasaction='ignore')
+                w.writeheader()
+                for c in self.chunks:
+                    w.writerow({**c, **{f"{stage}_s": c['stages'].get(stage, 0.0) for stage in STAGES}})
+        else:
+            with open(path, 'w') as f:
+                json.dump(self.summary(), f, indent=1)
+        print(f"Run report written to {path}")
+
+    def write_trace(self, path):
+        """Chrome trace-event file of every stage span, main() phase and pg_stat sample"""
+        events, tids = [], {}
+
+        def us(t):
+            return round((t - self.started) * 1e6)
+
+        def tid(pid, thread):
+            if (pid, thread) not in tids:
+                tids[pid, thread] = len(tids) + 1
+                events.append({'ph': 'M', 'name': 'thread_name', 'pid': pid, 'tid': tids[pid, thread],
+                               'args': {'name': thread}})
+            return tids[pid, thread]
+
+        main = os.getpid()
+        for pid in {c['pid'] for c in self.chunks} | {main}:
+            events.append({'ph': 'M', 'name': 'process_name', 'pid': pid,
+                           'args': {'name': 'main' if pid == main else f"worker {pid}"}})
+        for c in self.chunks:
+            for stage, pid, thread, start, secs in c['spans']:
+                events.append({'ph': 'X', 'name': stage, 'cat': c['table'], 'pid': pid, 'tid': tid(pid, thread),
+                               'ts': us(start), 'dur': round(secs * 1e6),
+                               'args': {'table': c['table'], 'chunk': c.get('chunk', c.get('file'))}})
+        for name, start, secs in self.phases:
+            events.append({'ph': 'X', 'name': name, 'cat': 'phase', 'pid': main, 'tid': tid(main, 'phases'),
+                           'ts': us(start), 'dur': round(secs * 1e6)})
+        if self.sampler is not None and self.sampler.samples:
+            events.append({'ph': 'M', 'name': 'process_name', 'pid': 0, 'args': {'name': 'postgres'}})
+            for sample in self.sampler.samples:
+                delta = self.sampler.deltas(sample)
+                events.append({'ph': 'C', 'name': 'pg_stat', 'pid': 0, 'ts': us(sample['time']),
+                               'args': {'wal_mb': delta['wal_bytes'] / (1 << 20),
+                                        'checkpoints': delta.get('checkpoints_timed', 0) + delta.get('checkpoints_req', 0)}})
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+        print(f"Chrome trace written to {path} (open in chrome://tracing or ui.perfetto.dev)")
+
+    def print(self):
+        print("=== RUN REPORT ===")
+        for table, t in sorted(self.tables().items(), key=lambda kv: -kv[1]['wall_s']):
+            busy = sum(t['stages'].values()) or 1.0
+            split = ', '.join(f"{stage} {t['stages'][stage] / busy:.0%}" for stage in STAGES if t['stages'][stage])
+            rate = (f"{t['rows_per_s']:,.0f} rows/s, {t['bytes_per_s'] / (1 << 20):.1f} MB/s"
+                    if t['rows_per_s'] else "n/a")
+            rss = f", peak RSS {t['peak_rss_kb'] / 1024:.0f} MB" if t['peak_rss_kb'] else ""
+            print(f"{table:>20}: {t['rows']} rows in {t['wall_s']:.2f}s, {rate}{rss} ({split})")
+        workers = [kb for pid, kb in self.rss_kb.items() if pid != os.getpid()]
+        if workers:
+            print(f"peak RSS: {len(workers)} workers, max {max(workers) / 1024:.0f} MB; "
+                  f"main {peak_rss_kb() / 1024:.0f} MB")
+        delta = self.sampler.summary() if self.sampler is not None else {}
+        if 'wal_bytes' in delta:
+            print(f"server: {delta['wal_bytes'] / (1 << 20):.0f} MB WAL, "
+                  f"{delta.get('checkpoints_timed', 0)} timed + {delta.get('checkpoints_req', 0)} requested checkpoints, "
+                  f"{delta.get('tup_inserted', 0)} tuples inserted")
+
+# ---------- POOLS ----------
+# One process pool and one set of warm DB connections are shared by the whole run,
+# instead of a Pool per table and a connection per chunk.
+_WORKER_POOL = None
+_COPY_CONN_POOL = None
+_WORKER_CONN = None
+_WORKER_CONNECTS = {'connections': 0, 'connect_s': 0.0}   # not yet reported by this worker
+STARTUP_STATS = {'pool_start_s': 0.0, 'workers': 0, 'connections': 0, 'connect_s': 0.0}
+
+def timed_connect():
+    t0 = time.perf_counter()
+    conn = db_connect()
+    return conn, time.perf_counter() - t0
+
+def worker_connection():
+    """This worker process's long-lived connection, reopened if it was lost"""
+    global _WORKER_CONN
+    if _WORKER_CONN is None or _WORKER_CONN.closed:
+        _WORKER_CONN, secs = timed_connect()
+        _WORKER_CONNECTS['connections'] += 1
+        _WORKER_CONNECTS['connect_s'] += secs
+    return _WORKER_CONN
+
+def take_worker_connects():
+    stats = dict(_WORKER_CONNECTS)
+    _WORKER_CONNECTS.update(connections=0, connect_s=0.0)
+    return stats
+
+def _worker_ready(_):
+    return os.getpid()
+
+def worker_pool(connect=False):
+    """The run's process pool; with `connect` every worker opens its DB connection at startup"""
+    global _WORKER_POOL
+    if _WORKER_POOL is None:
+        t0 = time.perf_counter()
+        _WORKER_POOL = Pool(WORKERS, initializer=init_worker, initargs=(worker_settings(), connect))
+        _WORKER_POOL.map(_worker_ready, range(WORKERS))
+        STARTUP_STATS['pool_start_s'] += time.perf_counter() - t0
+        STARTUP_STATS['workers'] = WORKERS
+    return _WORKER_POOL
+
+class ConnectionPool:
+    """Fixed set of warm connections, one per COPY thread"""
+
+    def __init__(self, size):
+        self._idle = queue.LifoQueue()
+        for _ in range(size):
+            self._idle.put(self._connect())
+
+    def _connect(self):
+        conn, secs = timed_connect()
+        STARTUP_STATS['connections'] += 1
+        STARTUP_STATS['connect_s'] += secs
+        return conn
+
+    @contextmanager
+    def connection(self, clock=None):
+        """Borrow a connection; commits on success (timed on `clock`) and rolls back on error"""
+        clock = clock or StageClock(trace=False)
+        conn = self._idle.get()
+        if conn.closed:
+            conn = self._connect()
+        try:
+            yield conn
+            with clock.stage('commit'):
+                conn.commit()
+        except Exception:
+            if not conn.closed:
+                conn.rollback()
+            raise
+        finally:
+            self._idle.put(conn)
+
+    def close(self):
+        while not self._idle.empty():
+            self._idle.get().close()
+
+def copy_conn_pool():
+    global _COPY_CONN_POOL
+    if _COPY_CONN_POOL is None:
+        _COPY_CONN_POOL = ConnectionPool(COPY_WORKERS)
+    return _COPY_CONN_POOL
+
+def close_pools(terminate=False):
+    global _WORKER_POOL, _COPY_CONN_POOL
+    if _WORKER_POOL is not None:
+        if terminate:
+            _WORKER_POOL.terminate()
+        else:
+            _WORKER_POOL.close()
+        _WORKER_POOL.join()
+        _WORKER_POOL = None
+    if _COPY_CONN_POOL is not None:
+        _COPY_CONN_POOL.close()
+        _COPY_CONN_POOL = None
+
+def report_startup(chunks):
+    s = STARTUP_STATS
+    print("=== STARTUP COSTS ===")
+    print(f"worker pool: {s['workers']} processes started once in {s['pool_start_s']:.2f}s")
+    avg = s['connect_s'] / s['connections'] if s['connections'] else 0.0
+    print(f"DB connections: {s['connections']} opened in {s['connect_s']:.2f}s "
+          f"(avg {avg * 1000:.1f}ms), reused for {chunks} chunks")
+
+# ---------- LOAD BACKENDS ----------
+# How a chunk's rows reach Postgres. LoadPipeline loads every chunk through the table's
+# backend: stream_chunk_to_db in the stream workers, copy_file_to_db on the COPY
+# threads in csv mode. COPY is the fastest where it is allowed; the row backends are
+# for targets that restrict it (transaction-mode poolers, managed replicas) and let
+# --backend auto compare all of them on the same data.
+_PREPARED = count()
+_PIPELINE_CONN = None
+
+def payload_rows(data):
+    """Rows of a CSV COPY payload (a CopyPipe or an open file), header skipped, with the
+    empty fields COPY reads as NULL as None"""
+    lines = data.lines() if isinstance(data, CopyPipe) else io.TextIOWrapper(data, encoding='utf-8', newline='')
+    rows = csv.reader(lines)
+    next(rows, None)
+    return ([v or None for v in row] for row in rows)
+
+def row_batches(rows, batch_rows):
+    return iter(lambda: list(islice(rows, batch_rows)), [])
+
+class LoadBackend:
+    """Writes one chunk's payload into its target relation, inside the chunk's transaction
+    (opened by stream_chunk_to_db or copy_file_to_db, which also record the chunk).
+
+    load() reads the payload (CSV or PGCOPY batches, header first) from `data`, a
+    CopyPipe or an open chunk file, and returns the number of rows the server
+    reported, or -1 if it does not report them.
+    """
+
+    def __init__(self, batch_rows=None):
+        self.batch_rows = batch_rows or INSERT_BATCH_ROWS
+
+    def connection(self):
+        """Connection a streamed chunk is loaded, recorded and committed on"""
+        return worker_connection()
+
+    def load(self, cur, table, target, data):
+        raise NotImplementedError
+
+class CopyBackend(LoadBackend):
+    """COPY FROM STDIN, in the table's COPY format (text CSV or PGCOPY binary)"""
+
+    def load(self, cur, table, target, data):
+        cur.copy_expert(copy_sql(table, target), data, size=COPY_BUFFER_SIZE)
+        return cur.rowcount
+
+class InsertBackend(LoadBackend):
+    """Multi-row INSERT ... VALUES, `batch_rows` rows per statement"""
+
+    def load(self, cur, table, target, data):
+        sql = f"INSERT INTO {target}({','.join(table_columns(table))}) VALUES %s"
+        loaded = 0
+        for batch in row_batches(payload_rows(data), self.batch_rows):
+            execute_values(cur, sql, batch, page_size=len(batch))
+            loaded += cur.rowcount
+        return loaded
+
+class PreparedBackend(LoadBackend):
+    """A prepared single-row INSERT, EXECUTEd `batch_rows` times per round trip.
+
+    Only the last EXECUTE of a round trip reports its row count, so the chunk's
+    count is not checked; --verify still compares it with the manifest. Prepared
+    statements outlive a rollback, so the statement is deallocated even when the
+    chunk fails, or it would stay on the warm connection.
+    """
+
+    def load(self, cur, table, target, data):
+        columns = table_columns(table)
+        name = f"seed_insert_{next(_PREPARED)}"
+        params = ', '.join(f"${i}" for i in range(1, len(columns) + 1))
+        cur.execute(f"PREPARE {name} AS INSERT INTO {target}({','.join(columns)}) VALUES ({params})")
+        cur.execute("SAVEPOINT seed_prepared")
+        try:
+            execute_batch(cur, f"EXECUTE {name} ({', '.join(['%s'] * len(columns))})",
+                          payload_rows(data), page_size=self.batch_rows)
+        except Exception:
+            # the aborted transaction would refuse the DEALLOCATE; the chunk still rolls back
+            cur.execute("ROLLBACK TO SAVEPOINT seed_prepared")
+            raise
+        finally:
+            cur.execute(f"DEALLOCATE {name}")
+        return -1
+
+class PipelineBackend(LoadBackend):
+    """Experimental: multi-row INSERT ... VALUES in psycopg 3 pipeline mode, statements
+    sent back to back without waiting for each one's result. bench_db.py --suite
+    backends is its smoke check against a real server.
+
+    Runs on the worker's psycopg 3 connection, which the chunk is also recorded and
+    committed on, so it only applies to --mode stream. Row counts arrive after the
+    pipeline is synced and are not checked.
+    """
+
+    def connection(self):
+        global _PIPELINE_CONN
+        if _PIPELINE_CONN is None or _PIPELINE_CONN.closed:
+            t0 = time.perf_counter()
+            _PIPELINE_CONN = psycopg.connect(host=DB_HOST, dbname=DB_NAME, user=DB_USER,
+                                             password=DB_PASS, port=DB_PORT)
+            _WORKER_CONNECTS['connections'] += 1
+            _WORKER_CONNECTS['connect_s'] += time.perf_counter() - t0
+        return _PIPELINE_CONN
+
+    def load(self, cur, table, target, data):
+        columns = table_columns(table)
+        batch_rows = min(self.batch_rows, 65535 // len(columns))   # bind parameters per statement
+        row = f"({', '.join(['%s'] * len(columns))})"
+        insert = f"INSERT INTO {target}({','.join(columns)}) VALUES "
+        with cur.connection.pipeline():
+            for batch in row_batches(payload_rows(data), batch_rows):
+                cur.execute(insert + ', '.join([row] * len(batch)), [v for r in batch for v in r])
+        return -1
+
+BACKENDS = {'copy': CopyBackend, 'copy-binary': CopyBackend, 'insert': InsertBackend,
+            'prepared': PreparedBackend, 'pipeline': PipelineBackend}
+
+def parse_backend(value):
+    """--backend [TABLE=]NAME"""
+    table, _, name = value.rpartition('=')
+    if name not in (*BACKENDS, 'auto'):
+        raise argparse.ArgumentTypeError(f"unknown backend {name} (choose from {', '.join(BACKENDS)} or auto)")
+    if table and table not in GEN_FUNCS:
+        raise argparse.ArgumentTypeError(f"unknown table {table}")
+    return table or None, name
+
+def use_backend(table, name, batch_rows=None, workers=None):
+    """Load `table` with backend `name`. copy-binary is COPY with the PGCOPY payload; the
+    other backends read the CSV one."""
+    if name in ('copy', 'copy-binary'):
+        batch_rows = None
+    LOAD_BACKENDS[table] = (name, batch_rows, workers)
+    if name == 'copy-binary':
+        COPY_FORMATS[table] = 'binary'
+    else:
+        COPY_FORMATS.pop(table, None)
+
+def table_backend(table):
+    name, batch_rows, _ = LOAD_BACKENDS.get(table, ('copy', None, None))
+    return BACKENDS[name](batch_rows)
+
+def backend_label(table):
+    name, batch_rows, workers = LOAD_BACKENDS.get(table, ('copy', None, None))
+    if name == 'copy' and COPY_FORMATS.get(table) == 'binary':
+        name = 'copy-binary'
+    return name + (f"/{batch_rows}" if batch_rows else '') + (f" x{workers}" if workers else '')
+
+def table_workers(table):
+    """Chunks of `table` loaded at once (the autotuned worker count, or all workers)"""
+    return LOAD_BACKENDS.get(table, (None, None, None))[2] or WORKERS
+
+def copy_file_to_db(fname, table, keep=False, chunk=None, clock=None):
+    """Load one chunk file with the table's backend; `chunk` = (task, crc, fingerprint) also
+    checks the loaded row count and records it in the manifest, atomically.
+
+    Load and commit times are added to `clock`.
+    """
+    clock = clock or StageClock(trace=False)
+    with copy_conn_pool().connection(clock) as conn, conn.cursor() as cur, open(fname, 'rb') as f:
+        target = copy_target(table, chunk[0][1]) if chunk is not None else table
+        with clock.stage('copy'):
+            loaded = table_backend(table).load(cur, table, target, f)
+            if chunk is not None:
+                check_rowcount(loaded, chunk[0])
+                record_chunk(cur, *chunk)
+    if not keep:
+        try:
+            os.remove(fname)
+        except Exception:
+            pass
+    return fname
+
+def stream_chunk_to_db(task):
+    """Generate one chunk and load it with the table's backend without touching disk"""
+    table, start, end, idx = task
+    started, t0 = time.time(), time.perf_counter()
+    clock = StageClock()
+    backend = table_backend(table)
+    conn = backend.connection()
+    try:
+        with conn.cursor() as cur:
+            fingerprint = new_fingerprint(table)
+            pipe = CopyPipe(iter_chunk_batches(table, start, end, clock, fingerprint))
+            try:
+                with clock.stage('copy'):
+                    loaded = backend.load(cur, table, copy_target(table, start), pipe)
+            finally:
+                pipe.close()
+            check_rowcount(loaded, task)
+            fingerprint = fingerprint and fingerprint.text()
+            crc = import_checksum(task, pipe.crc)
+            record_chunk(cur, task, crc, fingerprint)
+        with clock.stage('commit'):
+            conn.commit()
+    except Exception:
+        if not conn.closed:
+            conn.rollback()
+        raise
+    return {'table': table, 'idx': idx, 'start': start, 'end': end, 'rows': end - start,
+            'bytes': pipe.bytes_read, 'checksum': f"{crc:08x}", 'fingerprint': fingerprint, 'gen_s': pipe.gen_seconds, 'load_s': time.perf_counter() - t0, 'connects': take_worker_connects(),
+            'stats': chunk_stats(task, clock, started, nbytes=pipe.bytes_read)}
+
+# ---------- AUTOTUNE ----------
+def autotune_candidates(mode):
+    """(backend, batch rows) pairs to calibrate for a `mode` load; COPY has no batch size.
+    pipeline loads on the stream workers' own connections, so only stream mode can use it."""
+    row_backends = ['insert', 'prepared'] + (['pipeline'] if psycopg is not None and mode == 'stream' else [])
+    return [('copy', None), ('copy-binary', None)] + [(b, n) for b in row_backends for n in AUTOTUNE_BATCH_ROWS]
+
+def scratch_table(conn, table, indexes):
+    """Create and commit an empty calibration copy of `table` on the autocommit `conn` and
+    return its name.
+
+    Every calibration of the table loads into this one relation, so N concurrent
+    workers contend for its heap and extension lock like the real load. It is a
+    regular table, paying for WAL and shared buffers: UNLOGGED when LOAD_STRATEGY COPYs
+    into unlogged relations, and without indexes when the constraints are dropped for
+    the load. A private sequence keeps the table's own from being advanced.
+    """
+    target = f"autotune_{table}_{os.getpid()}"
+    pk = None if EXPLICIT_IDS else primary_key_column(table)
+    unlogged = 'UNLOGGED ' if LOAD_STRATEGY != 'heap' else ''
+    with conn.cursor() as cur:
+        cur.execute(f"DROP TABLE IF EXISTS {target}")
+        cur.execute(f"CREATE {unlogged}TABLE {target} (LIKE {table}{' INCLUDING INDEXES' if indexes else ''})")
+        if pk is not None:
+            cur.execute(f"CREATE SEQUENCE {target}_seq OWNED BY {target}.{pk}")
+            cur.execute(f"ALTER TABLE {target} ALTER COLUMN {pk} SET DEFAULT nextval('{target}_seq')")
+    return target
+
+def calibrate(job):
+    """Worker: load `rows` generated rows of `table` with one backend into the scratch
+    table `target`, roll back and return the seconds the load took"""
+    table, name, batch_rows, rows, target = job
+    use_backend(table, name, batch_rows)
+    backend = table_backend(table)
+    conn = backend.connection()
+    try:
+        with conn.cursor() as cur:
+            t0 = time.perf_counter()
+            pipe = CopyPipe(iter_chunk_batches(table, 0, rows))
+            try:
+                loaded = backend.load(cur, table, target, pipe)
+            finally:
+                pipe.close()
+            secs = time.perf_counter() - t0
+        check_rowcount(loaded, (table, 0, rows, 0))
+    finally:
+        if not conn.closed:
+            conn.rollback()
+    return secs
+
+def autotune(tables, mode, indexes=True, rows=AUTOTUNE_ROWS):
+    """Calibrate every table of at least `rows` rows on this host: time a load of `rows`
+    rows with each backend and batch size, then the fastest one with 1, 2, 4, ...
+    concurrent workers all writing into the same scratch table, and load the table with
+    the best of both. Smaller tables keep COPY.
+    `mode`: the load mode, `indexes`: whether the loaded tables keep their indexes."""
+    pool = worker_pool(connect=True)
+    widths = sorted({1, WORKERS} | {w for w in (2, 4, 8, 16, 32) if w < WORKERS})
+    print(f"=== AUTOTUNE ({rows} rows per calibration load) ===")
+    conn = db_connect()
+    conn.autocommit = True
+    try:
+        for table in tables:
+            if SIZES[table] < rows:
+                continue
+            target = scratch_table(conn, table, indexes)
+
+            def measure(name, batch_rows, n):
+                """(wall seconds, per-worker seconds) of n concurrent loads into the emptied table"""
+                with conn.cursor() as cur:
+                    cur.execute(f"TRUNCATE {target}")
+                t0 = time.perf_counter()
+                secs = pool.map(calibrate, [(table, name, batch_rows, rows, target)] * n, chunksize=1)
+                return time.perf_counter() - t0, secs
+
+            try:
+                times = {(name, batch_rows): min(measure(name, batch_rows, 1)[1][0] for _ in range(AUTOTUNE_REPEAT))
+                         for name, batch_rows in autotune_candidates(mode)}
+                name, batch_rows = min(times, key=times.get)
+                rates = {n: n * rows / measure(name, batch_rows, n)[0] for n in widths}
+            finally:
+                with conn.cursor() as cur:
+                    cur.execute(f"DROP TABLE IF EXISTS {target}")
+            workers = max(rates, key=rates.get)
+            use_backend(table, name, batch_rows, workers)
+            tried = ', '.join(f"{n}{f'/{b}' if b else ''} {rows / s:,.0f}"
+                              for (n, b), s in sorted(times.items(), key=lambda kv: kv[1]))
+            print(f"{table}: {backend_label(table)}, {rates[workers]:,.0f} rows/s ({tried} rows/s on one worker)")
+    finally:
+        conn.close()
+        # the workers were started with the settings from before the calibration
+        close_pools()
+
+# ---------- CHUNK MANIFEST ----------
+def check_rowcount(loaded, task):
+    """Fail the chunk's transaction if its backend loaded another number of rows than
+    generated (`loaded` < 0: the backend does not report it)"""
+    table, start, end, idx = task
+    if loaded >= 0 and loaded != end - start:
+        raise RuntimeError(f"{table} chunk {idx}: loaded {loaded} rows, expected {end - start}")
+
+def record_chunk(cur, task, crc, fingerprint=None):
+    """Mark a chunk committed; runs in the COPY's transaction so both commit together"""
+    table, start, end, idx = task
+    cur.execute(f"""
+        INSERT INTO {MANIFEST_TABLE} (table_name, start_gi, end_gi, chunk_idx, checksum, fingerprint)
+        VALUES (%s, %s, %s, %s, %s, %s)
+        ON CONFLICT (table_name, start_gi) DO UPDATE
+        SET end_gi = EXCLUDED.end_gi, chunk_idx = EXCLUDED.chunk_idx, checksum = EXCLUDED.checksum,
+            fingerprint = EXCLUDED.fingerprint, committed_at = now()
+    """, (table, start, end, idx, f"{crc:08x}", fingerprint))
+
+class ChunkManifest:
+    """Committed chunks of the current load, used by --resume.
+
+    The tracking table in the target DB is authoritative because it commits in the
+    same transaction as each chunk; the local JSON lines file is a mirror for
+    inspection and for tools that have no DB access.
+    """
+
+    def __init__(self, path=MANIFEST_FILE):
+        self.path = Path(path)
+
+    def ensure_table(self):
+        conn = db_connect()
+        with conn, conn.cursor() as cur:
+            cur.execute(f"""
+                CREATE TABLE IF NOT EXISTS {MANIFEST_TABLE} (
+                  table_name TEXT NOT NULL,
+                  start_gi BIGINT NOT NULL,
+                  end_gi BIGINT NOT NULL,
+                  chunk_idx INT NOT NULL,
+                  checksum TEXT NOT NULL,
+                  fingerprint TEXT,
+                  committed_at TIMESTAMP NOT NULL DEFAULT now(),
+                  PRIMARY KEY (table_name, start_gi)
+                )
+            """)
+            cur.execute(f"ALTER TABLE {MANIFEST_TABLE} ADD COLUMN IF NOT EXISTS fingerprint TEXT")
+        conn.close()
+
+    def reset(self):
+        conn = db_connect()
+        with conn, conn.cursor() as cur:
+            cur.execute(f"TRUNCATE {MANIFEST_TABLE}")
+        conn.close()
+        self.path.unlink(missing_ok=True)
+
+    def committed(self):
+        """{table: [(start, end), ...]} of chunks already in the DB"""
+        conn = db_connect()
+        with conn, conn.cursor() as cur:
+            cur.execute(f"SELECT table_name, start_gi, end_gi FROM {MANIFEST_TABLE}")
+            rows = cur.fetchall()
+        conn.close()
+        done = defaultdict(list)
+        for table, start, end in rows:
+            done[table].append((start, end))
+        return done
+
+    def chunks(self):
+        """[(table, start, end, chunk index, fingerprint text or None)] of every committed chunk"""
+        conn = db_connect()
+        with conn, conn.cursor() as cur:
+            cur.execute(f"SELECT table_name, start_gi, end_gi, chunk_idx, fingerprint FROM {MANIFEST_TABLE} "
+                        f"ORDER BY table_name, start_gi")
+            rows = cur.fetchall()
+        conn.close()
+        return rows
+
+    def append(self, entries):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            for e in entries:
+                f.write(json.dumps(e) + '\n')
+
+# FK dependency graph
+def schema_fk_parents(path=SCHEMA_FILE):
+    """Parent tables of every table, parsed from the FOREIGN KEY clauses of the schema file"""
+    parents = {}
+    for table, body in schema_tables(path):
+        parents[table] = {p for p in re.findall(r"REFERENCES (\w+)\s*\(", body) if p != table}
+    return parents
+
+def db_fk_parents():
+    """Parent tables of every table, introspected from information_schema"""
+    conn = db_connect()
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT tc.table_name, ccu.table_name
+        FROM information_schema.table_constraints tc
+        JOIN information_schema.constraint_column_usage ccu
+          ON ccu.constraint_name = tc.constraint_name AND ccu.table_schema = tc.table_schema
+        WHERE tc.constraint_type = 'FOREIGN KEY' AND tc.table_schema = 'public'
+    """)
+    parents = defaultdict(set)
+    for child, parent in cur.fetchall():
+        if child != parent:
+            parents[child].add(parent)
     cur.close()
     conn.close()
-    print("Truncation complete\n")
+    return parents
+
+def fk_parents(source='schema'):
+    found = schema_fk_parents() if source == 'schema' else db_fk_parents()
+    return {t: set(found.get(t, ())) & set(GEN_FUNCS) for t in GEN_FUNCS}
+
+def load_order(parents):
+    """Topological order of the FK graph, tables with the most downstream rows first"""
+    children = defaultdict(set)
+    for t, ps in parents.items():
+        for p in ps:
+            children[p].add(t)
+
+    def downstream(t, seen):
+        for c in children[t]:
+            if c not in seen:
+                seen.add(c)
+                downstream(c, seen)
+        return seen
+
+    weight = {t: sum(SIZES[c] for c in downstream(t, set())) for t in parents}
+    indegree = {t: len(ps) for t, ps in parents.items()}
+    heap = [(-weight[t], t) for t, n in indegree.items() if n == 0]
+    heapq.heapify(heap)
+    order = []
+    while heap:
+        _, t = heapq.heappop(heap)
+        order.append(t)
+        for c in children[t]:
+            indegree[c] -= 1
+            if indegree[c] == 0:
+                heapq.heappush(heap, (-weight[c], c))
+    if len(order) != len(parents):
+        raise ValueError(f"FK cycle between tables: {sorted(set(parents) - set(order))}")
+    return order
+
+def timed_write_chunk(task):
+    started, t0 = time.time(), time.perf_counter()
+    clock = StageClock()
+    fname, crc, fingerprint = write_chunk(task, clock)
+    stats = chunk_stats(task, clock, started, nbytes=os.path.getsize(fname))
+    return task, fname, crc, fingerprint, time.perf_counter() - t0, stats
+
+class LoadStrategy:
+    """Where a table's chunks are COPYed, and how the table is switched over once they all are.
+
+    heap: straight into the table. unlogged: the table is SET UNLOGGED before its
+    first chunk (no per-row WAL) and SET LOGGED after its last one, which writes it
+    to WAL in one sequential pass, or not at all with wal_level=minimal. A logged
+    table cannot reference an unlogged one, so this needs --defer-constraints.
+    partitions: every slice of the gi range (stage_ranges) is COPYed into its own
+    UNLOGGED staging table, so concurrent workers never contend for one heap. At
+    switch-over the slices are SET LOGGED and ATTACHed when the target is
+    partitioned on its primary key (needs --explicit-ids), or moved with
+    INSERT ... SELECT otherwise.
+
+    Unlogged relations are emptied by crash recovery: after a server crash, rerun
+    without --resume.
+    """
+
+    def __init__(self, name=LOAD_STRATEGY, fresh=True, workers=COPY_WORKERS):
+        if name not in LOAD_STRATEGIES:
+            raise ValueError(f"unknown load strategy {name}")
+        self.name = name
+        self.fresh = fresh
+        self.workers = workers
+
+    @property
+    def switches(self):
+        return self.name != 'heap'
+
+    def _run(self, statements):
+        conn = db_connect()
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            for sql in statements:
+                cur.execute(sql)
+        conn.close()
+
+    def _query(self, sql, params=()):
+        conn = db_connect()
+        with conn, conn.cursor() as cur:
+            cur.execute(sql, params)
+            rows = cur.fetchall()
+        conn.close()
+        return rows
+
+    def partitioned(self, table):
+        return self._query("SELECT relkind = 'p' FROM pg_class WHERE oid = %s::regclass", (table,))[0][0]
+
+    def prepare(self, table):
+        """Run before the table's first chunk is COPYed"""
+        if self.name == 'unlogged':
+            self._run([f"ALTER TABLE {table} SET UNLOGGED"])
+        elif self.name == 'partitions':
+            if self.partitioned(table) and not EXPLICIT_IDS:
+                raise RuntimeError(f"{table} is partitioned: staging slices can only be attached with --explicit-ids")
+            statements = []
+            for k in range(len(stage_ranges(table))):
+                stage = stage_table(table, k)
+                if self.fresh:
+                    statements.append(f"DROP TABLE IF EXISTS {stage}")
+                statements.append(f"CREATE UNLOGGED TABLE IF NOT EXISTS {stage} (LIKE {table} INCLUDING DEFAULTS)")
+            self._run(statements)
+
+    def finish(self, table):
+        """Switch the table over once all of its chunks are committed; safe to repeat"""
+        if self.name == 'unlogged':
+            self._run([f"ALTER TABLE {table} SET LOGGED"])
+        elif self.name == 'partitions':
+            stages = [(stage_table(table, k), lo, hi) for k, (lo, hi) in enumerate(stage_ranges(table))]
+            names = [name for name, _, _ in stages]
+            existing = {r[0] for r in self._query(
+                "SELECT relname FROM pg_class WHERE relname = ANY(%s) AND relkind = 'r'", (names,))}
+            stages = [s for s in stages if s[0] in existing]
+            if not stages:
+                return
+            if self.partitioned(table):
+                # each slice becomes durable on its own, in parallel; ATTACH is then a catalog change
+                with ThreadPoolExecutor(max_workers=self.workers) as ex:
+                    list(ex.map(lambda s: self._run([f"ALTER TABLE {s[0]} SET LOGGED"]), stages))
+                self._run([f"ALTER TABLE {table} ATTACH PARTITION {name} FOR VALUES FROM ({lo + 1}) TO ({hi + 1})"
+                           for name, lo, hi in stages])
+            else:
+                # one sequential bulk insert per slice, in gi order
+                for name, _, _ in stages:
+                    conn = db_connect()
+                    with conn, conn.cursor() as cur:
+                        cur.execute(f"INSERT INTO {table} SELECT * FROM {name}")
+                        cur.execute(f"DROP TABLE {name}")
+                    conn.close()
+
+class LoadPipeline:
+    """Producer/consumer scheduler that overlaps generation and COPY.
+
+    `parents` is the FK graph ({table: set of parent tables}). A table's chunks
+    are only loaded once all of its parents are committed, and every table whose
+    parents are done loads concurrently, sharing the same worker pools.
+
+    In csv mode a process pool writes chunk files (in topological order) and COPY
+    threads load each one as soon as it is produced; at most `max_pending` chunks
+    are generated ahead of the loader, which caps disk usage. In stream mode each
+    chunk is generated and loaded by the same worker, so chunks of a table are
+    only started once the table is ready.
+    """
+
+    def __init__(self, parents, mode=LOAD_MODE, keep=False, max_pending=MAX_PENDING_CHUNKS,
+                 committed=None, manifest=None, strategy=None, tuner=None):
+        self.parents = parents
+        self.strategy = strategy or LoadStrategy('heap')
+        self.tuner = tuner
+        self.tables = load_order(parents)
+        self.mode = mode
+        self.keep = keep
+        self.max_pending = max_pending
+        self.manifest = manifest
+        self.events = queue.Queue()
+        committed = committed or {}
+        self.todo = {table: deque(table_tasks(table, committed.get(table, ()))) for table in self.tables}
+        self.total = sum(len(q) for q in self.todo.values())
+        self.remaining = {table: len(q) for table, q in self.todo.items()}
+        self.done = {table for table, n in self.remaining.items() if n == 0}
+        self.started = set()
+        self.next_idx = {table: count(max([t[3] for t in q], default=-1) + 1) for table, q in self.todo.items()}
+        self.gen_secs = {}
+        self.gen_stats = {}
+        self.waiting = {table: [] for table in self.tables}
+        self.in_flight = 0
+        self.active = dict.fromkeys(self.tables, 0)   # chunks of each table generating or loading
+        self.switching = 0
+        self.peak_pending = 0
+        self.busy = {'generate': 0.0, 'copy': 0.0, 'switch': 0.0}
+
+    def unlocked(self, table):
+        return self.parents[table] <= self.done
+
+    def _next_table(self):
+        for table in self.tables:
+            if self.todo[table] and (self.mode == 'csv' or self.unlocked(table)) \
+                    and self.active[table] < table_workers(table):
+                return table
+        return None
+
+    def _fail(self, e):
+        self.events.put(('error', e))
+
+    def _submit_next(self, pool):
+        table = self._next_table()
+        if table is None:
+            return False
+        task = self.todo[table].popleft()
+        if table not in self.started:
+            self.started.add(table)
+            tqdm.write(f"Starting {table}: {SIZES[table]} rows in {self.remaining[table]} chunks "
+                       f"({backend_label(table)})")
+            self.strategy.prepare(table)
+        if self.mode == 'stream':
+            pool.apply_async(stream_chunk_to_db, (task,),
+                             callback=lambda r: self.events.put(('streamed', r)), error_callback=self._fail)
+        else:
+            pool.apply_async(timed_write_chunk, (task,),
+                             callback=lambda r: self.events.put(('generated', r)), error_callback=self._fail)
+        self.in_flight += 1
+        self.active[table] += 1
+        self.peak_pending = max(self.peak_pending, self.in_flight)
+        return True
+
+    def _copy(self, task, fname, crc, fingerprint):
+        started, t0 = time.time(), time.perf_counter()
+        clock = StageClock()
+        copy_file_to_db(fname, task[0], self.keep, chunk=(task, crc, fingerprint), clock=clock)
+        return task, crc, fingerprint, time.perf_counter() - t0, clock_stats(clock, started)
+
+    def _submit_copy(self, copier, task, fname, crc, fingerprint):
+        fut = copier.submit(self._copy, task, fname, crc, fingerprint)
+        fut.add_done_callback(self._copy_done)
+
+    def _copy_done(self, fut):
+        if fut.cancelled():
+            return
+        if fut.exception() is not None:
+            self._fail(fut.exception())
+        else:
+            self.events.put(('copied', fut.result()))
+
+    def _record(self, task, crc, fingerprint):
+        if self.manifest is not None:
+            table, start, end, idx = task
+            self.manifest.append([{'table': table, 'chunk': idx, 'start': start, 'end': end,
+                                   'rows': end - start, 'checksum': f"{crc:08x}", 'fingerprint': fingerprint}])
+
+    def _tune(self, task, secs, bar):
+        """Feed a finished chunk's time to the tuner and re-cut the table's pending chunks"""
+        table, start, end, _ = task
+        self.tuner.observe(table, end - start, secs)
+        tasks = self.tuner.resplit(table, self.todo[table], self.next_idx[table])
+        if tasks is None:
+            return
+        delta = len(tasks) - len(self.todo[table])
+        tqdm.write(f"Re-chunked {table}: {len(self.todo[table])} -> {len(tasks)} pending chunks "
+                   f"of ~{self.tuner.sizes[table]} rows")
+        self.todo[table] = deque(tasks)
+        self.remaining[table] += delta
+        self.total += delta
+        bar.total += delta
+        bar.refresh()
+
+    def _chunk_loaded(self, table, copier, bar):
+        self.in_flight -= 1
+        self.active[table] -= 1
+        self.remaining[table] -= 1
+        bar.update(1)
+        if self.remaining[table] == 0:
+            tqdm.write(f"COPY finished for {table}")
+            if self.strategy.switches:
+                self.switching += 1
+                fut = self.switcher.submit(self._switch, table)
+                fut.add_done_callback(self._switch_done)
+            else:
+                self._table_done(table, copier)
+
+    def _switch(self, table):
+        t0 = time.perf_counter()
+        self.strategy.finish(table)
+        return table, time.perf_counter() - t0
+
+    def _switch_done(self, fut):
+        if fut.cancelled():
+            return
+        if fut.exception() is not None:
+            self._fail(fut.exception())
+        else:
+            self.events.put(('switched', fut.result()))
+
+    def _table_done(self, table, copier):
+        self.done.add(table)
+        for t in self.tables:
+            if self.waiting[t] and self.unlocked(t):
+                for task, fname, crc, fingerprint in self.waiting[t]:
+                    self._submit_copy(copier, task, fname, crc, fingerprint)
+                self.waiting[t] = []
+
+    def run(self):
+        total = self.total
+        if self.mode == 'csv':
+            OUT_DIR.mkdir(parents=True, exist_ok=True)
+        print(f"Pipelined {self.mode} load: {total} chunks, {WORKERS} generate workers, "
+              f"{COPY_WORKERS} COPY workers, max {self.max_pending} pending chunks")
+        t0 = time.perf_counter()
+        pool = worker_pool(connect=self.mode == 'stream')
+        if self.mode == 'csv':
+            copy_conn_pool()
+        copier = ThreadPoolExecutor(max_workers=COPY_WORKERS, thread_name_prefix='copy')
+        self.switcher = ThreadPoolExecutor(max_workers=COPY_WORKERS)
+        try:
+            if self.strategy.switches and not self.strategy.fresh:
+                # resumed: tables whose chunks were all committed may not have been switched over
+                for table in self.done:
+                    self.strategy.finish(table)
+            with tqdm(total=total) as bar:
+                while self.in_flight or self.switching or any(self.todo.values()):
+                    while self.in_flight < self.max_pending and self._submit_next(pool):
+                        pass
+                    kind, payload = self.events.get()
+                    if kind == 'error':
+                        raise payload
+                    if kind == 'generated':
+                        task, fname, crc, fingerprint, secs, stats = payload
+                        self.busy['generate'] += secs
+                        self.gen_secs[task] = secs
+                        if REPORT is not None:
+                            self.gen_stats[task] = stats
+                        if self.unlocked(task[0]):
+                            self._submit_copy(copier, task, fname, crc, fingerprint)
+                        else:
+                            self.waiting[task[0]].append((task, fname, crc, fingerprint))
+                    elif kind == 'copied':
+                        task, crc, fingerprint, secs, stats = payload
+                        self.busy['copy'] += secs
+                        self._record(task, crc, fingerprint)
+                        if REPORT is not None:
+                            REPORT.add_chunk(self.gen_stats.pop(task), copy=stats)
+                        if self.tuner is not None:
+                            self._tune(task, self.gen_secs.pop(task, 0.0) + secs, bar)
+                        self._chunk_loaded(task[0], copier, bar)
+                    elif kind == 'streamed':
+                        self.busy['generate'] += payload['gen_s']
+                        self.busy['copy'] += payload['load_s']
+                        STARTUP_STATS['connections'] += payload['connects']['connections']
+                        STARTUP_STATS['connect_s'] += payload['connects']['connect_s']
+                        task = (payload['table'], payload['start'], payload['end'], payload['idx'])
+                        self._record(task, int(payload['checksum'], 16), payload['fingerprint'])
+                        if REPORT is not None:
+                            REPORT.add_chunk(payload['stats'])
+                        if self.tuner is not None:
+                            self._tune(task, payload['load_s'], bar)
+                        self._chunk_loaded(payload['table'], copier, bar)
+                    elif kind == 'switched':
+                        table, secs = payload
+                        self.busy['switch'] += secs
+                        self.switching -= 1
+                        tqdm.write(f"Switched over {table} ({self.strategy.name}) in {secs:.2f}s")
+                        self._table_done(table, copier)
+        except BaseException:
+            close_pools(terminate=True)
+            raise
+        finally:
+            copier.shutdown(wait=True, cancel_futures=True)
+            self.switcher.shutdown(wait=True, cancel_futures=True)
+        self.report(time.perf_counter() - t0)
+
+    def report(self, wall):
+        copy_workers = WORKERS if self.mode == 'stream' else COPY_WORKERS
+        print("=== PIPELINE STATS ===")
+        print(f"wall time: {wall:.2f}s")
+        for stage, workers in (('generate', WORKERS), ('copy', copy_workers)):
+            util = self.busy[stage] / (wall * workers) if wall > 0 else 0.0
+            print(f"{stage:>8}: {self.busy[stage]:.2f}s busy across {workers} workers, {util:.0%} utilized")
+        print(f"peak pending chunks: {self.peak_pending}/{self.max_pending}")
+        if self.strategy.switches:
+            print(f"{'switch':>8}: {self.busy['switch']:.2f}s ({self.strategy.name})")
+
+class DeferredConstraints:
+    """Drop PK/UNIQUE/FK constraints and indexes before a bulk load and rebuild them after.
+
+    Definitions are captured from the catalog and saved to DEFERRED_DDL_FILE before
+    anything is dropped, so an interrupted load can still be restored with
+    --restore-constraints. Rebuild runs in three timed phases: PK/UNIQUE constraints
+    and indexes (in parallel across tables), FKs added NOT VALID, and a final
+    parallel VALIDATE pass.
+    """
+
+    def __init__(self, tables, path=DEFERRED_DDL_FILE, workers=COPY_WORKERS):
+        self.tables = list(tables)
+        self.path = Path(path)
+        self.workers = workers
+        self.defs = None
+        self.timings = {}
+
+    def _timed(self, phase, fn, *args):
+        t0 = time.perf_counter()
+        result = fn(*args)
+        self.timings[phase] = self.timings.get(phase, 0.0) + time.perf_counter() - t0
+        return result
+
+    def capture(self):
+        if self.path.exists():
+            # left over from an interrupted load: the catalog may already be missing them
+            self.defs = json.loads(self.path.read_text())
+            return self.defs
+        conn = db_connect()
+        with conn, conn.cursor() as cur:
+            cur.execute("""
+                SELECT c.conrelid::regclass::text, c.conname, c.contype, pg_get_constraintdef(c.oid)
+                FROM pg_constraint c
+                WHERE c.contype IN ('p', 'u', 'f') AND c.conrelid::regclass::text = ANY(%s)
+                ORDER BY c.conrelid::regclass::text, c.conname
+            """, (self.tables,))
+            constraints = [{'table': t, 'name': n, 'type': k, 'def': d} for t, n, k, d in cur.fetchall()]
+            cur.execute("""
+                SELECT i.indrelid::regclass::text, ci.relname, pg_get_indexdef(i.indexrelid)
+                FROM pg_index i
+                JOIN pg_class ci ON ci.oid = i.indexrelid
+                WHERE i.indrelid::regclass::text = ANY(%s)
+                  AND NOT EXISTS (SELECT 1 FROM pg_constraint c
+                                  WHERE c.conindid = i.indexrelid AND c.conrelid = i.indrelid
+                                    AND c.contype IN ('p', 'u', 'x'))
+                ORDER BY 1, 2
+            """, (self.tables,))
+            indexes = [{'table': t, 'name': n, 'def': d} for t, n, d in cur.fetchall()]
+        conn.close()
+        self.defs = {'constraints': constraints, 'indexes': indexes}
+        self.path.write_text(json.dumps(self.defs, indent=1))
+        return self.defs
+
+    def _drop(self):
+        conn = db_connect()
+        with conn, conn.cursor() as cur:
+            # FKs first: they depend on the referenced tables' PK/UNIQUE indexes
+            for c in sorted(self.defs['constraints'], key=lambda c: c['type'] != 'f'):
+                cur.execute(f"ALTER TABLE {c['table']} DROP CONSTRAINT IF EXISTS {c['name']}")
+            for i in self.defs['indexes']:
+                cur.execute(f"DROP INDEX IF EXISTS {i['name']}")
+        conn.close()
+
+    def drop(self):
+        self.capture()
+        print(f"Dropping {len(self.defs['constraints'])} constraints and {len(self.defs['indexes'])} indexes")
+        self._timed('drop', self._drop)
+
+    def _existing(self):
+        conn = db_connect()
+        with conn, conn.cursor() as cur:
+            cur.execute("SELECT conname FROM pg_constraint WHERE conrelid::regclass::text = ANY(%s)", (self.tables,))
+            names = {r[0] for r in cur.fetchall()}
+            cur.execute("SELECT indexrelid::regclass::text FROM pg_index WHERE indrelid::regclass::text = ANY(%s)",
+                        (self.tables,))
+            names |= {r[0] for r in cur.fetchall()}
+        conn.close()
+        return names
+
+    def _run(self, statements):
+        conn = db_connect()
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            cur.execute("SET maintenance_work_mem = %s", (MAINTENANCE_WORK_MEM,))
+            for sql in statements:
+                cur.execute(sql)
+        conn.close()
+
+    def _parallel(self, batches):
+        with ThreadPoolExecutor(max_workers=self.workers) as ex:
+            for fut in [ex.submit(self._run, b) for b in batches if b]:
+                fut.result()
+
+    def restore(self):
+        if self.defs is None:
+            self.capture()
+        existing = self._existing()
+        per_table = defaultdict(list)
+        fks = []
+        for c in self.defs['constraints']:
+            if c['name'] in existing:
+                continue
+            if c['type'] == 'f':
+                fks.append(c)
+            else:
+                per_table[c['table']].append(f"ALTER TABLE {c['table']} ADD CONSTRAINT {c['name']} {c['def']}")
+        for i in self.defs['indexes']:
+            if i['name'] not in existing:
+                per_table[i['table']].append(i['def'])
+        print(f"Rebuilding indexes on {len(per_table)} tables with {self.workers} workers "
+              f"(maintenance_work_mem={MAINTENANCE_WORK_MEM})")
+        self._timed('build indexes', self._parallel, list(per_table.values()))
+        # NOT VALID is a catalog-only change; the lock on both tables makes parallel adds pointless
+        self._timed('add foreign keys', self._run,
+                    [f"ALTER TABLE {c['table']} ADD CONSTRAINT {c['name']} {c['def']} NOT VALID" for c in fks])
+        print(f"Validating {len(fks)} foreign keys")
+        self._timed('validate foreign keys', self._parallel,
+                    [[f"ALTER TABLE {c['table']} VALIDATE CONSTRAINT {c['name']}"] for c in fks])
+        self.path.unlink(missing_ok=True)
+
+    def report(self):
+        print("=== CONSTRAINT PHASES ===")
+        for phase, secs in self.timings.items():
+            print(f"{phase:>22}: {secs:.2f}s")
+
+# ---------- RESET ----------
+def truncate_all_tables():
+    """Empty every generated table and restart its identity with a single TRUNCATE"""
+    print("=== TRUNCATING EXISTING DATA ===")
+    t0 = time.perf_counter()
+    conn = db_connect()
+    with conn, conn.cursor() as cur:
+        cur.execute(f"TRUNCATE TABLE {', '.join(SPECS)} RESTART IDENTITY")
+    conn.close()
+    print(f"Truncated {len(SPECS)} tables in {time.perf_counter() - t0:.2f}s\n")
+
+def clone_database(source, target):
+    """Drop `target` and recreate it as a copy of `source` with CREATE DATABASE ... TEMPLATE.
 
-def main():
-    import time
+    Both databases must be free of other sessions, so those are terminated first.
+    From PostgreSQL 15 the copy uses STRATEGY FILE_COPY, which copies the files after one
+    checkpoint instead of WAL-logging every block.
+    """
+    if source == target:
+        raise SystemExit(f"cannot clone {source} onto itself")
+    t0 = time.perf_counter()
+    conn = db_connect(MAINTENANCE_DB)
+    conn.autocommit = True   # CREATE/DROP DATABASE cannot run inside a transaction
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1 FROM pg_database WHERE datname = %s", (source,))
+            if cur.fetchone() is None:
+                raise SystemExit(f"database {source} does not exist")
+            cur.execute("SELECT pg_terminate_backend(pid) FROM pg_stat_activity "
+                        "WHERE datname = ANY(%s) AND pid <> pg_backend_pid()", ([source, target],))
+            cur.execute(sql.SQL("DROP DATABASE IF EXISTS {}").format(sql.Identifier(target)))
+            strategy = sql.SQL(" STRATEGY = FILE_COPY" if conn.server_version >= 150000 else "")
+            cur.execute(sql.SQL("CREATE DATABASE {} TEMPLATE {}{}").format(
+                sql.Identifier(target), sql.Identifier(source), strategy))
+    finally:
+        conn.close()
+    print(f"Cloned database {source} into {target} in {time.perf_counter() - t0:.2f}s")
+
+def reset_database(mode=RESET_MODE, template=RESET_TEMPLATE):
+    """Empty the target database before a load: truncate it, or recreate it from `template`"""
+    if mode == 'template':
+        print(f"=== RECREATING {DB_NAME} FROM TEMPLATE {template} ===")
+        clone_database(template, DB_NAME)
+    else:
+        truncate_all_tables()
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="Generate the OmniShip dataset and load it into PostgreSQL")
+    p.add_argument('--mode', choices=['stream', 'csv', 'export', 'verify'], default=LOAD_MODE,
+                   help="stream rows straight into COPY (default), write CSV chunks to disk first, "
+                        "only export compressed chunk files without touching the DB, or only verify a load")
+    p.add_argument('--verify', action='store_true',
+                   help="after the load, compare every chunk's row count and fingerprint with the database "
+                        "and check every FK for orphans")
+    p.add_argument('--repair', action='store_true',
+                   help="delete the rows and manifest entries of mismatched chunks, for --resume to reload")
+    p.add_argument('--export-dir', type=Path, default=EXPORT_DIR,
+                   help="export mode: directory for the chunk files and manifest")
+    p.add_argument('--export-format', choices=['csv', 'parquet'], default=EXPORT_FORMAT,
+                   help="export mode: CSV (as COPY would read it) or typed Parquet (needs pyarrow)")
+    p.add_argument('--compression', choices=['gzip', 'zstd', 'none'], default=EXPORT_COMPRESSION,
+                   help="export mode: compression of the chunk files (zstd needs zstandard)")
+    p.add_argument('--from-export', metavar='DIR', type=Path,
+                   help="load a directory written by --mode export instead of generating rows")
+    p.add_argument('--keep-chunks', action='store_true',
+                   help="csv mode: keep the chunk files after they are loaded")
+    p.add_argument('--fk-source', choices=['schema', 'db'], default='schema',
+                   help="read the FK dependency graph from SQLOmniship.sql or from information_schema")
+    p.add_argument('--engine', choices=['vector', 'rows'], default=ENGINE,
+                   help="column-at-a-time NumPy generators (default) or the per-row generators")
+    p.add_argument('--resume', action='store_true',
+                   help="keep existing data and only load chunks missing from the manifest")
+    p.add_argument('--resume-from-template', action='store_true',
+                   help="recreate the database from --template (e.g. a partially seeded snapshot), "
+                        "then --resume from its manifest")
+    p.add_argument('--explicit-ids', action='store_true',
+                   help="write primary keys as gi + 1 and reset the sequences after the load")
+    p.add_argument('--defer-constraints', action='store_true',
+                   help="drop PK/UNIQUE/FK constraints and indexes for the load and rebuild them afterwards")
+    p.add_argument('--restore-constraints', action='store_true',
+                   help="only rebuild the constraints saved by an interrupted --defer-constraints load")
+    p.add_argument('--reset', choices=['truncate', 'template'], default=RESET_MODE,
+                   help="empty the tables with one TRUNCATE (default) or recreate the database "
+                        "from --template with CREATE DATABASE ... TEMPLATE")
+    p.add_argument('--template', default=RESET_TEMPLATE, metavar='DB',
+                   help="template database for --reset template (e.g. made with --snapshot)")
+    p.add_argument('--snapshot', metavar='DB',
+                   help="only save the current database as DB (a template to --restore-snapshot later)")
+    p.add_argument('--restore-snapshot', metavar='DB',
+                   help="only recreate the database from the snapshot DB, without generating anything")
+    p.add_argument('--load-strategy', choices=LOAD_STRATEGIES, default=LOAD_STRATEGY,
+                   help="COPY into the tables directly (heap), set them UNLOGGED for the load, "
+                        "or COPY into UNLOGGED per-worker staging partitions and switch over")
+    p.add_argument('--scale', type=float, default=1.0,
+                   help="multiply the row counts of all non-reference tables by N (implies --auto-chunks)")
+    p.add_argument('--chunk-rows', type=int, metavar='N',
+                   help="rows per chunk for every table; generation streams fixed-size batches, so "
+                        "memory does not grow with N")
+    p.add_argument('--auto-chunks', action='store_true',
+                   help="size chunks from CHUNK_TARGET_BYTES and the worker count, and re-tune them "
+                        "from measured chunk times during the load")
+    p.add_argument('--distribution', choices=['uniform', 'skewed'], default=DISTRIBUTION,
+                   help="round-robin FKs and timestamps, or Zipf FKs and time-of-day weighted timestamps")
+    p.add_argument('--seed', type=int, default=SEED, help="seed of the skewed distributions and the --text faker pools")
+    p.add_argument('--aggregates', choices=['independent', 'consistent'], default=AGGREGATES,
+                   help="derive order/PO totals and payment amounts from the related rows "
+                        "(implies --explicit-ids)")
+    p.add_argument('--text', choices=['placeholder', 'faker'], default=TEXT,
+                   help="placeholder strings, or Faker names, cities, addresses and companies from seeded pools")
+    p.add_argument('--binary', metavar='TABLES', default='',
+                   help="comma-separated tables to load with binary COPY, or 'all'")
+    p.add_argument('--backend', type=parse_backend, action='append', metavar='[TABLE=]NAME',
+                   help="load every table, or TABLE, with text COPY (copy, the default), copy-binary, "
+                        "multi-row INSERTs (insert), prepared INSERTs (prepared) or psycopg 3 pipelined "
+                        "INSERTs (pipeline); auto calibrates each table on this host and picks the fastest "
+                        "backend, batch size and worker count (repeatable)")
+    p.add_argument('--batch-rows', type=int, default=INSERT_BATCH_ROWS, metavar='N',
+                   help="rows per statement of the insert, prepared and pipeline backends")
+    p.add_argument('--append', action='store_true',
+                   help="keep the loaded rows and only generate each table from its current row count "
+                        "up to its target (--rows, or the TABLES/--scale size)")
+    p.add_argument('--rows', type=parse_rows, action='append', metavar='TABLE=N',
+                   help="append/trickle target of one table: N rows, +N rows or +P%% (repeatable)")
+    p.add_argument('--trickle', type=float, metavar='ROWS_PER_SEC',
+                   help="append rows to --trickle-tables continuously at this rate, like live traffic")
+    p.add_argument('--trickle-tables', default=TRICKLE_TABLES,
+                   help="comma-separated tables --trickle grows, in proportion to their sizes")
+    p.add_argument('--duration', type=float, help="stop --trickle after this many seconds")
+    p.add_argument('--shard', type=parse_shard, metavar='i/N',
+                   help="only generate/load chunks with index %% N == i of every table; run "
+                        "--coordinate start before and --coordinate finish after all N shards")
+    p.add_argument('--coordinate', choices=['start', 'finish', 'local'],
+                   help="sharded runs: truncate and drop constraints (start), check coverage, merge "
+                        "manifests, reset sequences and validate constraints (finish), or run "
+                        "start, --shards local shard processes and finish (local)")
+    p.add_argument('--shards', type=int, default=2, help="number of shard processes for --coordinate local")
+    p.add_argument('--report', metavar='PATH',
+                   help="write per-chunk and per-table stage timings, rows/s, bytes/s, worker peak RSS "
+                        "and pg_stat samples to PATH (.json, or .csv for one row per chunk)")
+    p.add_argument('--trace', metavar='PATH',
+                   help="write a Chrome trace of every generate/serialize/write/COPY/commit span to PATH")
+    return p.parse_args(argv)
+
+def run_load(args, tuner):
+    """Truncate (unless resuming), load every table and put sequences and constraints back"""
+    mirror = MANIFEST_FILE if SHARD is None else MANIFEST_FILE.with_name(shard_file(MANIFEST_FILE.name, SHARD))
+    manifest = ChunkManifest(mirror)
+    # --resume keeps whatever is loaded; only --resume-from-template clones first, and the
+    # clone's manifest then says what is left to load
+    if args.resume_from_template:
+        with report_phase('reset'):
+            reset_database('template', args.template)
+    elif SHARD is None and not args.append and not args.resume:
+        with report_phase('reset'):
+            reset_database(args.reset, args.template)
+    manifest.ensure_table()
+    if args.append:
+        committed = plan_append(args, manifest.committed())
+    elif args.resume:
+        committed = manifest.committed()
+    else:
+        if SHARD is None:   # shards: the coordinator already emptied the manifest
+            manifest.reset()
+        committed = {}
+    if REPORT is not None and REPORT.sampler is None:
+        REPORT.sampler = PgStatSampler().start()
+    parents = fk_parents(args.fk_source)
+    deferred = None
+    if SHARD is not None:
+        # the coordinator dropped the constraints: every table loads at once
+        parents = {t: set() for t in parents}
+    elif args.defer_constraints:
+        deferred = DeferredConstraints(parents)
+        with report_phase('drop constraints'):
+            deferred.drop()
+        # without FKs there is nothing to wait for: every table loads at once
+        parents = {t: set() for t in parents}
+    pipeline = LoadPipeline(parents, args.mode, keep=args.keep_chunks,
+                            committed=committed, manifest=manifest,
+                            strategy=LoadStrategy(LOAD_STRATEGY, fresh=not args.resume), tuner=tuner)
+    if args.resume:
+        print(f"Resuming: {pipeline.total} chunks left to load")
+    t_load = time.perf_counter()
+    try:
+        with report_phase('load'):
+            pipeline.run()
+    finally:
+        close_pools()
+    if deferred is not None:
+        deferred.timings['load'] = time.perf_counter() - t_load
+    if EXPLICIT_IDS and SHARD is None:
+        with report_phase('reset sequences'):
+            reset_sequences(pipeline.tables)
+    if deferred is not None:
+        with report_phase('restore constraints'):
+            deferred.restore()
+        deferred.report()
+    return pipeline
+
+def main(argv=None):
+    args = parse_args(argv)
+    global ENGINE, EXPLICIT_IDS, LOAD_STRATEGY, DISTRIBUTION, SEED, AGGREGATES, TEXT, REPORT, TRACE
+    global EXPORT_DIR, EXPORT_FORMAT, EXPORT_COMPRESSION, SHARD
+    ENGINE = args.engine
+    DISTRIBUTION, SEED = args.distribution, args.seed
+    AGGREGATES = args.aggregates
+    if AGGREGATES == 'consistent' and np is None:
+        raise SystemExit("--aggregates consistent needs NumPy")
+    TEXT = args.text
+    if TEXT == 'faker':
+        if np is None:
+            raise SystemExit("--text faker needs NumPy")
+        ensure_vocab()
+    EXPLICIT_IDS = args.explicit_ids
+    if AGGREGATES == 'consistent' and not EXPLICIT_IDS:
+        # serial ids follow commit order, so order k is only gi k - 1 when the ids are written
+        print("--aggregates consistent: implying --explicit-ids")
+        EXPLICIT_IDS = True
+    LOAD_STRATEGY = args.load_strategy
+    if LOAD_STRATEGY == 'unlogged' and not args.defer_constraints:
+        raise SystemExit("--load-strategy unlogged needs --defer-constraints "
+                         "(a logged table cannot reference an unlogged one)")
+    binary = list(GEN_FUNCS) if args.binary == 'all' else [t for t in args.binary.split(',') if t]
+    for table in binary:
+        if table not in GEN_FUNCS:
+            raise SystemExit(f"--binary: unknown table {table}")
+        COPY_FORMATS[table] = 'binary'
+    choices = {}
+    for table, name in sorted(args.backend or [], key=lambda b: b[0] is not None):   # TABLE=NAME wins
+        choices.update(dict.fromkeys([table] if table else GEN_FUNCS, name))
+    autotuned = [t for t in GEN_FUNCS if choices.get(t) == 'auto']
+    for table, name in choices.items():
+        if table in binary and name != 'copy-binary':
+            raise SystemExit(f"--binary loads {table} with copy-binary: it does not combine with --backend {name}")
+        if name != 'auto':
+            use_backend(table, name, args.batch_rows)
+    if 'pipeline' in choices.values():
+        if psycopg is None:
+            raise SystemExit("--backend pipeline needs psycopg 3 (pip install psycopg)")
+        if args.mode != 'stream' or args.trickle:
+            raise SystemExit("--backend pipeline loads on the stream workers' own connections: "
+                             "it needs --mode stream and does not combine with --trickle")
+    if autotuned and (args.mode not in ('stream', 'csv') or args.trickle or args.from_export):
+        raise SystemExit("--backend auto calibrates generated bulk loads: it needs --mode stream or csv "
+                         "and does not combine with --trickle or --from-export")
+    if args.restore_constraints:
+        deferred = DeferredConstraints(GEN_FUNCS)
+        deferred.restore()
+        deferred.report()
+        return
+    if args.snapshot:
+        clone_database(DB_NAME, args.snapshot)
+        return
+    if args.restore_snapshot:
+        clone_database(args.restore_snapshot, DB_NAME)
+        return
+    tuner = None
+    if args.scale != 1:
+        SIZES.update(scale_sizes(args.scale))
+        print(f"Scale {args.scale:g}: {sum(SIZES.values())} rows "
+              f"({', '.join(f'{t} {SIZES[t]}' for t in sorted(SIZES, key=SIZES.get, reverse=True)[:3])}, ...)")
+    if args.mode == 'export':
+        EXPORT_DIR, EXPORT_FORMAT, EXPORT_COMPRESSION = args.export_dir, args.export_format, args.compression
+        if EXPORT_FORMAT == 'parquet' and pa is None:
+            raise SystemExit("--export-format parquet needs pyarrow")
+        if EXPORT_COMPRESSION == 'zstd' and zstd is None:
+            raise SystemExit("--compression zstd needs the zstandard package")
+        if binary or choices:
+            raise SystemExit("--binary and --backend do not apply to --mode export")
+    if args.from_export:
+        if args.mode != 'stream' or COPY_FORMATS or args.scale != 1 or args.auto_chunks:
+            raise SystemExit("--from-export loads the files as exported: it only works with --mode stream "
+                             "and without --binary, --backend copy-binary, --scale or --auto-chunks")
+        manifest = read_export(args.from_export)
+        print(f"Loading export {args.from_export} ({manifest['format']}/{manifest['compression']}): "
+              f"{len(IMPORT_FILES)} chunk files")
+    if args.chunk_rows:
+        if args.auto_chunks or args.from_export:
+            raise SystemExit("--chunk-rows sets the chunk sizes itself: it does not combine with "
+                             "--auto-chunks or --from-export")
+        CHUNK_SIZES.update({t: max(1, min(SIZES[t], args.chunk_rows)) for t in SIZES})
+    elif (args.auto_chunks or args.scale != 1) and (args.shard is not None or args.coordinate):
+        # every shard must cut the same chunks whatever its core count, and never re-cut them
+        CHUNK_SIZES.update(auto_chunk_sizes(workers=SHARD_PLAN_WORKERS))
+    elif args.auto_chunks or args.scale != 1:
+        CHUNK_SIZES.update(auto_chunk_sizes())
+        tuner = ChunkTuner()
+    if (args.shard is not None or args.coordinate) and not EXPLICIT_IDS:
+        raise SystemExit("--shard and --coordinate need --explicit-ids: with serial ids a chunk loaded "
+                         "twice gets fresh ids and its duplicate rows cannot be found")
+    if args.shard is not None:
+        if args.coordinate or args.defer_constraints or LOAD_STRATEGY != 'heap':
+            raise SystemExit("--shard loads into the tables the coordinator prepared: it does not combine "
+                             "with --coordinate, --defer-constraints or --load-strategy")
+        SHARD = args.shard
+        print(f"Shard {SHARD[0]}/{SHARD[1]}")
+    if args.resume_from_template:
+        if args.shard or args.coordinate:
+            raise SystemExit("--resume-from-template recreates the database: it does not combine "
+                             "with --shard or --coordinate")
+        args.resume = True
+    if (args.append or args.trickle) and (args.shard or args.coordinate or args.resume or args.from_export):
+        raise SystemExit("--append/--trickle grow an existing load on their own: they do not combine "
+                         "with --resume, --shard, --coordinate or --from-export")
+    if (args.append or args.trickle) and AGGREGATES == 'consistent':
+        raise SystemExit("--aggregates consistent derives totals from fixed table sizes; it cannot be appended to")
+    if args.trickle:
+        trickle(args)
+        return
+    if args.coordinate == 'start':
+        coordinate_start(args)
+        return
+    if args.coordinate == 'finish':
+        coordinate_finish(args)
+        return
+    if args.coordinate == 'local':
+        coordinate_local(args, argv if argv is not None else sys.argv[1:])
+        return
+    if args.mode == 'verify':
+        if verify_load(args.repair):
+            raise SystemExit(1)
+        return
     t0 = time.time()
-    truncate_all_tables()
-    generated = {}
-    tables_order = [
-        'categories','users','roles','permissions','rolepermissions','userroles',
-        'warehouses','suppliers','products','productvariants','inventory',
-        'promotions','taxes','orders','payments','orderitems',
-        'vehicles','drivers','maintenancelogs',
-        'deliveryshipments','deliveryroutes','routestops','proofofdelivery',
-        'purchaseorders','purchaseorderitems','shipments','qualitychecks'
-    ]
-    print("=== GENERATION PHASE ===")
-    for table in tables_order:
-        generated[table] = generate_table(table)
-    print("=== COPY PHASE ===")
-    for table in tables_order:
-        files = generated[table]
-        parallel_copy(table, files)
+    failed = []
+    if args.report or args.trace:
+        TRACE = bool(args.trace)
+        REPORT = RunReport()
+    try:
+        if args.mode == 'export':
+            with report_phase('export'):
+                chunks = export_dataset(list(GEN_FUNCS))
+        else:
+            if autotuned:
+                with report_phase('autotune'):
+                    autotune(autotuned, args.mode, indexes=not (args.defer_constraints or SHARD is not None))
+            chunks = run_load(args, tuner).total
+            if args.verify:
+                with report_phase('verify'):
+                    failed = verify_load(args.repair)
+    finally:
+        close_pools()
+        if REPORT is not None:
+            if REPORT.sampler is not None:
+                REPORT.sampler.stop()
+            if args.report:
+                REPORT.write(args.report)
+            if args.trace:
+                REPORT.write_trace(args.trace)
+    if REPORT is not None:
+        REPORT.print()
+    report_startup(chunks)
     dt = time.time() - t0
-    print(f"All done in {dt:.2f} seconds. Chunk dir: {OUT_DIR.resolve()}")
+    if args.mode != 'csv':
+        print(f"All done in {dt:.2f} seconds.")
+    else:
+        print(f"All done in {dt:.2f} seconds. Chunk dir: {OUT_DIR.resolve()}")
     print("Finished.")
+    if failed:
+        raise SystemExit(f"Verification failed: {len(failed)} mismatched")
 
 if __name__ == '__main__':
     main()